@@ -0,0 +1,74 @@
+"""
+Desempenho dos kernels NumPy de indicadores (src/api/services/indicators.py).
+
+Mede, sobre um histórico OHLCV sintético e determinístico, o tempo das 34 features do
+modelo e dos indicadores do painel contra a implementação original em pandas. A
+paridade entre as duas versões é conferida em tests/test_indicators.py.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_indicators.py [--rows 520] [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.api.services import indicators as ind  # noqa: E402
+from src.api.services.feature_pipeline import FeaturePipeline  # noqa: E402
+from tests.indicator_reference import (  # noqa: E402
+    numpy_display, pandas_display, pandas_features, pandas_raw, pandas_rsi, synthetic_snapshot)
+
+
+def bench(fn, repeat):
+    fn()
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=520, help="candles no histórico sintético (2y ≈ 520)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pipeline, selic = FeaturePipeline(), 11.75
+    df_all = synthetic_snapshot(args.rows)
+    raw_pd = pandas_raw(df_all)
+
+    def numpy_all():
+        buffer = ind.OHLCVBuffer.from_snapshot(df_all, "PETR4.SA")
+        raw = buffer.to_frame()
+        raw['close'] = raw['close'].fillna(0)
+        pipeline._compute_features_batch(raw, selic)
+        numpy_display(buffer)
+
+    def pandas_all():
+        pandas_features(pandas_raw(df_all), selic, pipeline.TARGET_COLUMNS)
+        pandas_display(df_all)
+
+    cases = [
+        ("features do modelo", lambda: pandas_features(raw_pd, selic, pipeline.TARGET_COLUMNS),
+         lambda: pipeline._compute_features_batch(raw_pd, selic)),
+        ("rolling mean (200)", lambda: raw_pd['close'].rolling(200).mean(),
+         lambda: ind.rolling_mean(raw_pd['close'].to_numpy(), 200)),
+        ("rolling std (20)", lambda: raw_pd['close'].rolling(20).std(),
+         lambda: ind.rolling_std(raw_pd['close'].to_numpy(), 20)),
+        ("ewm (26)", lambda: raw_pd['close'].ewm(span=26, adjust=False).mean(),
+         lambda: ind.ewm_mean(raw_pd['close'].to_numpy(), 26)),
+        ("RSI (21)", lambda: pandas_rsi(raw_pd['close'], 21),
+         lambda: ind.rsi(raw_pd['close'].to_numpy(), 21)),
+        ("snapshot -> features + painel", pandas_all, numpy_all),
+    ]
+
+    print(f"\n⏱️  {args.rows} candles, melhor de {args.repeat} execuções")
+    print(f"{'caso':<32}{'pandas':>12}{'numpy':>12}{'speedup':>10}")
+    for name, pandas_fn, numpy_fn in cases:
+        t_pd, t_np = bench(pandas_fn, args.repeat), bench(numpy_fn, args.repeat)
+        print(f"{name:<32}{t_pd * 1e3:>10.3f}ms{t_np * 1e3:>10.3f}ms{t_pd / t_np:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
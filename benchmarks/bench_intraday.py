@@ -0,0 +1,110 @@
+"""
+Replay acelerado de pregões intraday pelo caminho incremental (sem rede).
+
+Carrega o histórico diário dos fixtures, injeta candle a candle um pregão gravado
+(benchmarks/fixtures/session.csv.gz; sem ele, um pregão sintético de 1 min) em
+`--sessoes` pregões seguidos e mede a latência por candle (revisão do candle
+diário, features e re-pontuação da janela mais recente), a vazão sustentada em
+candles/s e a memória residente ao fim de cada pregão: com os buffers de
+capacidade fixa, ela deve ficar estável de um pregão para o outro.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_intraday.py [--sessoes 5] [--velocidade 0] [--saida resultados.json]
+
+`--velocidade 60` reproduz o pregão 60x mais rápido que o tempo real; 0 (padrão) não espera entre candles.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Store OHLCV e Selic num diretório temporário: não toca nos dados locais da API
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="bench_data_"))
+os.environ["INFERENCE_MODE"] = "local"
+
+from benchmarks import report, standin  # noqa: E402
+
+
+def sessions_after(session, last_date, count):
+    """O mesmo pregão gravado reposicionado nos `count` dias úteis seguintes a `last_date`."""
+    offsets = session.index - session.index.normalize()
+    days = pd.bdate_range(last_date + pd.Timedelta(days=1), periods=count)
+    for day in days:
+        yield day, session.set_axis(pd.Timestamp(day).tz_localize(session.index.tz) + offsets)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay acelerado de pregões intraday.")
+    parser.add_argument("--sessoes", type=int, default=5, help="pregões seguidos (o mesmo pregão gravado repetido)")
+    parser.add_argument("--velocidade", type=float, default=0.0, help="multiplicador do tempo real (0 = sem espera)")
+    parser.add_argument("--saida", help="caminho do JSON (padrão: benchmarks/results/intraday-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    fake = standin.install()
+
+    from src.api.config import DEFAULT_TICKER, INFERENCE_BACKEND, SELIC_FALLBACK
+    from src.api.services.intraday import IntradayTracker
+    from src.api.services.market_cache import market_cache
+    from src.api.services.ml_artifacts import get_artifacts
+    from src.api.services.selic_provider import selic_provider
+
+    selic_provider.refresh()
+    artifacts = get_artifacts(DEFAULT_TICKER)
+    artifacts.load()
+    if not artifacts.is_loaded():
+        print(f"❌ Artefatos de {DEFAULT_TICKER} indisponíveis: {artifacts.error}")
+        return 1
+    selic = selic_provider.get(default=SELIC_FALLBACK)
+
+    buffer = market_cache.get_buffer(DEFAULT_TICKER)
+    tracker = IntradayTracker(DEFAULT_TICKER, artifacts)
+    started = time.perf_counter()
+    tracker.seed(buffer)
+    seed_ms = (time.perf_counter() - started) * 1000
+    session = standin.load_session(float(buffer.close[-1]))
+    spacing = session.index.to_series().diff().dt.total_seconds().fillna(0).to_numpy()
+
+    latencies, rss, previsoes = [], [report.current_rss_mb()], []
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # logs dos serviços fora da tabela
+        for day, bars in sessions_after(session, buffer.last_date, args.sessoes):
+            rows = bars[["Close", "High", "Low", "Volume"]].to_numpy(dtype=float)
+            for when, row, wait in zip(bars.index, rows, spacing):
+                if args.velocidade > 0 and wait:
+                    time.sleep(wait / args.velocidade)
+                t0 = time.perf_counter()
+                forecast = tracker.on_bar(when, *row, selic)
+                latencies.append(time.perf_counter() - t0)
+            previsoes.append((day.date().isoformat(), forecast.preco_atual, forecast.preco_previsto))
+            rss.append(report.current_rss_mb())
+    elapsed = time.perf_counter() - started
+
+    results = [report.summarize("intraday_on_bar", latencies, elapsed)]
+    print(f"\n⏱️  Replay intraday ({DEFAULT_TICKER}, backend {artifacts.backend.name}): "
+          f"{args.sessoes} pregões x {len(session)} candles")
+    report.print_table(results)
+    for dia, atual, previsto in previsoes:
+        print(f"   {dia}: último R$ {atual:.2f} → D+1 R$ {previsto:.2f}")
+    print(f"🌱 Carga do histórico: {seed_ms:.1f} ms | buffers circulares: {tracker.nbytes / 1024:.1f} KB")
+    print(f"📈 RSS ao fim de cada pregão (MB): {rss} | pico: {report.peak_rss_mb()} MB | "
+          f"chamadas ao Yahoo: {fake.calls['download']}")
+
+    report.write_results(
+        "intraday", results,
+        config={"ticker": DEFAULT_TICKER, "backend": artifacts.backend.name, "INFERENCE_BACKEND": INFERENCE_BACKEND,
+                "sessoes": args.sessoes, "candles_por_sessao": len(session), "velocidade": args.velocidade},
+        path=args.saida, carga_historico_ms=round(seed_ms, 1), buffers_bytes=tracker.nbytes,
+        rss_por_sessao_mb=rss, pico_rss_mb=report.peak_rss_mb(),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
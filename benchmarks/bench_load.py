@@ -0,0 +1,149 @@
+"""
+Carga ponta a ponta em POST /api/predict com vários níveis de concorrência.
+
+Sobe a API num processo separado (uvicorn, 1 worker) com Yahoo e BCB substituídos
+pelos fixtures, espera o /api/ready e dispara as requisições por HTTP real. Por
+nível: vazão, p50/p95/p99 e erros; ao final, o pico de RSS do servidor.
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_load.py [--concorrencia 1 4 16 64] [--requisicoes 400]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import report  # noqa: E402
+
+
+# --- SERVIDOR ---
+def serve(port, latency):
+    """Processo filho: API com os substitutos de Yahoo/BCB instalados."""
+    os.environ["INFERENCE_MODE"] = "local"
+    os.chdir(ROOT)  # templates do frontend são relativos à raiz
+    sys.path.insert(0, os.path.join(ROOT, "src"))
+    import uvicorn
+    from benchmarks import standin
+
+    standin.install(latency=latency)
+    from api.main import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(latency_ms):
+    port = _free_port()
+    env = {**os.environ, "DATA_DIR": tempfile.mkdtemp(prefix="bench_data_")}
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--servir", str(port), "--latencia-rede-ms", str(latency_ms)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def wait_ready(client, proc, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"servidor encerrou com código {proc.returncode}")
+        try:
+            if (await client.get("/api/ready")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError("API não ficou pronta a tempo")
+
+
+# --- CARGA ---
+async def run_level(client, concurrency, total, body):
+    """`total` requisições com `concurrency` clientes simultâneos."""
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            t0 = time.perf_counter()
+            try:
+                response = await client.post("/api/predict", json=body)
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return report.summarize("predict", latencies, time.perf_counter() - started, errors, concorrencia=concurrency)
+
+
+async def drive(base_url, proc, args):
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(args.concorrencia), max_keepalive_connections=max(args.concorrencia))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await wait_ready(client, proc)
+        # Primeira requisição medida à parte (conexão nova e caminhos ainda frios no servidor)
+        results = [await run_level(client, 1, 1, {"dias": args.dias})]
+        results[0]["caso"] = "predict_primeira"
+        for concurrency in args.concorrencia:
+            total = max(args.requisicoes, concurrency * 4)
+            results.append(await run_level(client, concurrency, total, {"dias": args.dias}))
+            print(f"  c={concurrency:<4} {results[-1]['vazao_rps']:>9.1f} req/s  p99 {results[-1]['p99_ms']} ms")
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga ponta a ponta em /api/predict.")
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requisicoes", type=int, default=400, help="requisições por nível")
+    parser.add_argument("--dias", type=int, default=5)
+    parser.add_argument("--latencia-rede-ms", type=float, default=0.0, help="atraso simulado por chamada ao Yahoo/BCB")
+    parser.add_argument("--saida", help="caminho do JSON (padrão: benchmarks/results/load-<commit>.json)")
+    parser.add_argument("--servir", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.servir:
+        serve(args.servir, args.latencia_rede_ms / 1000)
+        return 0
+
+    proc, base_url = start_server(args.latencia_rede_ms)
+    print(f"🚀 API de benchmark em {base_url} (pid {proc.pid})")
+    try:
+        results = asyncio.run(drive(base_url, proc, args))
+        server_rss = report.peak_rss_mb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    print()
+    report.print_table(results)
+    print(f"📈 Pico de RSS do servidor: {server_rss} MB")
+    report.write_results(
+        "load", results,
+        config={"rota": "/api/predict", "dias": args.dias, "requisicoes_por_nivel": args.requisicoes,
+                "latencia_rede_ms": args.latencia_rede_ms,
+                "INFERENCE_BACKEND": os.getenv("INFERENCE_BACKEND", "tf_function"),
+                "UNCERTAINTY_MODE": os.getenv("UNCERTAINTY_MODE", "mc_dropout")},
+        path=args.saida, pico_rss_mb=server_rss,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
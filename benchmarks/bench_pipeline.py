@@ -0,0 +1,138 @@
+"""
+Micro-benchmarks das etapas da previsão, sem rede (Yahoo e BCB substituídos pelos fixtures).
+
+Mede, para o ativo principal: sincronização do snapshot de mercado, engenharia de
+features (incremental e a frio), contexto do painel, scaling (pré-processamento
+compilado contra o caminho pandas + sklearn; a paridade fica em tests/) e
+inferência da LSTM (backend configurado, amostragem MC-dropout das faixas e
+`lstm_model.predict` do Keras como referência).
+
+Uso (na raiz do projeto):
+    python benchmarks/bench_pipeline.py [--iteracoes 200] [--saida resultados.json]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Store OHLCV e Selic num diretório temporário: não toca nos dados locais da API
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="bench_data_"))
+os.environ["INFERENCE_MODE"] = "local"
+
+from benchmarks import report, standin  # noqa: E402
+
+
+def measure(name, fn, iterations, warmup=5, setup=None):
+    """Executa `fn` `iterations` vezes (após `warmup`) e resume as latências."""
+    with contextlib.redirect_stdout(io.StringIO()):  # logs dos serviços fora da tabela
+        return _measure(name, fn, iterations, warmup, setup)
+
+
+def _measure(name, fn, iterations, warmup, setup):
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return report.summarize(name, latencies, time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do caminho de previsão.")
+    parser.add_argument("--iteracoes", type=int, default=200)
+    parser.add_argument("--iteracoes-keras", type=int, default=30, help="Model.predict do Keras é bem mais lento")
+    parser.add_argument("--latencia-rede-ms", type=float, default=0.0, help="atraso simulado por chamada ao Yahoo/BCB")
+    parser.add_argument("--saida", help="caminho do JSON (padrão: benchmarks/results/pipeline-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    fake = standin.install(latency=args.latencia_rede_ms / 1000)
+
+    from src.api.config import DEFAULT_TICKER, INFERENCE_BACKEND, UNCERTAINTY_MODE
+    from src.api.services.feature_pipeline import FeaturePipeline, get_pipeline
+    from src.api.services.market_cache import market_cache
+    from src.api.services.market_data import market_service
+    from src.api.services.ml_artifacts import get_artifacts
+    from src.api.services.selic_provider import selic_provider
+
+    selic_provider.refresh()
+    artifacts = get_artifacts(DEFAULT_TICKER)
+    artifacts.load()
+    if not artifacts.is_loaded():
+        print(f"❌ Artefatos de {DEFAULT_TICKER} indisponíveis: {artifacts.error}")
+        return 1
+
+    pipeline = get_pipeline(DEFAULT_TICKER)
+    features_df, _ = pipeline.prepare_input_data()
+    preprocessor = artifacts.preprocessor
+    if preprocessor is None:
+        print(f"❌ Pré-processamento compilado indisponível para {DEFAULT_TICKER}")
+        return 1
+
+    def sklearn_windows():
+        # Caminho anterior: cópia do DataFrame, transform com validação de nomes e np.stack
+        X = features_df.copy()
+        cols = [c for c in artifacts.scaler_x.feature_names_in_ if c in X.columns]
+        X[cols] = artifacts.scaler_x.transform(X[cols])
+        X = X.values
+        return X[None, -20:].astype(np.float32)
+
+    # A paridade exata com o sklearn é conferida em tests/test_preprocessing.py
+    with artifacts.input_windows(features_df) as fused:
+        windows = fused.copy()
+    preds = artifacts.predict(windows)
+
+    def fused_windows():
+        with artifacts.input_windows(features_df):
+            pass
+
+    n = args.iteracoes
+
+    results = [
+        measure("market_snapshot", market_cache.get_snapshot, n, setup=market_cache.invalidate),
+        measure("prepare_input_data", pipeline.prepare_input_data, n),
+        measure("prepare_input_data_frio", lambda: FeaturePipeline(DEFAULT_TICKER).prepare_input_data(), n),
+        measure("get_current_context", lambda: market_service.get_current_context(DEFAULT_TICKER), n),
+        measure("windows_sklearn", sklearn_windows, n),
+        measure("windows_fused", fused_windows, n),
+        measure("inverse_sklearn", lambda: artifacts.scaler_y.inverse_transform(preds)[0][0], n),
+        measure("inverse_fused", lambda: preprocessor.inverse(preds)[0], n),
+        measure(f"predict_{artifacts.backend.name}", lambda: artifacts.predict(windows), n),
+    ]
+    if artifacts.sampler is not None:
+        # Trajetórias MC-dropout: no serviço rodam em paralelo ao forward pontual acima
+        results.append(measure(f"mc_dropout_{artifacts.sampler.samples}x{artifacts.sampler.horizon}",
+                               lambda: artifacts.sample_log_returns(windows[0], key=0), n))
+    results += [
+        measure("lstm_model.predict", lambda: artifacts.lstm_model.predict(windows, verbose=0), args.iteracoes_keras, warmup=2),
+    ]
+
+    print(f"\n⏱️  Micro-benchmarks ({DEFAULT_TICKER}, backend {artifacts.backend.name})")
+    report.print_table(results)
+    rss = report.peak_rss_mb()
+    print(f"📈 Pico de RSS: {rss} MB | chamadas ao Yahoo: {fake.calls['download']}, ao BCB: {fake.calls['bcb']}")
+
+    report.write_results(
+        "pipeline", results,
+        config={"ticker": DEFAULT_TICKER, "backend": artifacts.backend.name, "INFERENCE_BACKEND": INFERENCE_BACKEND,
+                "UNCERTAINTY_MODE": UNCERTAINTY_MODE, "iteracoes": n, "latencia_rede_ms": args.latencia_rede_ms, "pregoes": len(fake.snapshot)},
+        path=args.saida, pico_rss_mb=rss,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
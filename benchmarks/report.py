@@ -0,0 +1,151 @@
+"""
+Estatísticas, gravação e comparação dos resultados dos benchmarks.
+
+Cada suíte grava um JSON em benchmarks/results/<suíte>-<commit>.json com o commit,
+a configuração relevante e, por caso, vazão, p50/p95/p99 e pico de RSS.
+
+Comparar dois commits (sai com código 1 se algum caso piorou além do limite):
+    python benchmarks/report.py results/pipeline-abc123.json results/pipeline-def456.json [--limite 10]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def summarize(name, latencies, elapsed, errors=0, **extra):
+    """Latências (segundos) de cada chamada → vazão e percentis em ms."""
+    lat = np.asarray(latencies, dtype=np.float64) * 1000
+    ok = len(lat)
+    return {
+        "caso": name,
+        **extra,
+        "amostras": ok,
+        "erros": errors,
+        "vazao_rps": round(ok / elapsed, 2) if elapsed > 0 else None,
+        "media_ms": round(float(lat.mean()), 4) if ok else None,
+        "p50_ms": round(float(np.percentile(lat, 50)), 4) if ok else None,
+        "p95_ms": round(float(np.percentile(lat, 95)), 4) if ok else None,
+        "p99_ms": round(float(np.percentile(lat, 99)), 4) if ok else None,
+        "max_ms": round(float(lat.max()), 4) if ok else None,
+    }
+
+
+def peak_rss_mb(pid=None):
+    """Pico de memória residente (VmHWM) deste processo ou de `pid`."""
+    if pid is None:
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def current_rss_mb():
+    """Memória residente atual (VmRSS) deste processo."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results):
+    print(f"{'caso':<28}{'n':>7}{'rps':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>7}")
+    for r in results:
+        label = r["caso"] + (f" c={r['concorrencia']}" if "concorrencia" in r else "")
+        fmt = lambda v: f"{v:.3f}" if v is not None else "-"  # noqa: E731
+        print(f"{label:<28}{r['amostras']:>7}{r['vazao_rps'] or 0:>11.1f}"
+              f"{fmt(r['p50_ms']):>10}{fmt(r['p95_ms']):>10}{fmt(r['p99_ms']):>10}{r['erros']:>7}")
+
+
+def write_results(suite, results, config, path=None, **extra):
+    commit = _git("rev-parse", "--short", "HEAD")
+    document = {
+        "suite": suite,
+        "commit": commit,
+        "alteracoes_locais": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "config": config,
+        **extra,
+        "resultados": results,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{suite}-{commit or 'local'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultados em {path}")
+    return path
+
+
+# --- COMPARAÇÃO ---
+def _key(r):
+    return (r["caso"], r.get("concorrencia"))
+
+
+def compare(old, new, limit_pct):
+    """Imprime a variação de p50/p99/vazão por caso e retorna os casos que pioraram além do limite."""
+    before = {_key(r): r for r in old["resultados"]}
+    regressions = []
+    print(f"{old['suite']}: {old['commit']} → {new['commit']}")
+    print(f"{'caso':<28}{'p50':>10}{'p99':>10}{'rps':>10}")
+    for r in new["resultados"]:
+        b = before.get(_key(r))
+        if b is None or not b["amostras"] or not r["amostras"]:
+            continue
+        delta = lambda f: (r[f] / b[f] - 1) * 100 if b[f] else 0.0  # noqa: E731
+        d50, d99, drps = delta("p50_ms"), delta("p99_ms"), delta("vazao_rps")
+        label = r["caso"] + (f" c={r['concorrencia']}" if r.get("concorrencia") else "")
+        worse = d50 > limit_pct or d99 > limit_pct or drps < -limit_pct
+        print(f"{label:<28}{d50:>+9.1f}%{d99:>+9.1f}%{drps:>+9.1f}%{'  ⚠️' if worse else ''}")
+        if worse:
+            regressions.append(label)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark.")
+    parser.add_argument("antes")
+    parser.add_argument("depois")
+    parser.add_argument("--limite", type=float, default=10.0, help="piora máxima aceita (%%) em p50/p99/vazão")
+    args = parser.parse_args(argv)
+    with open(args.antes, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.depois, encoding="utf-8") as f:
+        new = json.load(f)
+    regressions = compare(old, new, args.limite)
+    if regressions:
+        print(f"❌ {len(regressions)} caso(s) piores que {args.limite:.0f}%: {', '.join(regressions)}")
+        return 1
+    print("✅ Nenhuma regressão acima do limite.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Dados de mercado gravados e substitutos locais do Yahoo Finance e do BCB.
+
+Os benchmarks não fazem I/O de rede: `install()` troca o provedor de mercado do
+store OHLCV e a consulta ao BCB do SelicProvider por versões em memória que servem
+os fixtures de benchmarks/fixtures/. As datas gravadas são deslocadas para terminar
+no último dia útil, de modo que o histórico sempre cai na janela de
+MARKET_HISTORY_YEARS e o mesmo fixture produz os mesmos valores em qualquer dia.
+
+Uso (na raiz do projeto):
+    python benchmarks/standin.py record      # grava os fixtures a partir do Yahoo/BCB (requer rede)
+    python benchmarks/standin.py synthetic   # gera fixtures sintéticos determinísticos
+    python benchmarks/standin.py session     # grava o pregão atual em candles de 1 min (requer rede)
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.api.services.market_providers import MarketDataClient, ReplayProvider, YahooProvider  # noqa: E402
+
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+MARKET_FIXTURE = os.path.join(FIXTURES_DIR, "market.csv.gz")
+SELIC_FIXTURE = os.path.join(FIXTURES_DIR, "selic.json")
+SESSION_FIXTURE = os.path.join(FIXTURES_DIR, "session.csv.gz")
+
+# Preço inicial das séries sintéticas (ativos do registro sem preço aqui começam em 30.0)
+SYNTHETIC_BASE = {"PETR4.SA": 35.0, "VALE3.SA": 60.0, "ITUB4.SA": 33.0,
+                  "BRL=X": 5.4, "BZ=F": 75.0, "^BVSP": 128000.0}
+SYNTHETIC_SELIC = [{"data": "18/06/2025", "valor": "15.00"}]
+
+
+def market_fields():
+    from src.api.services.instruments import instrument_registry
+    return dict(instrument_registry.market_fields())
+
+
+# --- FIXTURES ---
+def synthetic_fixtures(rows=520, seed=0):
+    """Snapshot determinístico (passeio aleatório) no formato do yf.download, com feriados da B3."""
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2025-06-30", periods=rows, name="Date")
+    cols = {}
+    for ticker, fields in market_fields().items():
+        close = SYNTHETIC_BASE.get(ticker, 30.0) * np.exp(np.cumsum(rng.normal(0, 0.015, rows)))
+        series = {
+            "Close": close,
+            "High": close * (1 + np.abs(rng.normal(0, 0.01, rows))),
+            "Low": close * (1 - np.abs(rng.normal(0, 0.01, rows))),
+            "Volume": rng.integers(1e6, 5e7, rows).astype(float),
+        }
+        for field in fields:
+            cols[(field, ticker)] = series[field]
+    df = pd.DataFrame(cols, index=idx)
+    # Feriados: ativos sem pregão em dias com cotação das séries macro
+    from src.api.config import MACRO_TICKERS
+    holidays = idx[rng.choice(np.arange(1, rows - 1), size=max(rows // 100, 1), replace=False)]
+    for (field, ticker) in df.columns:
+        if ticker not in MACRO_TICKERS.values():
+            df.loc[holidays, (field, ticker)] = np.nan
+    df.columns = pd.MultiIndex.from_tuples(df.columns, names=["Price", "Ticker"])
+    return df, SYNTHETIC_SELIC
+
+
+def record_fixtures():
+    """Baixa o histórico atual do Yahoo e os últimos registros da Selic (rede)."""
+    import requests
+    from src.api.config import BCB_SGS_URL, MARKET_HISTORY_PERIOD, SELIC_SERIES, SELIC_TAIL
+
+    frames, errors = MarketDataClient([YahooProvider()]).fetch_many(market_fields(), period=MARKET_HISTORY_PERIOD)
+    if errors:
+        raise SystemExit(f"❌ Falha ao gravar os fixtures: {errors}")
+    for frame in frames.values():
+        frame.index = pd.DatetimeIndex(frame.index).tz_localize(None).normalize().rename("Date")
+    df = pd.concat(frames, axis=1).swaplevel(axis=1).sort_index()
+
+    url = f"{BCB_SGS_URL.format(serie=SELIC_SERIES)}/ultimos/{SELIC_TAIL}?formato=json"
+    selic = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10).json()
+    return df, selic
+
+
+def save_fixtures(df, selic):
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    df.to_csv(MARKET_FIXTURE)
+    with open(SELIC_FIXTURE, "w", encoding="utf-8") as f:
+        json.dump(selic, f, ensure_ascii=False, indent=2)
+    print(f"💾 Fixtures gravados: {len(df)} pregões, {df.columns.get_level_values(1).nunique()} tickers → {FIXTURES_DIR}")
+
+
+def load_fixtures():
+    """(snapshot, selic) dos fixtures gravados; sem eles, os sintéticos."""
+    if not os.path.exists(MARKET_FIXTURE):
+        print("ℹ️ Fixtures gravados ausentes: usando o histórico sintético (python benchmarks/standin.py record).")
+        return synthetic_fixtures()
+    df = pd.read_csv(MARKET_FIXTURE, header=[0, 1], index_col=0, parse_dates=True)
+    df.columns = df.columns.set_names(["Price", "Ticker"])
+    with open(SELIC_FIXTURE, encoding="utf-8") as f:
+        selic = json.load(f)
+    return df, selic
+
+
+# --- PREGÃO INTRADAY ---
+def synthetic_session(price, minutes=420, seed=0):
+    """Pregão de `minutes` candles de 1 min (passeio aleatório a partir de `price`), das 10:00 em diante."""
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-07-01 10:00", periods=minutes, freq="1min", tz="America/Sao_Paulo", name="Datetime")
+    close = price * np.exp(np.cumsum(rng.normal(0, 0.0008, minutes)))
+    return pd.DataFrame({
+        "Close": close,
+        "High": close * (1 + np.abs(rng.normal(0, 0.0004, minutes))),
+        "Low": close * (1 - np.abs(rng.normal(0, 0.0004, minutes))),
+        "Volume": rng.integers(1e4, 5e5, minutes).astype(float),
+    }, index=idx)
+
+
+def record_session(ticker):
+    """Candles de 1 min do pregão atual (ou do último) do Yahoo (rede)."""
+    df = YahooProvider().fetch_intraday(ticker, "1m")
+    df.index = df.index.rename("Datetime")
+    return df
+
+
+def load_session(price, ticker=None):
+    """Pregão gravado (`session`) ou, sem ele, o sintético a partir de `price`."""
+    if not os.path.exists(SESSION_FIXTURE):
+        print("ℹ️ Pregão intraday gravado ausente: usando o sintético (python benchmarks/standin.py session).")
+        return synthetic_session(price)
+    df = pd.read_csv(SESSION_FIXTURE, index_col=0)
+    df.index = pd.to_datetime(df.index, utc=True).tz_convert("America/Sao_Paulo").rename("Datetime")
+    return df
+
+
+# --- SUBSTITUTOS ---
+class _Response:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+class StandIn(ReplayProvider):
+    """
+    Yahoo Finance (replay do fixture) e BCB em memória. `latency` (segundos) simula
+    o tempo de rede de cada chamada; `calls` conta as chamadas para conferir que os
+    caches funcionam.
+    """
+    name = "standin"
+
+    def __init__(self, snapshot, selic, latency=0.0):
+        # Replay relativo a hoje: mesmas barras, datas terminando no último dia útil
+        super().__init__(snapshot)
+        self.selic = selic
+        self.latency = latency
+        self.calls = {"download": 0, "bcb": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot(self):
+        return self.frame
+
+    def _count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def fetch(self, ticker, fields, period=None, start=None):
+        self._count("download")
+        return super().fetch(ticker, fields, period=period, start=start)
+
+    def get(self, url, **kwargs):
+        self._count("bcb")
+        return _Response(self.selic)
+
+
+def install(latency=0.0):
+    """Substitui Yahoo e BCB nos serviços da API (chamar antes de qualquer requisição)."""
+    from src.api.services.ohlcv_store import ohlcv_store
+    selic_provider = importlib.import_module("src.api.services.selic_provider")
+
+    snapshot, selic = load_fixtures()
+    standin = StandIn(snapshot, selic, latency)
+    ohlcv_store.client = MarketDataClient([standin])
+    selic_provider.requests = SimpleNamespace(get=standin.get)
+    return standin
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fixtures de mercado dos benchmarks.")
+    parser.add_argument("command", choices=["record", "synthetic", "session"])
+    args = parser.parse_args(argv)
+    if args.command == "session":
+        from src.api.config import DEFAULT_TICKER
+        df = record_session(DEFAULT_TICKER)
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        df.to_csv(SESSION_FIXTURE)
+        print(f"💾 Pregão gravado: {len(df)} candles de {DEFAULT_TICKER} → {SESSION_FIXTURE}")
+        return 0
+    save_fixtures(*(record_fixtures() if args.command == "record" else synthetic_fixtures()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
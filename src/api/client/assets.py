@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse, Response
+
+from src.api.services.http_cache import etag_matches
+
+try:
+    import brotli
+except ImportError:  # extra `speedups`: sem ele, só gzip
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# URLs com hash do conteúdo nunca mudam: cache de um ano. O nome sem hash precisa revalidar.
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE = {".css", ".js", ".html", ".json", ".map", ".svg", ".txt"}
+
+
+class Asset:
+    """Arquivo estático em memória com o hash do conteúdo e as versões gzip/brotli comprimidas uma única vez."""
+
+    def __init__(self, path, content):
+        self.content = content
+        self.digest = hashlib.sha256(content).hexdigest()[:12]
+        self.etag = f'"{self.digest}"'
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.encoded = {}
+        if os.path.splitext(path)[1] in COMPRESSIBLE:
+            variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants["br"] = brotli.compress(content, quality=11)
+            # Só guarda a versão comprimida quando ela realmente é menor
+            self.encoded = {name: body for name, body in variants.items() if len(body) < len(content)}
+
+    def negotiate(self, accept_encoding):
+        """(corpo, Content-Encoding) conforme o Accept-Encoding do cliente: br > gzip > sem compressão."""
+        accepted = set()
+        for token in accept_encoding.split(","):
+            name, _, params = token.partition(";")
+            quality = params.strip().removeprefix("q=")
+            try:
+                refused = bool(params.strip()) and float(quality) == 0
+            except ValueError:
+                refused = False
+            if not refused:
+                accepted.add(name.strip().lower())
+        for name in ("br", "gzip"):
+            if name in self.encoded and (name in accepted or "*" in accepted):
+                return self.encoded[name], name
+        return self.content, None
+
+
+class StaticAssets:
+    """
+    App ASGI de /static com os arquivos carregados e comprimidos na inicialização.
+
+    Cada arquivo responde no caminho original (Cache-Control: no-cache + ETag) e
+    num caminho com o hash do conteúdo (ex.: js/main.3f2a9c1b7d4e.js) com cache de
+    um ano e `immutable`. Os templates usam `static_url()`, que devolve o caminho
+    com hash: um deploy que muda o arquivo muda a URL.
+    """
+
+    def __init__(self, directory=STATIC_DIR, prefix="/static"):
+        self.prefix = prefix
+        self._routes = {}   # caminho relativo -> (Asset, Cache-Control)
+        self._urls = {}     # caminho original -> caminho com hash
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                full = os.path.join(root, filename)
+                rel = os.path.relpath(full, directory).replace(os.sep, "/")
+                with open(full, "rb") as f:
+                    asset = Asset(rel, f.read())
+                stem, ext = os.path.splitext(rel)
+                hashed = f"{stem}.{asset.digest}{ext}"
+                self._routes[rel] = (asset, REVALIDATE)
+                self._routes[hashed] = (asset, IMMUTABLE)
+                self._urls[rel] = hashed
+
+    def url(self, path):
+        """URL versionada de um arquivo estático (caminho original se ele não existir)."""
+        return f"{self.prefix}/{self._urls.get(path, path)}"
+
+    async def __call__(self, scope, receive, send):
+        path = scope["path"]
+        root = scope.get("root_path", "")
+        if root and path.startswith(root):
+            path = path[len(root):]
+        response = self._respond(scope, path.lstrip("/"))
+        await response(scope, receive, send)
+
+    def _respond(self, scope, path):
+        if scope["method"] not in ("GET", "HEAD"):
+            return PlainTextResponse("Method Not Allowed", status_code=405)
+        route = self._routes.get(path)
+        if route is None:
+            return PlainTextResponse("Not Found", status_code=404)
+        asset, cache_control = route
+        request_headers = Headers(scope=scope)
+        headers = {"ETag": asset.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        if etag_matches(request_headers.get("if-none-match"), asset.etag):
+            return Response(status_code=304, headers=headers)
+
+        body, encoding = asset.negotiate(request_headers.get("accept-encoding", ""))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        # Em HEAD o servidor descarta o corpo e mantém o Content-Length
+        return Response(body, headers=headers, media_type=asset.media_type)
+
+
+static_assets = StaticAssets()
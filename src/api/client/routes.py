@@ -4,10 +4,14 @@ from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from datetime import datetime
 
+from api.client.assets import static_assets
+
 router = APIRouter(tags=["Cliente"])
 
 # Configurar templates
 templates = Jinja2Templates(directory="src/api/client/templates")
+# {{ static_url('js/main.js') }} -> /static/js/main.<hash>.js
+templates.env.globals["static_url"] = static_assets.url
 
 @router.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -14,11 +14,44 @@ function criarCardIndicador(titulo, valor, cor="blue") {
     `;
 }
 
+// --- STREAM DE PREVISÕES (Server-Sent Events) ---
+// O servidor calcula a projeção uma vez por mudança de dados e envia o mesmo payload
+// (5 dias) a todas as abas; aqui só recortamos os dias pedidos.
+let ultimaPrevisao = null;
+let previsaoExibida = false;
+
+function diasSelecionados() {
+    return Math.min(5, Math.max(1, parseInt(document.getElementById('dias').value) || 1));
+}
+
+function exibirPrevisao(data) {
+    mostrarResultado({ ...data, previsoes: data.previsoes.slice(0, diasSelecionados()) });
+    previsaoExibida = true;
+}
+
+function assinarPrevisoes() {
+    if (!window.EventSource) return;  // navegadores sem SSE usam só o GET /api/predict
+    const fonte = new EventSource('/api/stream/predict');
+    fonte.addEventListener('previsao', (evento) => {
+        ultimaPrevisao = JSON.parse(evento.data);
+        console.log("Nova previsão recebida pelo stream:", ultimaPrevisao.data_geracao); // Debug
+        // Dashboard já aberto: atualiza sem nova requisição
+        if (previsaoExibida) exibirPrevisao(ultimaPrevisao);
+    });
+    // Em caso de erro o EventSource reconecta sozinho (retry enviado pelo servidor)
+}
+
 async function fazerPrevisao() {
     console.log("Iniciando previsão..."); // Debug
     const dias = document.getElementById('dias').value;
     const loadingDiv = document.getElementById('loading');
     const resultadoDiv = document.getElementById('resultado');
+
+    // Projeção completa já recebida pelo stream: nenhum recálculo no servidor
+    if (ultimaPrevisao) {
+        exibirPrevisao(ultimaPrevisao);
+        return;
+    }
     
     // Limpar resultado anterior
     resultadoDiv.innerHTML = '';
@@ -27,15 +60,10 @@ async function fazerPrevisao() {
     loadingDiv.style.display = 'block';
     
     try {
-        console.log("Enviando dados:", JSON.stringify({ dias: parseInt(dias) })); // Debug
+        console.log("Consultando previsão para", parseInt(dias), "dias"); // Debug
 
-        const response = await fetch('/api/predict', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ dias: parseInt(dias) })
-        });
+        // GET cacheável: o navegador revalida com If-None-Match e recebe 304 se nada mudou
+        const response = await fetch(`/api/predict?dias=${parseInt(dias)}`);
         
         console.log("Status da resposta:", response.status); // Debug
 
@@ -61,6 +89,7 @@ async function fazerPrevisao() {
         
         loadingDiv.style.display = 'none';
         mostrarResultado(data);
+        previsaoExibida = true;
         
     } catch (error) {
         console.error("Erro capturado:", error); // Debug
@@ -232,7 +261,10 @@ function mostrarResultado(data) {
         html += `
             <tr>
                 <td>${previsao.data_previsao}</td>
-                <td style="font-weight: bold; font-size: 1.1rem;">${fmtMoeda(previsao.preco_previsto)}</td>
+                <td style="font-weight: bold; font-size: 1.1rem;">
+                    ${fmtMoeda(previsao.preco_previsto)}
+                    ${previsao.preco_minimo != null ? `<div style="font-size: 0.75rem; font-weight: normal; color: #64748b;">${fmtMoeda(previsao.preco_minimo)} – ${fmtMoeda(previsao.preco_maximo)}</div>` : ''}
+                </td>
                 <td style="color: ${corVar}; font-weight: 600;">
                     ${icone} ${Math.abs(variacao).toFixed(2)}%
                 </td>
@@ -264,6 +296,8 @@ function mostrarResultado(data) {
 
 // Event listeners
 document.addEventListener('DOMContentLoaded', function() {
+    assinarPrevisoes();
+
     const diasInput = document.getElementById('dias');
     
     if (diasInput) {
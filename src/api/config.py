@@ -8,6 +8,9 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Caminho onde ficam os artefatos (.keras, .pkl) ../models
 MODELS_DIR = os.path.join(BASE_DIR, "models")
 
+# Identificador do modelo exposto na resposta (campo modelo_usado)
+MODEL_NAME = os.getenv("MODEL_NAME", "LSTM_PETR4_Prod_Real_v1")
+
 MODEL_FILENAME = "lstm_petr4_final.keras"
 SCALER_X_FILENAME = "scaler_x_final.pkl"
 SCALER_Y_FILENAME = "scaler_y_final.pkl"
@@ -15,3 +18,166 @@ SCALER_Y_FILENAME = "scaler_y_final.pkl"
 MODEL_PATH = os.path.join(MODELS_DIR, MODEL_FILENAME)
 SCALER_X_PATH = os.path.join(MODELS_DIR, SCALER_X_FILENAME)
 SCALER_Y_PATH = os.path.join(MODELS_DIR, SCALER_Y_FILENAME)
+
+# --- INSTRUMENTOS ---
+# Ativo principal (rota /api/predict), servido pelos artefatos acima
+DEFAULT_TICKER = "PETR4.SA"
+# Demais ativos: um diretório por ticker em models/ (ex.: models/VALE3.SA/) com estes arquivos
+INSTRUMENT_MODEL_FILENAME = "lstm.keras"
+INSTRUMENT_SCALER_X_FILENAME = "scaler_x.pkl"
+INSTRUMENT_SCALER_Y_FILENAME = "scaler_y.pkl"
+
+# --- REGISTRO DE MODELOS (versões com manifest, troca sem reiniciar) ---
+# Um diretório por ativo com uma subpasta por versão (ver services/model_registry.py);
+# quando o ativo tem versões publicadas, a estável substitui os artefatos acima
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(MODELS_DIR, "registry"))
+# Intervalo (segundos) entre verificações do registro; 0 desativa a troca em execução
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "30"))
+# Percentual do tráfego de /predict enviado à versão canário (quando canal.json não define)
+MODEL_CANARY_PERCENT = float(os.getenv("MODEL_CANARY_PERCENT", "10"))
+
+# --- MERCADO (B3) ---
+# Séries macro usadas por todos os modelos (baixadas uma única vez para todos os ativos)
+MACRO_TICKERS = {"usd": "BRL=X", "brent": "BZ=F", "ibov": "^BVSP"}
+# Campos usados de cada ativo (as séries macro só precisam do fechamento)
+INSTRUMENT_FIELDS = ["Close", "High", "Low", "Volume"]
+# Janela de histórico entregue ao pipeline (anos)
+MARKET_HISTORY_YEARS = int(os.getenv("MARKET_HISTORY_YEARS", "2"))
+MARKET_HISTORY_PERIOD = f"{MARKET_HISTORY_YEARS}y"
+# Dias já gravados que o download incremental baixa de novo: se algum pregão fechado vier
+# diferente (proventos/desdobramentos reajustam os preços anteriores), o ticker é rebaixado inteiro
+MARKET_DELTA_OVERLAP_DAYS = int(os.getenv("MARKET_DELTA_OVERLAP_DAYS", "10"))
+# Timeout (segundos) de cada download do Yahoo Finance (um ticker por chamada)
+MARKET_FETCH_TIMEOUT = float(os.getenv("MARKET_FETCH_TIMEOUT", "10"))
+
+# Dados locais persistidos (histórico OHLCV, caches)
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(BASE_DIR, "data"))
+OHLCV_STORE_DIR = os.path.join(DATA_DIR, "ohlcv")
+
+# Provedores de dados de mercado, em ordem de preferência (os seguintes só são usados se o anterior falhar):
+# yahoo | replay (histórico gravado em MARKET_REPLAY_PATH) | synthetic (passeio aleatório determinístico, offline)
+MARKET_PROVIDERS = [p.strip() for p in os.getenv("MARKET_PROVIDERS", "yahoo").split(",") if p.strip()]
+MARKET_REPLAY_PATH = os.getenv("MARKET_REPLAY_PATH", os.path.join(DATA_DIR, "market_replay.csv.gz"))
+# Downloads simultâneos (um por ticker)
+MARKET_FETCH_CONCURRENCY = int(os.getenv("MARKET_FETCH_CONCURRENCY", "8"))
+# Novas tentativas por ticker após falha ou timeout, com espera exponencial a partir de MARKET_FETCH_BACKOFF segundos
+MARKET_FETCH_RETRIES = int(os.getenv("MARKET_FETCH_RETRIES", "2"))
+MARKET_FETCH_BACKOFF = float(os.getenv("MARKET_FETCH_BACKOFF", "0.5"))
+# Requisição duplicada (hedge) se a primeira não responder em N segundos (0 desativa)
+MARKET_HEDGE_AFTER = float(os.getenv("MARKET_HEDGE_AFTER", "2"))
+# Circuit breaker: abre após N falhas seguidas e só volta a testar o provedor após N segundos
+MARKET_BREAKER_FAILURES = int(os.getenv("MARKET_BREAKER_FAILURES", "3"))
+MARKET_BREAKER_RESET = float(os.getenv("MARKET_BREAKER_RESET", "60"))
+
+# Pregão regular da B3 (horário de Brasília). O fechamento inclui uma margem
+# para o Yahoo publicar o candle final do dia.
+MARKET_TIMEZONE = "America/Sao_Paulo"
+MARKET_OPEN_TIME = os.getenv("MARKET_OPEN_TIME", "10:00")
+MARKET_CLOSE_TIME = os.getenv("MARKET_CLOSE_TIME", "18:00")
+
+# TTL (segundos) do snapshot de mercado enquanto o pregão está aberto.
+# Fora do pregão o snapshot vale até a próxima abertura.
+MARKET_CACHE_TTL_OPEN = int(os.getenv("MARKET_CACHE_TTL_OPEN", "300"))
+# Espera (segundos) antes de tentar de novo quando o download falha e há snapshot antigo
+MARKET_CACHE_RETRY_AFTER = int(os.getenv("MARKET_CACHE_RETRY_AFTER", "30"))
+
+# --- CACHE DE PREVISÕES ---
+# A projeção é calculada uma vez por candle/modelo até o horizonte máximo e fatiada por requisição
+PREDICTION_HORIZON_DAYS = 5
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4"))
+# Pré-aquecimento do cache logo após o fechamento da B3
+PREDICTION_PREWARM = os.getenv("PREDICTION_PREWARM", "true").lower() == "true"
+# Stream SSE (/api/stream/predict): intervalo (s) entre consultas do produtor ao cache de previsões,
+# que também é o intervalo do keep-alive enviado aos clientes
+PREDICTION_STREAM_INTERVAL = float(os.getenv("PREDICTION_STREAM_INTERVAL", "15"))
+
+# --- INCERTEZA ---
+# Faixas de previsão por MC-dropout (amostra o Dropout antes da Dense de saída); "off" mantém
+# a confiança fixa por horizonte
+UNCERTAINTY_MODE = os.getenv("UNCERTAINTY_MODE", "mc_dropout")
+# Trajetórias amostradas por previsão (todas num único matmul da cabeça do modelo)
+UNCERTAINTY_SAMPLES = int(os.getenv("UNCERTAINTY_SAMPLES", "256"))
+# Quantis (inferior, superior) da faixa devolvida por dia
+UNCERTAINTY_QUANTILES = tuple(float(q) for q in os.getenv("UNCERTAINTY_QUANTILES", "0.1,0.9").split(","))
+
+# --- INTRADAY ---
+# Durante o pregão, cada candle de INTRADAY_INTERVAL revisa o candle diário em formação e
+# re-pontua só a janela mais recente (previsão D+1 renovada a cada barra)
+INTRADAY_ENABLED = os.getenv("INTRADAY_ENABLED", "false").lower() == "true"
+INTRADAY_INTERVAL = os.getenv("INTRADAY_INTERVAL", "5m")  # 1m | 5m
+# Capacidade fixa dos buffers circulares por ativo: barras do pregão atual e candles diários anteriores
+INTRADAY_SESSION_CAPACITY = int(os.getenv("INTRADAY_SESSION_CAPACITY", "512"))
+INTRADAY_HISTORY_CAPACITY = int(os.getenv("INTRADAY_HISTORY_CAPACITY", "1024"))
+
+# --- ÍNDICE HISTÓRICO DE PREVISÕES ---
+# Janelas por forward pass ao pontuar todo o histórico
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "256"))
+# Candles necessários para o indicador mais longo (SMA 200) ficar completo
+HISTORY_WARMUP_ROWS = 200
+# Janelas (pregões) do MAPE móvel no backtest walk-forward
+BACKTEST_WINDOWS = tuple(int(w) for w in os.getenv("BACKTEST_WINDOWS", "20,60,250").split(","))
+
+# --- SHADOW TEST (avaliação diária fora do caminho da requisição) ---
+# Resultado de cada pregão fechado (previsto na véspera x fechamento real) em SQLite
+SHADOW_STORE_PATH = os.getenv("SHADOW_STORE_PATH", os.path.join(DATA_DIR, "shadow.sqlite"))
+# Janelas (pregões) do MAPE móvel publicado a partir do store
+SHADOW_WINDOWS = tuple(int(w) for w in os.getenv("SHADOW_WINDOWS", "5,20").split(","))
+
+# --- SELIC (Banco Central, SGS série 432) ---
+BCB_SGS_URL = os.getenv("BCB_SGS_URL", "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{serie}/dados")
+SELIC_SERIES = 432
+# Quantos registros finais da série pedir (a Selic muda no máximo a cada reunião do COPOM)
+SELIC_TAIL = int(os.getenv("SELIC_TAIL", "5"))
+SELIC_FETCH_TIMEOUT = float(os.getenv("SELIC_FETCH_TIMEOUT", "5"))
+# Atualização diária em segundo plano (horário de Brasília) e nova tentativa após falha (segundos)
+SELIC_REFRESH_TIME = os.getenv("SELIC_REFRESH_TIME", "09:30")
+SELIC_RETRY_AFTER = int(os.getenv("SELIC_RETRY_AFTER", "900"))
+# Valor usado pelo modelo enquanto nenhuma Selic foi obtida
+SELIC_FALLBACK = float(os.getenv("SELIC_FALLBACK", "11.25"))
+SELIC_STORE_PATH = os.path.join(DATA_DIR, "selic.json")
+
+# --- EXECUTORES (I/O de rede e inferência fora do event loop) ---
+# Downloads (Yahoo/BCB) rodam num pool de threads dedicado
+IO_EXECUTOR_WORKERS = int(os.getenv("IO_EXECUTOR_WORKERS", "8"))
+IO_EXECUTOR_MAX_QUEUE = int(os.getenv("IO_EXECUTOR_MAX_QUEUE", "256"))
+# Inferência é CPU-bound: poucas threads (o TensorFlow já paraleliza internamente)
+INFERENCE_EXECUTOR_WORKERS = int(os.getenv("INFERENCE_EXECUTOR_WORKERS", "2"))
+INFERENCE_EXECUTOR_MAX_QUEUE = int(os.getenv("INFERENCE_EXECUTOR_MAX_QUEUE", "64"))
+
+# --- MODO DE IMPLANTAÇÃO ---
+# local: cada processo HTTP carrega modelo, caches e downloads (padrão, 1 worker)
+# remote: os workers HTTP só atendem requisições e delegam features, caches e inferência
+#         a um único processo de inferência via socket Unix (python -m src.api.inference_server)
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local")
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "/tmp/tc_fiap_inference.sock")
+# Timeout (segundos) de uma chamada ao processo de inferência
+INFERENCE_RPC_TIMEOUT = float(os.getenv("INFERENCE_RPC_TIMEOUT", "30"))
+# Porta onde o processo de inferência expõe as próprias métricas do Prometheus
+INFERENCE_METRICS_PORT = int(os.getenv("INFERENCE_METRICS_PORT", "8001"))
+# Workers HTTP iniciados por `python -m src.api.run`
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+# Métricas com vários workers: arquivos mmap do prometheus_client (modo multiprocess), agregados
+# no /metrics de qualquer worker. Vazio com um único worker (métricas em memória, como antes)
+METRICS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or ("/tmp/tc_fiap_metrics" if API_WORKERS > 1 else "")
+
+# --- MICRO-BATCHING DA LSTM ---
+# Janelas de requisições concorrentes são agrupadas por até N ms num único forward pass
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "3"))
+INFERENCE_BATCH_MAX_SIZE = int(os.getenv("INFERENCE_BATCH_MAX_SIZE", "32"))
+
+# --- BACKEND DE INFERÊNCIA ---
+# keras | tf_function | tflite | onnx | numpy | auto (mede todos os disponíveis e usa o mais rápido)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "tf_function")
+# Quantização dinâmica (int8 nos pesos) para os backends exportados (tflite/onnx)
+INFERENCE_QUANTIZE = os.getenv("INFERENCE_QUANTIZE", "false").lower() == "true"
+# Diferença máxima aceita entre o backend e o Keras (saída escalada do modelo)
+INFERENCE_PARITY_ATOL = float(os.getenv("INFERENCE_PARITY_ATOL", "1e-4"))
+INFERENCE_PARITY_ATOL_QUANTIZED = float(os.getenv("INFERENCE_PARITY_ATOL_QUANTIZED", "5e-3"))
+
+# --- TELEMETRIA ---
+# Spans OpenTelemetry por etapa da previsão (requer o extra `tracing`); o exportador
+# OTLP lê o destino de OTEL_EXPORTER_OTLP_ENDPOINT (padrão: http://localhost:4318)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACING_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "tc-fiap-fase4")
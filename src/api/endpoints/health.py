@@ -1,8 +1,18 @@
 # src/api/endpoints/health.py
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from src.api.services.serving import serving
 
 router = APIRouter(tags=['Monitoring'])
 
 @router.get("/health")
 def health_check():
+    """Liveness: o processo está de pé (não depende do modelo)."""
     return {"status": "ok"}
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness: 200 só depois que o modelo principal passou pelo warm-up; 503 durante a carga ou após falha."""
+    state = await serving.readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
@@ -0,0 +1,113 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from src.api.config import DEFAULT_TICKER
+from src.api.schemas.prediction import BacktestResponse, HistoricalPredictionResponse
+from src.api.services.backtest import report_to_dict
+from src.api.services.executors import ExecutorSaturatedError
+from src.api.services.instruments import instrument_registry
+from src.api.services.market_providers import MarketDataError
+from src.api.services.serving import ModelNotReadyError, serving
+from src.api.services.telemetry import json_response
+
+router = APIRouter(tags=["Histórico"])
+
+
+@router.get("/historico", response_model=HistoricalPredictionResponse)
+async def historical_predictions(
+    data: Optional[date] = Query(None, description="Pregão de referência (YYYY-MM-DD)"),
+    inicio: Optional[date] = Query(None, description="Início do intervalo (inclusivo)"),
+    fim: Optional[date] = Query(None, description="Fim do intervalo (inclusivo)"),
+):
+    """Previsão D+1 que o modelo faz para um pregão passado (`data`) ou um intervalo (`inicio`/`fim`)."""
+    return await _historico(DEFAULT_TICKER, data, inicio, fim)
+
+
+@router.get("/historico/{ticker}", response_model=HistoricalPredictionResponse)
+async def historical_predictions_ticker(
+    ticker: str,
+    data: Optional[date] = Query(None, description="Pregão de referência (YYYY-MM-DD)"),
+    inicio: Optional[date] = Query(None, description="Início do intervalo (inclusivo)"),
+    fim: Optional[date] = Query(None, description="Fim do intervalo (inclusivo)"),
+):
+    """Mesma consulta de /historico para qualquer ativo do registro."""
+    instrument = instrument_registry.get(ticker)
+    if instrument is None:
+        raise HTTPException(status_code=404, detail=f"Ativo não disponível: {ticker}. Disponíveis: {', '.join(instrument_registry.tickers)}")
+    return await _historico(instrument.ticker, data, inicio, fim)
+
+
+@router.get("/backtest", response_model=BacktestResponse)
+async def backtest():
+    """Backtest walk-forward (MAE, MAPE e acerto direcional por horizonte) sobre todo o histórico."""
+    return await _backtest(DEFAULT_TICKER)
+
+
+@router.get("/backtest/{ticker}", response_model=BacktestResponse)
+async def backtest_ticker(ticker: str):
+    """Mesmo backtest de /backtest para qualquer ativo do registro."""
+    instrument = instrument_registry.get(ticker)
+    if instrument is None:
+        raise HTTPException(status_code=404, detail=f"Ativo não disponível: {ticker}. Disponíveis: {', '.join(instrument_registry.tickers)}")
+    return await _backtest(instrument.ticker)
+
+
+async def _backtest(ticker):
+    try:
+        # Reaproveita o índice histórico: nenhuma inferência além da construção do índice
+        return json_response(BacktestResponse(**report_to_dict(await serving.backtest(ticker))), route="backtest")
+
+    except HTTPException:
+        raise
+    except ModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=f"Servidor sobrecarregado: {str(e)}")
+    except MarketDataError as e:
+        raise HTTPException(status_code=503, detail=f"Dados de mercado indisponíveis: {str(e)}")
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+
+async def _historico(ticker, data, inicio, fim):
+    if data is not None and (inicio is not None or fim is not None):
+        raise HTTPException(status_code=422, detail="Informe `data` ou o intervalo `inicio`/`fim`, não ambos.")
+    if data is None and inicio is None and fim is None:
+        raise HTTPException(status_code=422, detail="Informe `data` ou o intervalo `inicio`/`fim`.")
+    if inicio is not None and fim is not None and inicio > fim:
+        raise HTTPException(status_code=422, detail="`inicio` deve ser anterior ou igual a `fim`.")
+
+    try:
+        # Índice construído uma vez por snapshot; a consulta é só um fatiamento
+        index = await serving.history(ticker)
+        if data is not None:
+            pos = index.locate(data)
+            if pos is None:
+                raise HTTPException(status_code=404, detail=f"Sem previsão para {data}: não houve pregão ou o histórico não cobre a data.")
+            window = slice(pos, pos + 1)
+        else:
+            window = index.slice(inicio, fim)
+
+        return json_response(HistoricalPredictionResponse(
+            modelo_usado=index.modelo,
+            ticker=ticker,
+            data_geracao=index.gerado_em,
+            previsoes=index.rows(window),
+        ), route="historico")
+
+    except HTTPException:
+        raise
+    except ModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=f"Servidor sobrecarregado: {str(e)}")
+    except MarketDataError as e:
+        raise HTTPException(status_code=503, detail=f"Dados de mercado indisponíveis: {str(e)}")
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException
+
+from src.api.config import DEFAULT_TICKER, INTRADAY_ENABLED, INTRADAY_INTERVAL
+from src.api.schemas.prediction import IntradayPredictionResponse
+from src.api.services.executors import ExecutorSaturatedError
+from src.api.services.instruments import instrument_registry
+from src.api.services.serving import ModelNotReadyError, serving
+from src.api.services.telemetry import json_response
+
+router = APIRouter(tags=["Intraday"])
+
+
+@router.get("/intraday", response_model=IntradayPredictionResponse)
+async def intraday():
+    """Previsão D+1 renovada a cada candle intraday do pregão atual (INTRADAY_ENABLED=true)."""
+    return await _intraday(DEFAULT_TICKER)
+
+
+@router.get("/intraday/{ticker}", response_model=IntradayPredictionResponse)
+async def intraday_ticker(ticker: str):
+    """Mesma consulta de /intraday para qualquer ativo do registro."""
+    instrument = instrument_registry.get(ticker)
+    if instrument is None:
+        raise HTTPException(status_code=404, detail=f"Ativo não disponível: {ticker}. Disponíveis: {', '.join(instrument_registry.tickers)}")
+    return await _intraday(instrument.ticker)
+
+
+async def _intraday(ticker):
+    if not INTRADAY_ENABLED:
+        raise HTTPException(status_code=404, detail="Modo intraday desativado (INTRADAY_ENABLED=false).")
+    try:
+        previsao = await serving.intraday(ticker)
+    except ModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=f"Servidor sobrecarregado: {str(e)}")
+    if previsao is None:
+        raise HTTPException(status_code=404, detail=f"Nenhum candle intraday de {ticker} no pregão atual.")
+
+    return json_response(IntradayPredictionResponse(
+        modelo_usado=previsao.modelo,
+        ticker=ticker,
+        intervalo=INTRADAY_INTERVAL,
+        barra=previsao.barra,
+        preco_atual=round(previsao.preco_atual, 2),
+        preco_previsto=round(previsao.preco_previsto, 2),
+        barras_sessao=previsao.barras_sessao,
+        data_geracao=previsao.gerado_em,
+    ), route="intraday")
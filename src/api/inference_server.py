@@ -0,0 +1,89 @@
+"""
+Processo de inferência compartilhado (INFERENCE_MODE=remote).
+
+Um único processo carrega TensorFlow, modelos e scalers, baixa os dados de
+mercado, calcula as features e mantém os caches. Os workers HTTP falam com ele
+por um socket Unix local (ver services/serving.py).
+
+Uso (a partir da raiz do projeto):
+    python -m src.api.inference_server
+"""
+import asyncio
+import os
+import signal
+
+from prometheus_client import start_http_server
+
+from src.api.config import INFERENCE_SOCKET, INFERENCE_METRICS_PORT
+from src.api.lifecycle import background_services
+from src.api.services.serving import LocalServing, read_message, write_message
+from src.api.services.telemetry import setup_tracing
+
+
+class InferenceServer:
+    def __init__(self, path=INFERENCE_SOCKET, serving=None):
+        self.path = path
+        self.serving = serving or LocalServing()
+        self._handlers = {
+            "readiness": self.serving.readiness,
+            "predict": self.serving.predict,
+            "history": self.serving.history,
+            "backtest": self.serving.backtest,
+            "intraday": self.serving.intraday,
+        }
+
+    async def _dispatch(self, message, writer):
+        try:
+            result = await self._handlers[message["op"]](*message["args"])
+            response = {"id": message["id"], "ok": True, "result": result}
+        except Exception as e:
+            response = {"id": message["id"], "ok": False, "error_type": type(e).__name__, "error": str(e)}
+        if not writer.is_closing():
+            write_message(writer, response)
+            await writer.drain()
+
+    async def _handle(self, reader, writer):
+        # Cada mensagem vira uma tarefa: chamadas concorrentes de todos os workers
+        # chegam juntas ao batcher e ao cache de previsões
+        tasks = set()
+        try:
+            while True:
+                message = await read_message(reader)
+                task = asyncio.ensure_future(self._dispatch(message, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        # Só o próprio usuário conversa com o processo de inferência
+        os.chmod(self.path, 0o600)
+        print(f"🧠 Processo de inferência ouvindo em {self.path} (métricas na porta {INFERENCE_METRICS_PORT})")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        async with server, background_services():
+            await stop.wait()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def main():
+    start_http_server(INFERENCE_METRICS_PORT)
+    # Spans das etapas ficam neste processo (não há propagação de contexto pelo socket)
+    setup_tracing()
+    asyncio.run(InferenceServer().serve())
+
+
+if __name__ == "__main__":
+    main()
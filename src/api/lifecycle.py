@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from src.api.config import PREDICTION_PREWARM, INFERENCE_MODE, INTRADAY_ENABLED, MODEL_REGISTRY_POLL_SECONDS
+from src.api.services.intraday import intraday_service
+from src.api.services import metrics_multiprocess
+from src.api.services.ml_artifacts import load_all
+from src.api.services.model_rollout import model_rollout
+from src.api.services.prediction_service import prediction_service
+from src.api.services.selic_provider import selic_provider
+from src.api.services.telemetry import setup_tracing
+
+
+async def _load_models():
+    """Carrega TensorFlow e modelos fora do event loop; depois inicia o pré-aquecimento e o registro de modelos."""
+    await asyncio.to_thread(load_all)
+    loops = []
+    # Registro de modelos: versões novas carregadas em segundo plano e trocadas sem reiniciar
+    if MODEL_REGISTRY_POLL_SECONDS > 0:
+        loops.append(model_rollout.run_watch_loop())
+    # Previsões: calcula na subida e logo após cada fechamento da B3
+    if PREDICTION_PREWARM:
+        loops.append(prediction_service.run_prewarm_loop())
+    await asyncio.gather(*loops)
+
+
+@asynccontextmanager
+async def background_services():
+    """Selic, carga dos modelos e pré-aquecimento: rodam no processo que faz a inferência."""
+    # Selic: carrega o último valor salvo e agenda a atualização diária (a consulta ao BCB
+    # roda numa thread, inclusive a primeira: não bloqueia o event loop nem a subida)
+    selic_provider.start()
+    # Modelos carregam em segundo plano: /, /about e /api/health respondem durante a carga
+    # e /api/ready só fica pronto após o warm-up
+    startup = asyncio.create_task(_load_models())
+    # Intraday: candles do pregão re-pontuados a cada INTRADAY_INTERVAL (espera os modelos carregarem)
+    intraday = asyncio.create_task(intraday_service.run_live_loop()) if INTRADAY_ENABLED else None
+    try:
+        yield
+    finally:
+        startup.cancel()
+        if intraday is not None:
+            intraday.cancel()
+        selic_provider.stop()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Inicia e encerra as tarefas de fundo da API."""
+    setup_tracing()
+    try:
+        # No modo remote os workers HTTP só encaminham requisições ao processo de inferência
+        if INFERENCE_MODE == "remote":
+            yield
+            return
+        async with background_services():
+            yield
+    finally:
+        metrics_multiprocess.mark_worker_exit()
+
+
+def expose_metrics(app, instrumentator):
+    """
+    Endpoint /metrics. Fica aqui (e não no main.py, que importa pela raiz `api.`) para
+    usar o mesmo módulo src.api.services.metrics_multiprocess do resto da aplicação.
+    """
+    if metrics_multiprocess.enabled():
+        # Vários workers: o /metrics agrega os arquivos de todos eles e limpa os que morreram
+        app.add_route("/metrics", metrics_multiprocess.metrics_endpoint, include_in_schema=False)
+    else:
+        instrumentator.expose(app)
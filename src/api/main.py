@@ -1,10 +1,11 @@
 # ~/dev/projects/python/tc_fiap_fase4/src/api/main.py
 import os
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 
 from api.client import routes as client_routes
-from api.endpoints import predict_petr4, health
+from api.client.assets import static_assets
+from api.endpoints import predict_petr4, historico, health, intraday
+from api.lifecycle import expose_metrics, lifespan
 
 from prometheus_fastapi_instrumentator import Instrumentator
 
@@ -12,6 +13,7 @@ app = FastAPI(
     title='Tech Challenge FIAP-6MELT - FASE4',
     description='Api para previsão de preços da ação PETR4.SA (Petrobras)',
     version='1.0.0',
+    lifespan=lifespan,
 )
 
 # 1. Obtém o diretório onde este arquivo (main.py) está: .../src/api/
@@ -29,17 +31,21 @@ print(f"📄 CONTEUDO DA PASTA:   {os.listdir(static_path) if os.path.isdir(stat
 print("="*30 + "\n")"""
 # --------------------------------------
 
-# Montar arquivos estáticos (CSS, JS, imagens)
-app.mount("/static", StaticFiles(directory=static_path), name="static")
+# Montar arquivos estáticos (CSS, JS, imagens): pré-comprimidos e com URLs versionadas por hash
+app.mount("/static", static_assets, name="static")
 
 # Incluir pagina cliente
 app.include_router(client_routes.router)
 # Incluir rotas da API
 app.include_router(predict_petr4.router, prefix="/api")
+app.include_router(historico.router, prefix="/api")
 app.include_router(health.router, prefix="/api")
+app.include_router(intraday.router, prefix="/api")
 
 # Cria automaticamente o endpoint /metrics que o Prometheus vai ler
-Instrumentator().instrument(app).expose(app)
+# (streams SSE ficam de fora: a "latência" deles é a duração da conexão)
+instrumentator = Instrumentator(excluded_handlers=["/api/stream/.*"]).instrument(app)
+expose_metrics(app, instrumentator)
 
 if __name__ == "__main__":
     import uvicorn
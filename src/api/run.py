@@ -0,0 +1,71 @@
+"""
+Sobe a API (uvicorn) conforme o modo de implantação.
+
+    python -m src.api.run
+
+- INFERENCE_MODE=local (padrão): cada worker HTTP carrega modelo, caches e downloads.
+- INFERENCE_MODE=remote: inicia primeiro o processo de inferência compartilhado e
+  depois API_WORKERS workers HTTP que falam com ele pelo socket Unix. O runtime do
+  TensorFlow, os modelos e os caches existem uma única vez, qualquer que seja N.
+
+Com mais de um worker as métricas do Prometheus passam ao modo multiprocess
+(METRICS_MULTIPROC_DIR): qualquer worker que receba o scrape responde pelo conjunto.
+"""
+import os
+import subprocess
+import sys
+import time
+
+import uvicorn
+
+from src.api.config import API_HOST, API_PORT, API_WORKERS, INFERENCE_MODE, INFERENCE_SOCKET, METRICS_MULTIPROC_DIR
+from src.api.services.metrics_multiprocess import prepare_directory
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _start_inference_server(timeout=60):
+    if os.path.exists(INFERENCE_SOCKET):
+        os.unlink(INFERENCE_SOCKET)
+    # O processo de inferência expõe as próprias métricas (INFERENCE_METRICS_PORT), fora dos arquivos dos workers
+    env = {k: v for k, v in os.environ.items() if k != "PROMETHEUS_MULTIPROC_DIR"}
+    process = subprocess.Popen([sys.executable, "-m", "src.api.inference_server"], env=env)
+    # O socket é criado antes da carga dos modelos; o /api/ready acompanha o resto
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(INFERENCE_SOCKET):
+        if process.poll() is not None:
+            raise SystemExit(f"❌ Processo de inferência terminou na inicialização (código {process.returncode}).")
+        if time.monotonic() > deadline:
+            process.terminate()
+            raise SystemExit(f"❌ Processo de inferência não abriu {INFERENCE_SOCKET} em {timeout}s.")
+        time.sleep(0.1)
+    return process
+
+
+def _prepare_metrics():
+    """Diretório limpo dos arquivos de métricas; os workers herdam PROMETHEUS_MULTIPROC_DIR."""
+    if not METRICS_MULTIPROC_DIR:
+        return
+    prepare_directory(METRICS_MULTIPROC_DIR)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = METRICS_MULTIPROC_DIR
+    print(f"📊 Métricas de {API_WORKERS} workers agregadas via {METRICS_MULTIPROC_DIR}")
+
+
+def main():
+    inference_server = None
+    if INFERENCE_MODE == "remote":
+        inference_server = _start_inference_server()
+    elif API_WORKERS > 1:
+        print(f"⚠️ {API_WORKERS} workers no modo local: cada um carrega sua cópia do TensorFlow e do modelo. "
+              "Use INFERENCE_MODE=remote para compartilhar um único processo de inferência.")
+    _prepare_metrics()
+    try:
+        uvicorn.run("api.main:app", host=API_HOST, port=API_PORT, workers=API_WORKERS, app_dir=SRC_DIR)
+    finally:
+        if inference_server is not None:
+            inference_server.terminate()
+            inference_server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 # --- SUB-MODELOS DE DADOS DE MERCADO ---
@@ -34,7 +34,9 @@ class PredictionItem(BaseModel):
     """Previsão individual por dia"""
     data_previsao: str = Field(..., description="Data alvo da previsão (DD/MM/YYYY)", example="16/01/2025")
     preco_previsto: float = Field(..., description="Preço de fechamento estimado (R$)", example=34.90)
-    confianca: Optional[float] = Field(None, description="Grau de confiança estatística (0.0 a 1.0)", ge=0, le=1, example=0.89)
+    confianca: Optional[float] = Field(None, description="Fração das trajetórias MC-dropout na mesma direção da previsão (0.0 a 1.0)", ge=0, le=1, example=0.89)
+    preco_minimo: Optional[float] = Field(None, description="Limite inferior da faixa de previsão (quantil inferior, R$)", example=33.95)
+    preco_maximo: Optional[float] = Field(None, description="Limite superior da faixa de previsão (quantil superior, R$)", example=35.70)
 
 class PredictionResponse(BaseModel):
     """Objeto raiz de resposta da API"""
@@ -68,8 +70,8 @@ class PredictionResponse(BaseModel):
                 }
             },
             "previsoes": [
-                {"data_previsao": "15/01/2025", "preco_previsto": 34.80, "confianca": 0.92},
-                {"data_previsao": "16/01/2025", "preco_previsto": 35.10, "confianca": 0.85}
+                {"data_previsao": "15/01/2025", "preco_previsto": 34.80, "confianca": 0.92, "preco_minimo": 34.10, "preco_maximo": 35.45},
+                {"data_previsao": "16/01/2025", "preco_previsto": 35.10, "confianca": 0.85, "preco_minimo": 34.05, "preco_maximo": 36.20}
             ]
         }
     })
@@ -83,3 +85,52 @@ class PredictionRequestSimple(BaseModel):
         le=5, 
         description="Número de dias futuros para prever."
     )
+
+# --- MODO INTRADAY ---
+class IntradayPredictionResponse(BaseModel):
+    """Previsão D+1 re-pontuada com o candle diário em formação (último candle intraday)"""
+    modelo_usado: str = Field(..., description="Identificador do modelo utilizado", example="LSTM_PETR4_Final_v1")
+    ticker: str = Field(..., description="Ativo consultado", example="PETR4.SA")
+    intervalo: str = Field(..., description="Duração de cada candle intraday", example="5m")
+    barra: datetime = Field(..., description="Instante (início) do último candle intraday aplicado")
+    preco_atual: float = Field(..., description="Fechamento do último candle intraday (R$)", example=34.62)
+    preco_previsto: float = Field(..., description="Fechamento estimado para o próximo pregão (D+1, R$)", example=34.90)
+    barras_sessao: int = Field(..., description="Candles intraday do pregão atual já aplicados", example=37)
+    data_geracao: datetime = Field(..., description="Timestamp da re-pontuação")
+
+# --- PREVISÕES HISTÓRICAS ("as-of") ---
+class HistoricalPredictionItem(BaseModel):
+    """Previsão que o modelo faz com a janela encerrada num pregão passado"""
+    data_referencia: str = Field(..., description="Pregão que encerra a janela do modelo (YYYY-MM-DD)", example="2025-01-14")
+    preco_fechamento: float = Field(..., description="Fechamento do pregão de referência (R$)", example=34.50)
+    preco_previsto: float = Field(..., description="Previsão para o pregão seguinte (D+1, R$)", example=34.80)
+    preco_real: Optional[float] = Field(None, description="Fechamento observado no pregão seguinte (vazio no último pregão)", example=34.95)
+    erro_percentual: Optional[float] = Field(None, description="Erro absoluto da previsão em relação ao preço real (%)", example=0.43)
+    indicadores_completos: bool = Field(..., description="Falso se a janela inclui candles anteriores ao aquecimento da SMA 200")
+
+class HistoricalPredictionResponse(BaseModel):
+    """Previsões D+1 para um pregão ou intervalo de pregões passados"""
+    modelo_usado: str = Field(..., description="Identificador do modelo utilizado", example="LSTM_PETR4_Final_v1")
+    ticker: str = Field(..., description="Ativo consultado", example="PETR4.SA")
+    data_geracao: datetime = Field(..., description="Timestamp de construção do índice histórico")
+    previsoes: List[HistoricalPredictionItem] = Field(..., description="Previsões por pregão, em ordem cronológica")
+
+# --- BACKTEST WALK-FORWARD ---
+class BacktestHorizon(BaseModel):
+    """Métricas do backtest para um horizonte de projeção"""
+    horizonte: int = Field(..., description="Dias à frente (1 = D+1)", example=1)
+    amostras: int = Field(..., description="Previsões avaliadas", example=280)
+    mae: Optional[float] = Field(None, description="Erro absoluto médio (R$)", example=0.62)
+    mape: Optional[float] = Field(None, description="Erro percentual absoluto médio (%)", example=1.85)
+    acerto_direcional: Optional[float] = Field(None, description="Fração de acertos da direção (0.0 a 1.0)", example=0.54)
+    mape_movel: Dict[str, Optional[float]] = Field(..., description="MAPE (%) dos últimos N pregões avaliados, por N", example={"20": 1.4, "60": 1.7})
+
+class BacktestResponse(BaseModel):
+    """Backtest walk-forward do modelo sobre o histórico do snapshot atual"""
+    ticker: str = Field(..., description="Ativo avaliado", example="PETR4.SA")
+    modelo: str = Field(..., description="Identificador do modelo avaliado", example="LSTM_PETR4_Final_v1")
+    inicio: Optional[str] = Field(None, description="Primeiro pregão avaliado (YYYY-MM-DD)")
+    fim: Optional[str] = Field(None, description="Último pregão avaliado (YYYY-MM-DD)")
+    horizontes: List[BacktestHorizon]
+    gerado_em: datetime = Field(..., description="Timestamp do cálculo")
+    duracao_ms: float = Field(..., description="Tempo de cálculo das métricas (ms)")
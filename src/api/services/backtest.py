@@ -0,0 +1,224 @@
+"""
+Backtest walk-forward da LSTM sobre todo o histórico do snapshot.
+
+Cada pregão do índice histórico tem a previsão que o modelo faz com a janela
+encerrada nele. A projeção de h dias replica a da API (D+1 composto pelo
+fator de tendência: preço * exp(log_ret) ** h) e é comparada com o fechamento
+observado h pregões depois. As métricas são recalculadas a cada snapshot, sem
+depender do tráfego de requisições.
+
+Uso (a partir da raiz do projeto):
+    python -m src.api.services.backtest --ticker PETR4 --json relatorio.json
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+
+import numpy as np
+from prometheus_client import Gauge, REGISTRY, write_to_textfile
+
+from src.api.config import DEFAULT_TICKER, PREDICTION_HORIZON_DAYS, BACKTEST_WINDOWS
+from src.api.services.feature_pipeline import get_pipeline
+from src.api.services.historical_index import HistoricalIndex, historical_index
+from src.api.services.instruments import instrument_registry
+from src.api.services.ml_artifacts import get_artifacts
+from src.api.services.selic_provider import selic_provider
+
+BACKTEST_MAE_GAUGE = Gauge('backtest_mae_brl', 'Backtest: erro absoluto médio (R$)', ['ticker', 'horizon'], multiprocess_mode='mostrecent')
+BACKTEST_MAPE_GAUGE = Gauge('backtest_mape_percentage', 'Backtest: erro percentual absoluto médio (%)', ['ticker', 'horizon'], multiprocess_mode='mostrecent')
+BACKTEST_DIRECTION_GAUGE = Gauge('backtest_directional_accuracy', 'Backtest: fração de acertos de direção', ['ticker', 'horizon'], multiprocess_mode='mostrecent')
+BACKTEST_ROLLING_MAPE_GAUGE = Gauge('backtest_rolling_mape_percentage', 'Backtest: MAPE (%) dos últimos N pregões', ['ticker', 'horizon', 'window'], multiprocess_mode='mostrecent')
+BACKTEST_SAMPLES_GAUGE = Gauge('backtest_samples', 'Backtest: previsões avaliadas', ['ticker', 'horizon'], multiprocess_mode='mostrecent')
+BACKTEST_LAST_BAR_GAUGE = Gauge('backtest_last_bar_timestamp_seconds', 'Backtest: último pregão avaliado (epoch)', ['ticker'], multiprocess_mode='mostrecent')
+
+
+@dataclass(frozen=True)
+class HorizonMetrics:
+    horizonte: int
+    amostras: int
+    mae: float
+    mape: float
+    acerto_direcional: float
+    mape_movel: dict        # {janela (pregões): MAPE dos últimos N pregões avaliados}
+
+
+@dataclass(frozen=True)
+class BacktestReport:
+    ticker: str
+    modelo: str
+    inicio: str
+    fim: str
+    horizontes: tuple
+    gerado_em: datetime
+    duracao_ms: float
+
+
+def _nan_to_none(value):
+    return None if value is None or np.isnan(value) else round(float(value), 6)
+
+
+def _rolling_last(values, window):
+    """Média dos últimos `window` valores (NaN se não houver amostras suficientes)."""
+    return float(values[-window:].mean()) if len(values) >= window else float('nan')
+
+
+def evaluate(closes, log_rets, horizon=PREDICTION_HORIZON_DAYS, windows=BACKTEST_WINDOWS, start=0):
+    """
+    Métricas por horizonte (1..horizon), vetorizadas sobre todos os pregões a partir
+    de `start`. A previsão de h dias feita no pregão i é closes[i] * exp(log_rets[i] * h).
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    log_rets = np.asarray(log_rets, dtype=np.float64)
+    metrics = []
+    for h in range(1, horizon + 1):
+        base = closes[start:len(closes) - h]
+        real = closes[start + h:]
+        pred = base * np.exp(log_rets[start:len(closes) - h] * h)
+
+        err = np.abs(pred - real)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = err / real * 100
+        acerto = (np.sign(pred - base) == np.sign(real - base)).astype(np.float64)
+        n = len(err)
+        metrics.append(HorizonMetrics(
+            horizonte=h,
+            amostras=n,
+            mae=float(err.mean()) if n else float('nan'),
+            mape=float(pct.mean()) if n else float('nan'),
+            acerto_direcional=float(acerto.mean()) if n else float('nan'),
+            mape_movel={w: _rolling_last(pct, w) for w in windows},
+        ))
+    return tuple(metrics)
+
+
+def run_backtest(index, model_name, horizon=PREDICTION_HORIZON_DAYS, windows=BACKTEST_WINDOWS, incluir_aquecimento=False):
+    """Backtest a partir de um HistoricalIndex já pontuado (nenhuma inferência extra)."""
+    started = time.perf_counter()
+    start = 0 if incluir_aquecimento else min(index.first_complete, len(index))
+    horizontes = evaluate(index.closes, index.log_rets, horizon, windows, start)
+    dates = index.dates[start:]
+    return BacktestReport(
+        ticker=index.key[-1],
+        modelo=model_name,
+        inicio=str(dates[0]) if len(dates) else None,
+        fim=str(dates[-1]) if len(dates) else None,
+        horizontes=horizontes,
+        gerado_em=datetime.now(),
+        duracao_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+def export_metrics(report):
+    """Publica o relatório como gauges (determinísticos: mesmo snapshot, mesmos valores)."""
+    ticker = report.ticker
+    for m in report.horizontes:
+        labels = dict(ticker=ticker, horizon=str(m.horizonte))
+        BACKTEST_SAMPLES_GAUGE.labels(**labels).set(m.amostras)
+        BACKTEST_MAE_GAUGE.labels(**labels).set(m.mae)
+        BACKTEST_MAPE_GAUGE.labels(**labels).set(m.mape)
+        BACKTEST_DIRECTION_GAUGE.labels(**labels).set(m.acerto_direcional)
+        for window, value in m.mape_movel.items():
+            BACKTEST_ROLLING_MAPE_GAUGE.labels(window=str(window), **labels).set(value)
+    if report.fim:
+        BACKTEST_LAST_BAR_GAUGE.labels(ticker=ticker).set(datetime.fromisoformat(report.fim).timestamp())
+
+
+def report_to_dict(report):
+    data = asdict(report)
+    data["gerado_em"] = report.gerado_em.isoformat()
+    data["duracao_ms"] = round(report.duracao_ms, 3)
+    for m in data["horizontes"]:
+        for field in ("mae", "mape", "acerto_direcional"):
+            m[field] = _nan_to_none(m[field])
+        m["mape_movel"] = {str(w): _nan_to_none(v) for w, v in m["mape_movel"].items()}
+    return data
+
+
+class BacktestService:
+    """Um relatório por ativo, recalculado quando o índice histórico muda."""
+
+    def __init__(self):
+        self._reports = {}
+
+    async def get(self, ticker=DEFAULT_TICKER):
+        index = await historical_index.get(ticker)
+        cached = self._reports.get(ticker)
+        if cached is not None and cached[0] is index:
+            return cached[1]
+        report = run_backtest(index, index.modelo)
+        export_metrics(report)
+        self._reports[ticker] = (index, report)
+        return report
+
+    async def refresh(self, tickers):
+        """Recalcula os ativos após um novo snapshot (falhas não interrompem o pré-aquecimento)."""
+        for ticker in tickers:
+            try:
+                await self.get(ticker)
+            except Exception as e:
+                print(f"⚠️ Backtest de {ticker} indisponível: {e}")
+
+
+backtest_service = BacktestService()
+
+
+def _print_report(report):
+    print(f"\n📊 Backtest {report.ticker} ({report.modelo}): {report.inicio} → {report.fim}")
+    windows = list(report.horizontes[0].mape_movel) if report.horizontes else []
+    header = f"{'h':>3}{'amostras':>10}{'MAE (R$)':>11}{'MAPE %':>9}{'direção':>9}"
+    print(header + "".join(f"{f'MAPE {w}d':>11}" for w in windows))
+    for m in report.horizontes:
+        row = f"{m.horizonte:>3}{m.amostras:>10}{m.mae:>11.3f}{m.mape:>9.2f}{m.acerto_direcional:>9.1%}"
+        print(row + "".join(f"{m.mape_movel[w]:>11.2f}" for w in windows))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest walk-forward da LSTM sobre o histórico local.")
+    parser.add_argument("--ticker", action="append", help="ativo (repetível); padrão: todos do registro")
+    parser.add_argument("--horizonte", type=int, default=PREDICTION_HORIZON_DAYS)
+    parser.add_argument("--incluir-aquecimento", action="store_true",
+                        help="inclui as janelas anteriores ao aquecimento da SMA 200")
+    parser.add_argument("--json", help="grava o relatório em JSON neste caminho")
+    parser.add_argument("--prom-file", help="grava as métricas no formato texto do Prometheus (textfile collector)")
+    args = parser.parse_args(argv)
+
+    instruments = [instrument_registry.get(t) for t in args.ticker] if args.ticker else list(instrument_registry)
+    if None in instruments:
+        parser.error(f"ativo desconhecido. Disponíveis: {', '.join(instrument_registry.tickers)}")
+
+    # Mesma Selic usada pela API (valor persistido; sem ele, consulta o BCB)
+    selic_provider.load()
+    if selic_provider.get() is None:
+        selic_provider.refresh()
+
+    reports = []
+    for instrument in instruments:
+        ticker = instrument.ticker
+        artifacts = get_artifacts(ticker)
+        artifacts.load()
+        if not artifacts.is_loaded():
+            print(f"❌ Artefatos de {ticker} indisponíveis.")
+            return 1
+        started = time.perf_counter()
+        features_df, close = get_pipeline(ticker).prepare_history()
+        index = HistoricalIndex.build((None, artifacts.version, None, ticker), features_df, close, artifacts)
+        report = run_backtest(index, artifacts.instrument.model_name, args.horizonte,
+                              incluir_aquecimento=args.incluir_aquecimento)
+        export_metrics(report)
+        _print_report(report)
+        print(f"⏱️  {len(index)} janelas pontuadas em {(time.perf_counter() - started):.2f}s")
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([report_to_dict(r) for r in reports], f, ensure_ascii=False, indent=2)
+    if args.prom_file:
+        write_to_textfile(args.prom_file, REGISTRY)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
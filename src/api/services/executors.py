@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import Gauge, Histogram
+
+from src.api.config import (
+    IO_EXECUTOR_WORKERS, IO_EXECUTOR_MAX_QUEUE,
+    INFERENCE_EXECUTOR_WORKERS, INFERENCE_EXECUTOR_MAX_QUEUE,
+)
+
+# --- MONITORAMENTO DOS EXECUTORES ---
+EXECUTOR_QUEUE_DEPTH = Gauge('executor_queue_depth', 'Tarefas aguardando uma thread livre', ['executor'], multiprocess_mode='livesum')
+EXECUTOR_QUEUE_WAIT = Histogram(
+    'executor_queue_wait_seconds', 'Tempo na fila até começar a executar', ['executor'],
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5],
+)
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Fila do executor cheia: a requisição deve ser recusada (HTTP 503)."""
+
+
+class BoundedExecutor:
+    """
+    Pool de threads com limite de tarefas pendentes.
+    Usado para tirar chamadas bloqueantes (rede, inferência) do event loop do uvicorn.
+    """
+
+    def __init__(self, name, max_workers, max_queue=0):
+        self.name = name
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    async def run(self, fn, *args, **kwargs):
+        """Executa `fn(*args, **kwargs)` no pool e aguarda o resultado sem bloquear o loop."""
+        with self._lock:
+            if self.max_queue and self._pending >= self.max_queue:
+                raise ExecutorSaturatedError(f"Executor '{self.name}' saturado ({self._pending} tarefas pendentes).")
+            self._pending += 1
+
+        EXECUTOR_QUEUE_DEPTH.labels(executor=self.name).inc()
+        submitted_at = time.perf_counter()
+        # Leva o contexto da requisição para a thread (spans das etapas ficam aninhados)
+        context = contextvars.copy_context()
+        queued = [True]
+
+        def dequeue():
+            """Sai da fila uma única vez: ao começar a executar ou ao terminar sem ter rodado (cancelada)."""
+            with self._lock:
+                was_queued, queued[0] = queued[0], False
+            if was_queued:
+                EXECUTOR_QUEUE_DEPTH.labels(executor=self.name).dec()
+            return was_queued
+
+        def job():
+            if dequeue():
+                EXECUTOR_QUEUE_WAIT.labels(executor=self.name).observe(time.perf_counter() - submitted_at)
+            return context.run(fn, *args, **kwargs)
+
+        def release(_future):
+            # Callback do future (e não o corpo da tarefa): também roda se a requisição for
+            # cancelada antes de uma thread pegar a tarefa, sem vazar os contadores
+            dequeue()
+            with self._lock:
+                self._pending -= 1
+
+        try:
+            future = self._pool.submit(job)
+        except BaseException:
+            release(None)
+            raise
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+io_executor = BoundedExecutor("io", IO_EXECUTOR_WORKERS, IO_EXECUTOR_MAX_QUEUE)
+inference_executor = BoundedExecutor("inference", INFERENCE_EXECUTOR_WORKERS, INFERENCE_EXECUTOR_MAX_QUEUE)
@@ -1,190 +1,244 @@
+import hashlib
 import pandas as pd
 import numpy as np
-import yfinance as yf
-import requests
+import threading
 import warnings
 
+from src.api.config import SELIC_FALLBACK, DEFAULT_TICKER
+from src.api.services import indicators as ind
+from src.api.services.indicators import OHLCVBuffer
+from src.api.services.market_cache import market_cache
+from src.api.services.selic_provider import selic_provider
+from src.api.services.indicator_engine import StreamingIndicatorEngine
+
 # Suprime warnings do pandas
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
-class FeaturePipeline:
-    def __init__(self):
-        self.TARGET_COLUMNS = [
-            'USDBRL_t-1', 'Brent_t-1', 'Ibovespa_t-1', 'Selic_t-1', 
-            'Ibov_Return_t-1', 'Brent_Return_t-1', 'USD_Return_t-1', 
-            'return_1', 'return_5', 'return_20', 
-            'Dist_SMA200', 
-            'Momentum_5', 'Momentum_10', 'Momentum_20', 
-            'RSI_21', 
-            'MACD', 'MACD_Signal', 
-            'ATR_14', 
-            'BB_Middle', 'BB_Std', 'BB_Upper', 'BB_Lower', 'BB_Width', 'BB_Position', 
-            'STD_20', 'Parkinson_Vol', 'Range_High_Low',
-            'OBV', 'Volume_Ratio', 'VWAP', 
-            'DoW_sin', 'DoW_cos', 'Month_sin', 'Month_cos'
-        ]
-
-    def _get_selic(self):
-        try:
-            url = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.432/dados?formato=json"
-            headers = {"User-Agent": "Mozilla/5.0"}
-            r = requests.get(url, headers=headers, timeout=2)
-            if r.status_code == 200:
-                return float(r.json()[-1]['valor'])
-        except:
-            pass
-        return 11.25
-
-    def _calculate_rsi(self, series, period=21):
-        delta = series.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs))
-
-    def prepare_input_data(self):
-        tickers = ["PETR4.SA", "BRL=X", "BZ=F", "^BVSP"]
-        print("📥 Pipeline: Baixando dados brutos (2y)...")
-        
-        # Tenta baixar. Se falhar (lock), tenta de novo sem thread
-        try:
-            df_all = yf.download(tickers, period="2y", progress=False, threads=False)
-        except Exception as e:
-            print(f"⚠️ Erro no yfinance: {e}. Retornando dados zerados de emergência.")
-            # Retorna estrutura vazia mas válida para não crashar a API
-            return self._create_empty_fallback()
-
-        # Verifica se baixou algo útil
-        if df_all.empty or 'Close' not in df_all.columns:
-             print("⚠️ Dados vazios do Yahoo Finance.")
-             return self._create_empty_fallback()
-
-        # Tratamento MultiIndex
-        if isinstance(df_all.columns, pd.MultiIndex):
-            try:
-                # Usa ffill() ANTES de separar para propagar dados
-                df_all = df_all.ffill()
-                closes = df_all.xs('Close', axis=1, level=0)
-                highs = df_all.xs('High', axis=1, level=0)
-                lows = df_all.xs('Low', axis=1, level=0)
-                vols = df_all.xs('Volume', axis=1, level=0)
-            except:
-                return self._create_empty_fallback()
-        else:
-            closes = df_all
-        
-        # Garante que temos PETR4
-        if 'PETR4.SA' not in closes.columns:
-             return self._create_empty_fallback()
-
-        df = pd.DataFrame(index=closes.index)
-        
-        # Atalhos com ffill garantido
-        p_close = closes['PETR4.SA'].ffill()
-        p_high = highs['PETR4.SA'].ffill()
-        p_low = lows['PETR4.SA'].ffill()
-        p_vol = vols['PETR4.SA'].ffill()
-
-        # Se depois do ffill ainda tiver NaN (começo da série), preenche com 0
-        p_close = p_close.fillna(0)
-        
-        # --- ENGENHARIA ---
-        # Usa fill_method=None para evitar warnings em versões novas do Pandas
-        
+FEATURE_COLUMNS = [
+    'USDBRL_t-1', 'Brent_t-1', 'Ibovespa_t-1', 'Selic_t-1', 
+    'Ibov_Return_t-1', 'Brent_Return_t-1', 'USD_Return_t-1', 
+    'return_1', 'return_5', 'return_20', 
+    'Dist_SMA200', 
+    'Momentum_5', 'Momentum_10', 'Momentum_20', 
+    'RSI_21', 
+    'MACD', 'MACD_Signal', 
+    'ATR_14', 
+    'BB_Middle', 'BB_Std', 'BB_Upper', 'BB_Lower', 'BB_Width', 'BB_Position', 
+    'STD_20', 'Parkinson_Vol', 'Range_High_Low',
+    'OBV', 'Volume_Ratio', 'VWAP', 
+    'DoW_sin', 'DoW_cos', 'Month_sin', 'Month_cos'
+]
+
+
+def compute_features(close, high, low, vol, usd, brent, ibov, dates, selic, columns):
+    """
+    Cálculo completo (kernels NumPy) das features sobre o histórico inteiro.
+    As séries do ativo podem ter eixos extras à esquerda (ex.: (ativos, n)); as
+    macro e as datas, (n,), são compartilhadas. Retorna (..., n, colunas) com o
+    preenchimento final (ffill + zeros) aplicado.
+    """
+    f = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
         # Macro
-        df['USDBRL_t-1'] = closes['BRL=X'].shift(1)
-        df['Brent_t-1'] = closes['BZ=F'].shift(1)
-        df['Ibovespa_t-1'] = closes['^BVSP'].shift(1)
-        df['Selic_t-1'] = self._get_selic()
-        
-        df['Ibov_Return_t-1'] = closes['^BVSP'].pct_change(fill_method=None).shift(1)
-        df['Brent_Return_t-1'] = closes['BZ=F'].pct_change(fill_method=None).shift(1)
-        df['USD_Return_t-1'] = closes['BRL=X'].pct_change(fill_method=None).shift(1)
+        f['USDBRL_t-1'] = ind.shift(usd)
+        f['Brent_t-1'] = ind.shift(brent)
+        f['Ibovespa_t-1'] = ind.shift(ibov)
+        f['Selic_t-1'] = np.full(close.shape, float(selic))
+
+        f['Ibov_Return_t-1'] = ind.shift(ind.pct_change(ibov))
+        f['Brent_Return_t-1'] = ind.shift(ind.pct_change(brent))
+        f['USD_Return_t-1'] = ind.shift(ind.pct_change(usd))
 
         # Returns
-        df['return_1'] = p_close.pct_change(fill_method=None)
-        df['return_5'] = p_close.pct_change(5, fill_method=None)
-        df['return_20'] = p_close.pct_change(20, fill_method=None)
+        f['return_1'] = ind.pct_change(close)
+        f['return_5'] = ind.pct_change(close, 5)
+        f['return_20'] = ind.pct_change(close, 20)
 
         # Momentum
-        sma200 = p_close.rolling(200).mean()
         # Evita divisão por zero
-        df['Dist_SMA200'] = (p_close / sma200.replace(0, np.nan)) - 1
-        
-        df['Momentum_5'] = p_close - p_close.shift(5)
-        df['Momentum_10'] = p_close - p_close.shift(10)
-        df['Momentum_20'] = p_close - p_close.shift(20)
-        
-        df['RSI_21'] = self._calculate_rsi(p_close, 21)
-
-        ema12 = p_close.ewm(span=12, adjust=False).mean()
-        ema26 = p_close.ewm(span=26, adjust=False).mean()
-        df['MACD'] = ema12 - ema26
-        df['MACD_Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
+        f['Dist_SMA200'] = (close / ind.nan_if_zero(ind.rolling_mean(close, 200))) - 1
+
+        f['Momentum_5'] = ind.diff(close, 5)
+        f['Momentum_10'] = ind.diff(close, 10)
+        f['Momentum_20'] = ind.diff(close, 20)
+
+        f['RSI_21'] = ind.rsi(close, 21)
+        f['MACD'], f['MACD_Signal'] = ind.macd(close)
 
         # Volatilidade
-        tr1 = p_high - p_low
-        tr2 = (p_high - p_close.shift()).abs()
-        tr3 = (p_low - p_close.shift()).abs()
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        df['ATR_14'] = tr.rolling(14).mean()
-
-        df['BB_Middle'] = p_close.rolling(20).mean()
-        df['BB_Std'] = p_close.rolling(20).std()
-        df['BB_Upper'] = df['BB_Middle'] + (df['BB_Std'] * 2)
-        df['BB_Lower'] = df['BB_Middle'] - (df['BB_Std'] * 2)
-        
-        bb_width_denom = df['BB_Middle'].replace(0, np.nan)
-        df['BB_Width'] = (df['BB_Upper'] - df['BB_Lower']) / bb_width_denom
-        
-        bb_pos_denom = (df['BB_Upper'] - df['BB_Lower']).replace(0, np.nan)
-        df['BB_Position'] = (p_close - df['BB_Lower']) / bb_pos_denom
-        
-        df['STD_20'] = df['BB_Std']
-        
-        high_low_ratio = (p_high / p_low.replace(0, np.nan))
-        df['Parkinson_Vol'] = np.sqrt(1/(4*np.log(2)) * (np.log(high_low_ratio)**2))
-        
-        df['Range_High_Low'] = (p_high - p_low) / p_close.replace(0, np.nan)
+        f['ATR_14'] = ind.rolling_mean(ind.true_range(high, low, close), 14)
+
+        f['BB_Middle'], f['BB_Std'], f['BB_Upper'], f['BB_Lower'] = ind.bollinger(close, 20, 2)
+        band = f['BB_Upper'] - f['BB_Lower']
+        f['BB_Width'] = band / ind.nan_if_zero(f['BB_Middle'])
+        f['BB_Position'] = (close - f['BB_Lower']) / ind.nan_if_zero(band)
+
+        f['STD_20'] = f['BB_Std']
+        f['Parkinson_Vol'] = ind.parkinson(high, low)
+        f['Range_High_Low'] = (high - low) / ind.nan_if_zero(close)
 
         # Volume
-        df['OBV'] = (np.sign(p_close.diff()) * p_vol).fillna(0).cumsum()
-        vol_sma20 = p_vol.rolling(20).mean()
-        df['Volume_Ratio'] = p_vol / vol_sma20.replace(0, np.nan)
-        
-        cum_vol = p_vol.cumsum()
-        cum_vol_price = (p_vol * (p_high + p_low + p_close) / 3).cumsum()
-        df['VWAP'] = cum_vol_price / cum_vol.replace(0, np.nan)
-
-        # Temporal
-        dow = df.index.dayofweek
-        month = df.index.month
-        df['DoW_sin'] = np.sin(2 * np.pi * dow / 5)
-        df['DoW_cos'] = np.cos(2 * np.pi * dow / 5)
-        df['Month_sin'] = np.sin(2 * np.pi * month / 12)
-        df['Month_cos'] = np.cos(2 * np.pi * month / 12)
-
-        # FINALIZAÇÃO
-        final_df = df[self.TARGET_COLUMNS].copy()
-        
-        # Preenchimento Final Agressivo (Remove qualquer NaN restante)
-        final_df = final_df.ffill().fillna(0)
-        
+        f['OBV'] = ind.obv(close, vol)
+        f['Volume_Ratio'] = vol / ind.nan_if_zero(ind.rolling_mean(vol, 20))
+        f['VWAP'] = ind.vwap(high, low, close, vol)
+
+    # Temporal
+    dow = dates.dayofweek.to_numpy()
+    month = dates.month.to_numpy()
+    f['DoW_sin'] = np.sin(2 * np.pi * dow / 5)
+    f['DoW_cos'] = np.cos(2 * np.pi * dow / 5)
+    f['Month_sin'] = np.sin(2 * np.pi * month / 12)
+    f['Month_cos'] = np.cos(2 * np.pi * month / 12)
+
+    # FINALIZAÇÃO
+    features = np.stack([np.broadcast_to(f[c], close.shape) for c in columns], axis=-1)
+
+    # Preenchimento Final Agressivo (Remove qualquer NaN restante)
+    features = np.swapaxes(ind.ffill(np.swapaxes(features, -1, -2)), -1, -2)
+    features[np.isnan(features)] = 0.0
+    return features
+
+
+class FeaturePipeline:
+    def __init__(self, ticker=DEFAULT_TICKER):
+        self.ticker = ticker
+        self.TARGET_COLUMNS = FEATURE_COLUMNS
+        self.WINDOW_ROWS = 50
+        self.PARITY_ATOL = 1e-9
+
+        # Motor incremental: atualiza as features só com os candles novos do snapshot
+        self._engine = StreamingIndicatorEngine(self.TARGET_COLUMNS, self.WINDOW_ROWS)
+        self._engine_lock = threading.Lock()
+        self._engine_digest = None   # hash dos candles fechados já aplicados no motor
+
+    def _get_selic(self):
+        # Valor em memória (atualizado em segundo plano pelo SelicProvider)
+        return selic_provider.get(default=SELIC_FALLBACK)
+
+    def _load_raw(self):
+        """Séries brutas alinhadas (OHLCV do ativo + fechamentos macro) a partir do snapshot."""
+        # Buffer compartilhado com o MarketDataService (um download e um ffill para os dois).
+        # Sem snapshot algum, MarketDataError sobe até a rota (503): nunca se prevê sobre dados inventados
+        raw = market_cache.get_buffer(self.ticker).to_frame()
+        # Se depois do ffill ainda tiver NaN (começo da série), preenche com 0
+        raw['close'] = raw['close'].fillna(0)
+        return raw
+
+    def prepare_input_data(self):
+        """Janela das últimas 50 linhas de features e os fechamentos correspondentes."""
+        raw = self._load_raw()
+        selic = self._get_selic()
+        with self._engine_lock:
+            try:
+                self._sync_engine(raw, selic)
+                return self._engine.window(selic)
+            except Exception as e:
+                print(f"⚠️ Motor incremental indisponível ({e}). Usando cálculo completo.")
+                self._engine.reset()
+                self._engine_digest = None
+                return self._last_window(*self._compute_features_batch(raw, selic))
+
+    def prepare_history(self):
+        """Features de todo o histórico do snapshot e os fechamentos (base do índice histórico)."""
+        return self._compute_features_batch(self._load_raw(), self._get_selic())
+
+    def _sync_engine(self, raw, selic):
+        """Aplica no motor apenas os candles que ele ainda não viu (ou revisa o último)."""
+        engine = self._engine
+        dates = raw.index
+        bars = raw[['close', 'high', 'low', 'volume', 'usd', 'brent', 'ibov']].to_numpy(dtype=float)
+        pos = dates.get_loc(engine.last_date) if engine.count and engine.last_date in dates else None
+
+        # Histórico reescrito (outro início, candles removidos, reajuste de proventos, correções ou
+        # macro preenchida que ganhou o valor real): reprocessa tudo. O início da janela é fixo no
+        # processo (OHLCVStore.load_frame) e os candles fechados são conferidos por hash
+        if (pos is None or dates[0] != engine.first_date or pos + 1 != engine.count
+                or self._digest(dates, bars, pos) != self._engine_digest):
+            engine.seed(raw)
+            self._check_parity(raw, selic)
+            self._engine_digest = self._digest(dates, bars, len(dates) - 1)
+            return
+
+        last_bar = tuple(bars[pos].tolist())
+        if not self._same_bar(last_bar, engine.last_bar):
+            # Candle do dia ainda em formação mudou
+            engine.revise_last(dates[pos], last_bar)
+
+        new_rows = range(pos + 1, len(dates))
+        for i in new_rows:
+            engine.update(dates[i], bars[i].tolist(), provisional=(i == len(dates) - 1))
+        if len(new_rows):
+            self._engine_digest = self._digest(dates, bars, len(dates) - 1)
+
+    @staticmethod
+    def _digest(dates, bars, rows):
+        """Hash das `rows` primeiras datas e candles (todos menos o último, que pode ser revisado)."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(dates.asi8[:rows].tobytes())
+        h.update(np.ascontiguousarray(bars[:rows]).tobytes())
+        return h.digest()
+
+    @staticmethod
+    def _same_bar(a, b):
+        return all(x == y or (x != x and y != y) for x, y in zip(a, b))
+
+    def _check_parity(self, raw, selic):
+        """Confere a janela do motor contra o cálculo completo (executado só na reinicialização)."""
+        expected, expected_close = self._last_window(*self._compute_features_batch(raw, selic))
+        actual, actual_close = self._engine.window(selic)
+        diff = np.nanmax(np.abs(actual.values - expected.values)) if len(actual) else 0.0
+        same_nan = np.array_equal(np.isnan(actual.values), np.isnan(expected.values))
+        if not same_nan or diff > self.PARITY_ATOL or not np.array_equal(actual_close.values, expected_close.values):
+            raise ValueError(f"divergência com o cálculo completo (erro máx {diff:.2e})")
+
+    def _compute_features_batch(self, raw, selic):
+        """Cálculo completo (kernels NumPy) de todas as features sobre o histórico inteiro."""
+        series = [raw[c].to_numpy(dtype=np.float64) for c in OHLCVBuffer.SERIES]
+        features = compute_features(*series, raw.index, selic, self.TARGET_COLUMNS)
+        final_df = pd.DataFrame(features, index=raw.index, columns=self.TARGET_COLUMNS)
+        return final_df, raw['close']
+
+    def _last_window(self, final_df, p_close):
         # Se tiver menos de 50 linhas, preenche com zeros no começo
-        if len(final_df) < 50:
-            missing = 50 - len(final_df)
+        if len(final_df) < self.WINDOW_ROWS:
+            missing = self.WINDOW_ROWS - len(final_df)
             zeros = pd.DataFrame(0, index=range(missing), columns=final_df.columns)
             final_df = pd.concat([zeros, final_df])
             p_close = pd.concat([pd.Series([0]*missing), p_close])
 
-        return final_df.iloc[-50:], p_close.iloc[-50:]
+        return final_df.iloc[-self.WINDOW_ROWS:], p_close.iloc[-self.WINDOW_ROWS:]
+
+def compute_panel_windows(panel, selic, tickers, window_rows=50):
+    """
+    Janelas das últimas `window_rows` linhas de features de vários ativos num único
+    passe vetorizado. Retorna (features (ativos, janela, colunas), fechamentos (ativos, janela)).
+    """
+    idx = [panel.tickers.index(t) for t in tickers]
+    # Se depois do ffill ainda tiver NaN (começo da série), preenche com 0
+    close = panel.ohlcv[0, idx]
+    close = np.where(np.isnan(close), 0.0, close)
+    high, low, vol = panel.ohlcv[1, idx], panel.ohlcv[2, idx], panel.ohlcv[3, idx]
+    usd, brent, ibov = panel.macro
+
+    features = compute_features(close, high, low, vol, usd, brent, ibov, panel.dates, selic, FEATURE_COLUMNS)
+    features, close = features[:, -window_rows:], close[:, -window_rows:]
+    if features.shape[1] < window_rows:
+        missing = window_rows - features.shape[1]
+        features = np.pad(features, ((0, 0), (missing, 0), (0, 0)))
+        close = np.pad(close, ((0, 0), (missing, 0)))
+    return features, close
+
+
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def get_pipeline(ticker=DEFAULT_TICKER):
+    """FeaturePipeline do ativo (um motor incremental por ticker)."""
+    with _pipelines_lock:
+        if ticker not in _pipelines:
+            _pipelines[ticker] = FeaturePipeline(ticker)
+        return _pipelines[ticker]
 
-    def _create_empty_fallback(self):
-        """Cria dados fake zerados para API não morrer se download falhar"""
-        print("⚠️ Usando dados de fallback zerados.")
-        # Cria 50 linhas de zeros
-        df = pd.DataFrame(0.0, index=range(50), columns=self.TARGET_COLUMNS)
-        p_close = pd.Series([30.0] * 50) # Preço dummy de 30 reais
-        return df, p_close
 
-pipeline = FeaturePipeline()
+pipeline = get_pipeline(DEFAULT_TICKER)
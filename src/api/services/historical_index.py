@@ -0,0 +1,141 @@
+import asyncio
+import time
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from prometheus_client import Counter, Histogram
+
+from src.api.config import DEFAULT_TICKER, HISTORY_BATCH_SIZE, HISTORY_WARMUP_ROWS
+from src.api.services.executors import io_executor, inference_executor
+from src.api.services.feature_pipeline import get_pipeline
+from src.api.services.market_cache import market_cache
+from src.api.services.ml_artifacts import get_artifacts
+from src.api.services.selic_provider import selic_provider
+
+INDEX_BUILD_HIST = Histogram('historical_index_build_seconds', 'Tempo de construção do índice histórico de previsões', ['ticker'])
+INDEX_CACHE_COUNTER = Counter('historical_index_requests_total', 'Consultas ao índice histórico de previsões', ['result'])
+
+
+class HistoricalIndex:
+    """
+    Previsão D+1 que o modelo faz para cada pregão do snapshot, indexada por data.
+    Construído uma vez por snapshot: consultar um intervalo é só um fatiamento.
+    """
+
+    def __init__(self, key, dates, closes, log_rets, first_complete, gerado_em, modelo=""):
+        self.key = key
+        self.modelo = modelo                # nome da versão do modelo que pontuou o índice
+        self.dates = dates                  # datetime64[D], pregão que fecha a janela
+        self.closes = closes                # fechamento do pregão
+        self.log_rets = log_rets            # log-retorno previsto para o pregão seguinte
+        self.previstos = closes * np.exp(log_rets)  # previsão para o pregão seguinte
+        self.reais = np.append(closes[1:], np.nan)  # fechamento observado no pregão seguinte
+        self.first_complete = first_complete
+        self.gerado_em = gerado_em
+
+    @classmethod
+    def build(cls, key, features_df, close, artifacts, batch_size=HISTORY_BATCH_SIZE):
+        X = artifacts.scale_features(features_df).astype(np.float32, copy=False)
+        dates = features_df.index.values.astype('datetime64[D]')
+        closes = np.asarray(close, dtype=np.float64)
+        window = artifacts.lstm_model.input_shape[1]
+        modelo = artifacts.instrument.model_name
+        if len(X) < window:
+            empty = np.empty(0)
+            return cls(key, dates[:0], empty, empty, 0, datetime.now(), modelo)
+
+        # Todas as janelas (N, 20, 34) como visão do array escalado, sem cópia
+        windows = sliding_window_view(X, (window, X.shape[1]))[:, 0]
+        preds = np.concatenate([
+            artifacts.predict(windows[i:i + batch_size]) for i in range(0, len(windows), batch_size)
+        ])
+        log_ret = artifacts.inverse_target(preds)
+
+        closes = closes[window - 1:]
+        # Primeira janela cujas 20 linhas já têm os indicadores longos completos
+        # (janela i cobre as linhas i..i+19 do histórico)
+        first_complete = HISTORY_WARMUP_ROWS - 1
+        return cls(key, dates[window - 1:], closes, log_ret, first_complete, datetime.now(), modelo)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def version(self):
+        """Versão dos artefatos que pontuou o índice (parte da chave do snapshot)."""
+        return self.key[1]
+
+    def locate(self, day):
+        """Posição do pregão `day` no índice (None se não houve pregão ou previsão nesse dia)."""
+        day = np.datetime64(day, 'D')
+        pos = int(np.searchsorted(self.dates, day))
+        return pos if pos < len(self.dates) and self.dates[pos] == day else None
+
+    def slice(self, inicio=None, fim=None):
+        """Intervalo [inicio, fim] de pregões (limites opcionais, inclusivos)."""
+        lo = 0 if inicio is None else int(np.searchsorted(self.dates, np.datetime64(inicio, 'D'), 'left'))
+        hi = len(self.dates) if fim is None else int(np.searchsorted(self.dates, np.datetime64(fim, 'D'), 'right'))
+        return slice(lo, max(lo, hi))
+
+    def rows(self, window):
+        """Linhas do intervalo como dicionários prontos para a resposta."""
+        idx = range(len(self.dates))[window]
+        reais = self.reais[window]
+        erros = np.abs(reais - self.previstos[window]) / reais
+        return [
+            {
+                "data_referencia": str(d),
+                "preco_fechamento": round(float(c), 2),
+                "preco_previsto": round(float(p), 2),
+                "preco_real": None if np.isnan(r) else round(float(r), 2),
+                "erro_percentual": None if np.isnan(e) else round(float(e) * 100, 2),
+                "indicadores_completos": i >= self.first_complete,
+            }
+            for i, d, c, p, r, e in zip(idx, self.dates[window], self.closes[window],
+                                         self.previstos[window], reais, erros)
+        ]
+
+
+class HistoricalIndexService:
+    """Mantém um índice por ativo, reconstruído quando o snapshot ou o modelo mudam."""
+
+    def __init__(self, batch_size=HISTORY_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._indexes = {}
+        self._inflight = {}
+
+    async def get(self, ticker=DEFAULT_TICKER):
+        buffer = await io_executor.run(market_cache.get_buffer, ticker)
+        # Sempre a versão estável: o índice alimenta histórico, backtest e shadow test
+        artifacts = get_artifacts(ticker)
+        key = (buffer.last_date.strftime('%Y-%m-%d'), artifacts.version,
+               f"{buffer.digest}:{selic_provider.get()}", ticker)
+        index = self._indexes.get(ticker)
+        if index is not None and index.key == key:
+            INDEX_CACHE_COUNTER.labels(result="hit").inc()
+            return index
+
+        task = self._inflight.get(key)
+        if task is None:
+            INDEX_CACHE_COUNTER.labels(result="miss").inc()
+            task = self._inflight[key] = asyncio.ensure_future(self._build(ticker, key, artifacts))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            INDEX_CACHE_COUNTER.labels(result="coalesced").inc()
+        # shield: o cancelamento de uma requisição não derruba a construção compartilhada
+        return await asyncio.shield(task)
+
+    async def _build(self, ticker, key, artifacts):
+        features_df, close = await io_executor.run(get_pipeline(ticker).prepare_history)
+        start = time.perf_counter()
+        index = await inference_executor.run(
+            HistoricalIndex.build, key, features_df, close, artifacts, self.batch_size)
+        elapsed = time.perf_counter() - start
+        INDEX_BUILD_HIST.labels(ticker=ticker).observe(elapsed)
+        print(f"🗂️ Índice histórico de {ticker}: {len(index)} pregões em {elapsed * 1000:.0f} ms")
+        self._indexes[ticker] = index
+        return index
+
+
+historical_index = HistoricalIndexService()
@@ -0,0 +1,46 @@
+import hashlib
+import math
+from datetime import datetime, time, timedelta
+
+from fastapi import Response
+
+from src.api.config import MARKET_CACHE_TTL_OPEN
+from src.api.services.market_calendar import now_b3, snapshot_expiry
+
+# Cache HTTP das respostas derivadas do snapshot de mercado (ETag, 304 e Cache-Control).
+
+
+def weak_etag(*parts):
+    """ETag fraco a partir das partes que determinam o conteúdo da resposta."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Compara If-None-Match com o ETag (comparação fraca, aceita lista e `*`)."""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def cache_control_until_next_bar(now=None):
+    """
+    Cache-Control público válido até o snapshot de mercado poder mudar (próximo candle
+    esperado) ou até a virada do dia na B3, o que vier antes: as datas das respostas
+    são relativas ao dia da consulta e entram no ETag.
+    """
+    now = now or now_b3()
+    midnight = datetime.combine(now.date() + timedelta(days=1), time(), tzinfo=now.tzinfo)
+    expires = min(snapshot_expiry(now, timedelta(seconds=MARKET_CACHE_TTL_OPEN)), midnight)
+    max_age = max(0, math.floor((expires - now).total_seconds()))
+    return f"public, max-age={max_age}"
+
+
+def not_modified(headers):
+    """304 sem corpo, repetindo ETag e Cache-Control."""
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,364 @@
+import copy
+import itertools
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+# Tabelas de sazonalidade (mesma expressão vetorizada do cálculo em lote)
+_DOW = np.arange(7)
+_MONTH = np.arange(13)
+DOW_SIN = np.sin(2 * np.pi * _DOW / 5)
+DOW_COS = np.cos(2 * np.pi * _DOW / 5)
+MONTH_SIN = np.sin(2 * np.pi * _MONTH / 12)
+MONTH_COS = np.cos(2 * np.pi * _MONTH / 12)
+PARKINSON_K = 1 / (4 * np.log(2))
+
+
+def _div(a, b):
+    """Divisão com a semântica do NumPy/pandas (x/0 -> ±inf, 0/0 -> NaN)."""
+    if b == 0:
+        if a != a or a == 0:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _nan_if_zero(x):
+    return NAN if x == 0 else x
+
+
+class RollingWindow:
+    """
+    Janela deslizante de tamanho fixo com o mesmo resultado, bit a bit, dos kernels
+    `rolling_mean` / `rolling_std` do cálculo em lote (indicators.py): a média é a
+    diferença de somas acumuladas desde a primeira barra e o desvio padrão é
+    calculado pelo NumPy sobre os valores da janela. Atualização em O(1).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._buf = [NAN] * size
+        self._cums = [0.0] * size   # soma acumulada antes de cada valor da janela
+        self._pos = 0
+        self._count = 0
+        self._cum = 0.0             # soma acumulada (NaN conta como 0, igual ao cumsum do lote)
+        self._nan_ct = 0
+        self._neg_ct = 0
+        self._nonzero_ct = 0
+
+    def push(self, x):
+        if self._count == self.size:
+            old = self._buf[self._pos]
+            if old != old:
+                self._nan_ct -= 1
+            else:
+                self._neg_ct -= old < 0
+                self._nonzero_ct -= old != 0
+        else:
+            self._count += 1
+        self._buf[self._pos] = x
+        self._cums[self._pos] = self._cum
+        if x != x:
+            self._nan_ct += 1
+        else:
+            self._cum += x
+            self._neg_ct += x < 0
+            self._nonzero_ct += x != 0
+        self._pos = (self._pos + 1) % self.size
+
+    def copy(self):
+        clone = copy.copy(self)
+        clone._buf = self._buf.copy()
+        clone._cums = self._cums.copy()
+        return clone
+
+    def lag(self, n):
+        """Valor de n barras atrás (0 = mais recente); NaN se ainda não existir."""
+        if n >= self._count:
+            return NAN
+        return self._buf[(self._pos - 1 - n) % self.size]
+
+    def mean(self):
+        if self._count < self.size or self._nan_ct:
+            return NAN
+        # Com a janela cheia, _pos aponta para o valor mais antigo
+        result = (self._cum - self._cums[self._pos]) / self.size
+        if self._neg_ct == 0 and result < 0:
+            result = 0.0
+        if self._nonzero_ct == 0:
+            result = 0.0
+        return result
+
+    def std(self):
+        """Desvio padrão amostral (ddof=1); janela constante resulta em 0 exato."""
+        if self._count < self.size:
+            return NAN
+        window = np.array(self._buf[self._pos:] + self._buf[:self._pos])
+        if window.max() == window.min():
+            return 0.0
+        return float(window.std(ddof=1))
+
+
+class EWM:
+    """`ewm(span, adjust=False).mean()` do pandas, um valor por vez."""
+
+    def __init__(self, span):
+        com = (span - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self._old_factor = 1.0 - self.alpha
+        self._old_wt = 1.0
+        self.value = NAN
+
+    def push(self, x):
+        if self.value != self.value:
+            self.value = x
+        elif x == x:
+            old_wt = self._old_wt * self._old_factor
+            if self.value != x:
+                self.value = (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha)
+            self._old_wt = 1.0
+        else:
+            self._old_wt *= self._old_factor
+        return self.value
+
+
+class _EngineState:
+    """Estado corrente de todos os indicadores (copiado para revisar o último candle)."""
+
+    def __init__(self, n_columns, window_rows):
+        self.count = 0
+        self.first_date = None
+        self.last_date = None
+        self.last_bar = None
+
+        self.closes = RollingWindow(200)      # SMA200 e defasagens de 5/10/20 dias
+        self.bb = RollingWindow(20)
+        self.gain = RollingWindow(21)
+        self.loss = RollingWindow(21)
+        self.tr = RollingWindow(14)
+        self.vol = RollingWindow(20)
+        self.ema12 = EWM(12)
+        self.ema26 = EWM(26)
+        self.macd_signal = EWM(9)
+
+        self.macro_prev = (NAN, NAN, NAN)     # usd, brent, ibov em t-1
+        self.macro_prev2 = (NAN, NAN, NAN)    # ... em t-2
+        self.obv = 0.0
+        self.cum_vol = 0.0
+        self.cum_vol_price = 0.0
+
+        self.last_valid = [NAN] * n_columns   # ffill() por coluna
+        self.rows = deque(maxlen=window_rows)
+        self.dates = deque(maxlen=window_rows)
+        self.prices = deque(maxlen=window_rows)
+
+    def copy(self):
+        """
+        Cópia independente para o checkpoint do candle provisório. Só os buffers
+        mutáveis são copiados (as linhas da janela nunca mudam depois de gravadas):
+        bem mais barato que um deepcopy, que dominava a revisão a cada candle intraday.
+        """
+        clone = copy.copy(self)
+        for name in ('closes', 'bb', 'gain', 'loss', 'tr', 'vol'):
+            setattr(clone, name, getattr(self, name).copy())
+        for name in ('ema12', 'ema26', 'macd_signal'):
+            setattr(clone, name, copy.copy(getattr(self, name)))
+        clone.last_valid = self.last_valid.copy()
+        clone.rows = self.rows.copy()
+        clone.dates = self.dates.copy()
+        clone.prices = self.prices.copy()
+        return clone
+
+
+class StreamingIndicatorEngine:
+    """
+    Motor incremental das 34 features do modelo.
+
+    Mantém o estado de cada indicador (carry das EMAs, janelas circulares,
+    somas acumuladas de OBV/VWAP) e a janela das últimas `window_rows` linhas.
+    Cada candle diário novo atualiza tudo em O(1). O resultado é o mesmo de
+    `FeaturePipeline._compute_features_batch` sobre o mesmo histórico: as features
+    acumuladas (OBV, VWAP) dependem da primeira data, por isso o motor é
+    reinicializado quando o início do histórico muda.
+    """
+
+    def __init__(self, columns, window_rows=50):
+        self.columns = list(columns)
+        self.window_rows = window_rows
+        self._selic_idx = self.columns.index('Selic_t-1')
+        self._state = _EngineState(len(self.columns), window_rows)
+        self._checkpoint = None
+
+    # --- ESTADO ---
+    @property
+    def count(self):
+        return self._state.count
+
+    @property
+    def first_date(self):
+        return self._state.first_date
+
+    @property
+    def last_date(self):
+        return self._state.last_date
+
+    @property
+    def last_bar(self):
+        return self._state.last_bar
+
+    def reset(self):
+        self._state = _EngineState(len(self.columns), self.window_rows)
+        self._checkpoint = None
+
+    def seed(self, raw):
+        """Reprocessa todo o histórico `raw` (colunas close/high/low/volume/usd/brent/ibov)."""
+        self.reset()
+        values = raw[['close', 'high', 'low', 'volume', 'usd', 'brent', 'ibov']].to_numpy(dtype=float).tolist()
+        last = len(values) - 1
+        for i, (date, bar) in enumerate(zip(raw.index, values)):
+            self.update(date, bar, provisional=(i == last))
+
+    # --- ATUALIZAÇÃO ---
+    def update(self, date, bar, provisional=False):
+        """
+        Aplica um candle novo. `bar` = (close, high, low, volume, usd, brent, ibov).
+        Com provisional=True o estado anterior é guardado para `revise_last`
+        (candle do dia ainda em formação).
+        """
+        self._checkpoint = self._state.copy() if provisional else None
+        self._apply(self._state, date, tuple(bar))
+
+    def revise_last(self, date, bar):
+        """Substitui o último candle (precisa ter sido aplicado como provisional)."""
+        if self._checkpoint is None:
+            raise RuntimeError("último candle não é provisório")
+        self._state = self._checkpoint
+        self.update(date, bar, provisional=True)
+
+    def _apply(self, s, date, bar):
+        close, high, low, volume, usd, brent, ibov = bar
+        prev_close = s.closes.lag(0)
+        first = s.count == 0
+
+        # Macro (t-1) e retornos macro defasados
+        usd_1, brent_1, ibov_1 = s.macro_prev
+        usd_2, brent_2, ibov_2 = s.macro_prev2
+        ibov_ret = _div(ibov_1, ibov_2) - 1
+        brent_ret = _div(brent_1, brent_2) - 1
+        usd_ret = _div(usd_1, usd_2) - 1
+        s.macro_prev2, s.macro_prev = s.macro_prev, (usd, brent, ibov)
+
+        # Retornos e momentum
+        s.closes.push(close)
+        close_5, close_10, close_20 = s.closes.lag(5), s.closes.lag(10), s.closes.lag(20)
+        return_1 = _div(close, prev_close) - 1
+        return_5 = _div(close, close_5) - 1
+        return_20 = _div(close, close_20) - 1
+        dist_sma200 = _div(close, _nan_if_zero(s.closes.mean())) - 1
+
+        # RSI 21 (delta NaN na primeira barra conta como 0, igual ao `where` do pandas)
+        delta = close - prev_close
+        s.gain.push(delta if delta > 0 else 0.0)
+        s.loss.push(-delta if delta < 0 else -0.0)
+        rs = _div(s.gain.mean(), s.loss.mean())
+        rsi = 100 - _div(100, 1 + rs)
+
+        # MACD
+        macd = s.ema12.push(close) - s.ema26.push(close)
+        macd_signal = s.macd_signal.push(macd)
+
+        # ATR 14 (max ignorando NaN)
+        tr_parts = [v for v in (high - low, abs(high - prev_close), abs(low - prev_close)) if v == v]
+        s.tr.push(max(tr_parts) if tr_parts else NAN)
+        atr = s.tr.mean()
+
+        # Bollinger
+        s.bb.push(close)
+        bb_mid, bb_std = s.bb.mean(), s.bb.std()
+        bb_upper = bb_mid + bb_std * 2
+        bb_lower = bb_mid - bb_std * 2
+        bb_width = _div(bb_upper - bb_lower, _nan_if_zero(bb_mid))
+        bb_pos = _div(close - bb_lower, _nan_if_zero(bb_upper - bb_lower))
+
+        hl_ratio = _div(high, _nan_if_zero(low))
+        # np.log (e não math.log) para bater bit a bit com o cálculo vetorizado
+        log_hl = float(np.log(hl_ratio)) if hl_ratio == hl_ratio and hl_ratio > 0 else NAN
+        parkinson = math.sqrt(PARKINSON_K * log_hl ** 2) if log_hl == log_hl else NAN
+        range_hl = _div(high - low, _nan_if_zero(close))
+
+        # Volume (OBV e VWAP acumulados desde a primeira barra)
+        obv_step = ((delta > 0) - (delta < 0)) * volume if delta == delta else NAN
+        if obv_step == obv_step:
+            s.obv += obv_step
+        s.vol.push(volume)
+        volume_ratio = _div(volume, _nan_if_zero(s.vol.mean()))
+        vol_price = volume * ((high + low + close) / 3)
+        if volume == volume:
+            s.cum_vol += volume
+        if vol_price == vol_price:
+            s.cum_vol_price += vol_price
+        vwap = _div(s.cum_vol_price, _nan_if_zero(s.cum_vol)) if (volume == volume and vol_price == vol_price) else NAN
+
+        weekday, month = date.weekday(), date.month
+        row = [
+            usd_1, brent_1, ibov_1, NAN,
+            ibov_ret, brent_ret, usd_ret,
+            return_1, return_5, return_20,
+            dist_sma200,
+            close - close_5, close - close_10, close - close_20,
+            rsi,
+            macd, macd_signal,
+            atr,
+            bb_mid, bb_std, bb_upper, bb_lower, bb_width, bb_pos,
+            bb_std, parkinson, range_hl,
+            s.obv, volume_ratio, vwap,
+            DOW_SIN[weekday], DOW_COS[weekday], MONTH_SIN[month], MONTH_COS[month],
+        ]
+
+        # ffill() + fillna(0) do cálculo em lote
+        last_valid = s.last_valid
+        for i, v in enumerate(row):
+            if v != v:
+                row[i] = last_valid[i] if last_valid[i] == last_valid[i] else 0.0
+            else:
+                last_valid[i] = v
+
+        s.rows.append(row)
+        s.dates.append(date)
+        s.prices.append(close)
+        s.count += 1
+        if first:
+            s.first_date = date
+        s.last_date = date
+        s.last_bar = bar
+
+    # --- SAÍDA ---
+    def recent(self, selic, rows):
+        """Últimas `rows` linhas de features (rows, colunas) float64, sem DataFrame (caminho intraday)."""
+        s = self._state
+        values = np.array(list(itertools.islice(s.rows, max(0, len(s.rows) - rows), None)), dtype=float)
+        values = values.reshape(-1, len(self.columns))
+        values[:, self._selic_idx] = selic
+        if len(values) < rows:
+            values = np.vstack([np.zeros((rows - len(values), len(self.columns))), values])
+        return values
+
+    def window(self, selic):
+        """Últimas `window_rows` linhas de features (DataFrame) e os fechamentos correspondentes."""
+        s = self._state
+        values = np.array(s.rows, dtype=float).reshape(-1, len(self.columns))
+        values[:, self._selic_idx] = selic
+        features = pd.DataFrame(values, index=pd.DatetimeIndex(list(s.dates)), columns=self.columns)
+        p_close = pd.Series(list(s.prices), index=features.index, dtype=float)
+
+        # Se tiver menos linhas que a janela, preenche com zeros no começo
+        if len(features) < self.window_rows:
+            missing = self.window_rows - len(features)
+            zeros = pd.DataFrame(0, index=range(missing), columns=self.columns)
+            features = pd.concat([zeros, features])
+            p_close = pd.concat([pd.Series([0] * missing), p_close])
+        return features, p_close
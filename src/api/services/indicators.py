@@ -0,0 +1,283 @@
+import hashlib
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.api.config import MACRO_TICKERS
+
+# Kernels NumPy dos indicadores técnicos usados pelo modelo (FeaturePipeline) e pelo
+# painel (MarketDataService). Todos recebem arrays float64 1D e devolvem arrays do
+# mesmo tamanho, com NaN onde a janela ainda não está completa (semântica do
+# `rolling(n)` / `ewm(adjust=False)` / `shift` do pandas).
+
+PARKINSON_K = 1 / (4 * np.log(2))
+
+
+# --- UTILITÁRIOS ---
+def ffill(x):
+    """Propaga o último valor válido ao longo do último eixo (NaNs iniciais permanecem)."""
+    x = np.asarray(x, dtype=np.float64)
+    idx = np.where(np.isnan(x), 0, np.arange(x.shape[-1]))
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    return np.take_along_axis(x, idx, axis=-1)
+
+
+def nan_if_zero(x):
+    """Equivalente a `.replace(0, np.nan)`."""
+    return np.where(x == 0, np.nan, x)
+
+
+def cumsum(x):
+    """`cumsum()` do pandas: NaN fica NaN na saída mas não interrompe a soma."""
+    nan = np.isnan(x)
+    out = np.cumsum(np.where(nan, 0.0, x), axis=-1)
+    out[nan] = np.nan
+    return out
+
+
+def shift(x, n=1):
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full_like(x, np.nan)
+    if n < x.shape[-1]:
+        out[..., n:] = x[..., :x.shape[-1] - n]
+    return out
+
+
+def diff(x, n=1):
+    return x - shift(x, n)
+
+
+def pct_change(x, n=1):
+    """`pct_change(n, fill_method=None)`: x / x.shift(n) - 1 (x/0 -> inf)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return x / shift(x, n) - 1
+
+
+# --- JANELAS ---
+def rolling_mean(x, window):
+    """
+    Média móvel via soma acumulada: O(n) independente da janela.
+    Janelas com NaN resultam em NaN; janelas só de zeros resultam em 0 exato e
+    janelas sem valores negativos nunca ficam negativas (mesma garantia do pandas).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] < window:
+        return out
+
+    valid = ~np.isnan(x)
+    values = np.where(valid, x, 0.0)
+    zero = np.zeros(x.shape[:-1] + (1,))
+
+    def window_sum(a):
+        c = np.concatenate((zero, np.cumsum(a, axis=-1)), axis=-1)
+        return c[..., window:] - c[..., :-window]
+
+    sums = window_sum(values)
+    n_valid = window_sum(valid)
+    n_neg = window_sum(values < 0)
+    n_nonzero = window_sum(values != 0)
+
+    mean = sums / window
+    mean = np.where((n_neg == 0) & (mean < 0), 0.0, mean)
+    mean = np.where(n_nonzero == 0, 0.0, mean)
+    out[..., window - 1:] = np.where(n_valid == window, mean, np.nan)
+    return out
+
+
+def rolling_std(x, window, ddof=1):
+    """Desvio padrão móvel sobre a view deslizante (stride trick, sem cópia da entrada)."""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] < window:
+        return out
+
+    w = sliding_window_view(x, window, axis=-1)
+    std = w.std(axis=-1, ddof=ddof)
+    # Janela constante: desvio exatamente 0 (evita resíduos de arredondamento)
+    out[..., window - 1:] = np.where(w.max(axis=-1) == w.min(axis=-1), 0.0, std)
+    return out
+
+
+def ewm_mean(x, span):
+    """
+    `ewm(span, adjust=False).mean()` do pandas ao longo do último eixo. A recursão
+    é sequencial no tempo: em 1D o laço roda sobre floats nativos; com várias
+    séries (ex.: um ativo por linha) cada passo atualiza todas de uma vez.
+    Replica a atualização de pesos do pandas, inclusive com NaNs no meio da série.
+    """
+    alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+    old_factor = 1.0 - alpha
+    x = np.asarray(x, dtype=np.float64)
+    out = np.empty(x.shape)
+
+    if x.ndim == 1:
+        value, old_wt = np.nan, 1.0
+        for i, v in enumerate(x.tolist()):
+            if value != value:
+                value = v
+            elif v == v:
+                wt = old_wt * old_factor
+                if value != v:
+                    value = (wt * value + alpha * v) / (wt + alpha)
+                old_wt = 1.0
+            else:
+                old_wt *= old_factor
+            out[i] = value
+        return out
+
+    value = np.full(x.shape[:-1], np.nan)
+    old_wt = np.ones(x.shape[:-1])
+    for i in range(x.shape[-1]):
+        v = x[..., i]
+        start = np.isnan(value)
+        valid = ~np.isnan(v) & ~start
+        wt = old_wt * old_factor
+        with np.errstate(invalid='ignore'):
+            updated = np.where(value != v, (wt * value + alpha * v) / (wt + alpha), value)
+        value = np.where(start, v, np.where(valid, updated, value))
+        old_wt = np.where(valid, 1.0, np.where(start, old_wt, wt))
+        out[..., i] = value
+    return out
+
+
+# --- INDICADORES ---
+def rsi(close, period):
+    delta = diff(close)
+    gain = rolling_mean(np.where(delta > 0, delta, 0.0), period)
+    loss = rolling_mean(-np.where(delta < 0, delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """Linha MACD e linha de sinal."""
+    line = ewm_mean(close, fast) - ewm_mean(close, slow)
+    return line, ewm_mean(line, signal)
+
+
+def true_range(high, low, close):
+    prev_close = shift(close)
+    # fmax ignora NaN como o max(axis=1) do pandas
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def bollinger(close, window=20, k=2.0):
+    """Média, desvio, banda superior e banda inferior."""
+    middle = rolling_mean(close, window)
+    std = rolling_std(close, window)
+    return middle, std, middle + std * k, middle - std * k
+
+
+def obv(close, volume):
+    flow = np.sign(diff(close)) * volume
+    return cumsum(np.where(np.isnan(flow), 0.0, flow))
+
+
+def vwap(high, low, close, volume, window=None):
+    """VWAP acumulada pelo preço típico; com `window`, só sobre os últimos candles."""
+    typical = (high + low + close) / 3
+    if window is not None:
+        typical, volume = typical[..., -window:], volume[..., -window:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cumsum(volume * typical) / nan_if_zero(cumsum(volume))
+
+
+def parkinson(high, low):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(PARKINSON_K * (np.log(high / nan_if_zero(low)) ** 2))
+
+
+# --- BUFFER COMPARTILHADO ---
+INSTRUMENT_SERIES = ('close', 'high', 'low', 'volume')
+MACRO_SERIES = ('usd', 'brent', 'ibov')
+
+
+class OHLCVBuffer:
+    """
+    Séries de um ativo num único bloco contíguo (7, n) float64, com forward-fill
+    aplicado: OHLCV do ativo + fechamentos macro. Lido pelo FeaturePipeline e
+    pelo MarketDataService.
+    """
+
+    SERIES = INSTRUMENT_SERIES + MACRO_SERIES
+
+    def __init__(self, dates, values, ticker=None):
+        self.dates = dates
+        self.values = values
+        self.ticker = ticker
+        for i, name in enumerate(self.SERIES):
+            setattr(self, name, values[i])
+
+    @classmethod
+    def from_snapshot(cls, df_all, ticker):
+        """Monta o buffer a partir do DataFrame do yf.download (MultiIndex campo x ticker)."""
+        return OHLCVPanel.from_snapshot(df_all, [ticker]).buffer(ticker)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def last_date(self):
+        return self.dates[-1]
+
+    @cached_property
+    def digest(self):
+        """Hash do conteúdo (datas + valores): identifica o snapshot nas chaves de cache."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.dates.asi8.tobytes())
+        h.update(self.values.tobytes())
+        return h.hexdigest()
+
+    def to_frame(self):
+        return pd.DataFrame(self.values.T, index=self.dates, columns=list(self.SERIES))
+
+
+class OHLCVPanel:
+    """
+    Todos os ativos do snapshot de uma vez: OHLCV (4, ativos, n) e as séries macro
+    (3, n), baixadas e armazenadas uma única vez para todos. Os kernels operam no
+    último eixo, então as features de todos os ativos saem de um único passe.
+    """
+
+    def __init__(self, dates, tickers, ohlcv, macro):
+        self.dates = dates
+        self.tickers = list(tickers)
+        self.ohlcv = ohlcv
+        self.macro = macro
+        self._index = {t: i for i, t in enumerate(self.tickers)}
+        self._buffers = {}
+
+    @classmethod
+    def from_snapshot(cls, df_all, tickers, macro_tickers=None):
+        """Ativos sem dados no snapshot são ignorados; sem nenhum ativo, ValueError."""
+        macro_tickers = macro_tickers or MACRO_TICKERS
+        if df_all.empty or not isinstance(df_all.columns, pd.MultiIndex) or 'Close' not in df_all.columns:
+            raise ValueError("snapshot sem colunas OHLCV utilizáveis")
+        available = set(df_all.columns.tolist())
+        tickers = [t for t in tickers if ('Close', t) in available]
+        if not tickers:
+            raise ValueError("snapshot sem os ativos pedidos")
+
+        columns = [(f.capitalize(), t) for t in tickers for f in INSTRUMENT_SERIES]
+        columns += [('Close', macro_tickers[m]) for m in MACRO_SERIES]
+        values = ffill(df_all.reindex(columns=columns).to_numpy(dtype=np.float64).T)
+
+        n_inst = len(INSTRUMENT_SERIES) * len(tickers)
+        ohlcv = values[:n_inst].reshape(len(tickers), len(INSTRUMENT_SERIES), -1).transpose(1, 0, 2)
+        return cls(df_all.index, tickers, np.ascontiguousarray(ohlcv), np.ascontiguousarray(values[n_inst:]))
+
+    def __contains__(self, ticker):
+        return ticker in self._index
+
+    def buffer(self, ticker):
+        """OHLCVBuffer (7, n) de um ativo (montado uma vez e reaproveitado)."""
+        buffer = self._buffers.get(ticker)
+        if buffer is None:
+            if ticker not in self._index:
+                raise ValueError(f"snapshot sem {ticker}")
+            values = np.vstack([self.ohlcv[:, self._index[ticker]], self.macro])
+            buffer = self._buffers[ticker] = OHLCVBuffer(self.dates, values, ticker)
+        return buffer
@@ -0,0 +1,216 @@
+import os
+import tempfile
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from src.api.config import (
+    INFERENCE_BACKEND, INFERENCE_QUANTIZE,
+    INFERENCE_PARITY_ATOL, INFERENCE_PARITY_ATOL_QUANTIZED,
+)
+
+# Backends de inferência para a LSTM. Todos expõem `predict(batch) -> np.ndarray`
+# com batch (N, janela, features) em float32 e saída (N, 1), igual ao Keras.
+
+
+def _traced_function(model):
+    """tf.function com assinatura fixa (batch dinâmico) e a versão com pesos congelados."""
+    import tensorflow as tf
+    from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+
+    _, window, n_features = model.input_shape
+    spec = tf.TensorSpec([None, window, n_features], tf.float32, name="x")
+    fn = tf.function(lambda x: model(x, training=False), input_signature=[spec])
+    return fn, convert_variables_to_constants_v2(fn.get_concrete_function())
+
+
+class KerasBackend:
+    """Referência: `Model.predict` (monta data adapter e pipeline tf.data a cada chamada)."""
+    name = "keras"
+    quantized = False
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+
+class TFFunctionBackend:
+    """Grafo traçado uma única vez com input_signature fixa: sem retracing nem tf.data."""
+    name = "tf_function"
+    quantized = False
+
+    def __init__(self, model):
+        self._fn, _ = _traced_function(model)
+
+    def predict(self, batch):
+        return self._fn(np.asarray(batch, dtype=np.float32)).numpy()
+
+
+class TFLiteBackend:
+    """Modelo exportado para TFLite (ops Flex para a LSTM com batch dinâmico)."""
+    name = "tflite"
+
+    def __init__(self, model, quantize=False):
+        import tensorflow as tf
+
+        _, frozen = _traced_function(model)
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([frozen])
+        # TensorLists da LSTM com batch dinâmico não têm op nativa no TFLite
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+        converter._experimental_lower_tensor_list_ops = False
+        if quantize:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        self.quantized = quantize
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # aviso de depreciação do tf.lite.Interpreter
+            self._interpreter = tf.lite.Interpreter(model_content=converter.convert())
+        self._input = self._interpreter.get_input_details()[0]['index']
+        self._output = self._interpreter.get_output_details()[0]['index']
+        self._shape = None
+        # O Interpreter não é thread-safe
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape != self._shape:
+                self._interpreter.resize_tensor_input(self._input, batch.shape)
+                self._interpreter.allocate_tensors()
+                self._shape = batch.shape
+            self._interpreter.set_tensor(self._input, batch)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output).copy()
+
+
+class OnnxBackend:
+    """ONNX Runtime (CPU). Requer os pacotes opcionais `onnxruntime` e `tf2onnx`."""
+    name = "onnx"
+
+    def __init__(self, model, quantize=False):
+        try:
+            import onnxruntime as ort
+            import tf2onnx
+        except ImportError as e:
+            raise RuntimeError("backend 'onnx' requer os pacotes opcionais onnxruntime e tf2onnx") from e
+
+        fn, _ = _traced_function(model)
+        proto, _ = tf2onnx.convert.from_function(fn, input_signature=fn.input_signature, opset=17)
+        model_bytes = proto.SerializeToString()
+        if quantize:
+            model_bytes = self._quantize(model_bytes)
+        self.quantized = quantize
+
+        self._session = ort.InferenceSession(model_bytes, providers=["CPUExecutionProvider"])
+        self._input = self._session.get_inputs()[0].name
+
+    @staticmethod
+    def _quantize(model_bytes):
+        from onnxruntime.quantization import quantize_dynamic
+
+        with tempfile.TemporaryDirectory() as tmp:
+            src, dst = os.path.join(tmp, "model.onnx"), os.path.join(tmp, "model_int8.onnx")
+            with open(src, "wb") as f:
+                f.write(model_bytes)
+            quantize_dynamic(src, dst)
+            with open(dst, "rb") as f:
+                return f.read()
+
+    def predict(self, batch):
+        return self._session.run(None, {self._input: np.asarray(batch, dtype=np.float32)})[0]
+
+
+class NumpyBackend:
+    """LSTM em NumPy puro (sem grafo TF por modelo): leve para servir muitos ativos."""
+    name = "numpy"
+    quantized = False
+
+    def __init__(self, model):
+        from src.api.services.stacked_lstm import StackedLSTM
+
+        self._stacked = StackedLSTM([model])
+
+    def predict(self, batch):
+        return self._stacked.predict(np.asarray(batch, dtype=np.float32)[np.newaxis])[0]
+
+
+BACKENDS = {
+    "keras": KerasBackend,
+    "tf_function": TFFunctionBackend,
+    "tflite": TFLiteBackend,
+    "onnx": OnnxBackend,
+    "numpy": NumpyBackend,
+}
+
+
+def _build(name, model, quantize):
+    if name not in BACKENDS:
+        raise ValueError(f"backend desconhecido '{name}' (opções: {', '.join(BACKENDS)}, auto)")
+    if name in ("tflite", "onnx"):
+        return BACKENDS[name](model, quantize=quantize)
+    return BACKENDS[name](model)
+
+
+def _parity_batch(model, size=8):
+    """Lote determinístico no intervalo do MinMaxScaler para comparar backends."""
+    _, window, n_features = model.input_shape
+    return np.random.default_rng(42).random((size, window, n_features), dtype=np.float32)
+
+
+def check_parity(backend, model, reference=None):
+    """Erro absoluto máximo do backend contra o Keras. Levanta ValueError acima da tolerância."""
+    x = _parity_batch(model)
+    if reference is None:
+        reference = model.predict(x, verbose=0)
+    diff = float(np.max(np.abs(backend.predict(x) - reference)))
+    atol = INFERENCE_PARITY_ATOL_QUANTIZED if backend.quantized else INFERENCE_PARITY_ATOL
+    if not diff <= atol:
+        raise ValueError(f"paridade com Keras falhou (erro máx {diff:.2e} > {atol:.0e})")
+    return diff
+
+
+def _latency(backend, x, runs=20):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        backend.predict(x)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def load_inference_backend(model, name=INFERENCE_BACKEND, quantize=INFERENCE_QUANTIZE):
+    """
+    Constrói o backend configurado, faz o warm-up e valida a paridade com o Keras.
+    Com `auto`, mede todos os backends disponíveis e escolhe o mais rápido.
+    Se nenhum passar, volta para o KerasBackend.
+    """
+    candidates = list(BACKENDS) if name == "auto" else [name]
+    reference = model.predict(_parity_batch(model), verbose=0)
+    warmup = _parity_batch(model, size=2)
+
+    best, best_latency = None, None
+    for candidate in candidates:
+        try:
+            backend = _build(candidate, model, quantize)
+            backend.predict(warmup[:1])
+            backend.predict(warmup)
+            diff = check_parity(backend, model, reference)
+            latency = _latency(backend, warmup)
+        except Exception as e:
+            print(f"⚠️ Backend '{candidate}' indisponível: {e}")
+            continue
+
+        print(f"⚙️ Backend '{candidate}': paridade {diff:.1e}, {latency * 1000:.2f} ms por lote de 2")
+        if best is None or latency < best_latency:
+            best, best_latency = backend, latency
+
+    if best is None:
+        print("⚠️ Nenhum backend validado. Usando Keras.")
+        return KerasBackend(model)
+
+    print(f"✅ Backend de inferência: {best.name}")
+    return best
@@ -0,0 +1,85 @@
+import asyncio
+
+import numpy as np
+from prometheus_client import Histogram
+
+from src.api.config import INFERENCE_BATCH_WINDOW_MS, INFERENCE_BATCH_MAX_SIZE
+from src.api.services.executors import inference_executor
+
+INFERENCE_BATCH_SIZE_HIST = Histogram(
+    'model_inference_batch_size', 'Janelas por forward pass da LSTM',
+    buckets=[1, 2, 4, 8, 16, 32, 64],
+)
+
+
+class InferenceBatcher:
+    """
+    Micro-batching de inferência.
+
+    Cada chamada a `predict` enfileira suas janelas (k, 20, 34). As janelas
+    pendentes são empilhadas num único tensor e processadas em um forward pass
+    quando a janela de tempo expira ou o lote atinge `max_batch_size`.
+    Roda no event loop do worker: não precisa de locks.
+    """
+
+    def __init__(self, predict_fn=None, max_batch_size=INFERENCE_BATCH_MAX_SIZE,
+                 window_ms=INFERENCE_BATCH_WINDOW_MS, executor=inference_executor):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.window_s = window_ms / 1000.0
+        self.executor = executor
+
+        self._pending = []        # [(janelas, future)]
+        self._pending_rows = 0
+        self._flush_handle = None
+        self._tasks = set()
+
+    async def predict(self, windows):
+        """Recebe (k, janela, features) e devolve as k saídas do modelo, na mesma ordem."""
+        windows = np.asarray(windows, dtype=np.float32)
+        if windows.ndim == 2:
+            windows = windows[np.newaxis]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((windows, future))
+        self._pending_rows += len(windows)
+
+        if self._pending_rows >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_s, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        items, self._pending = self._pending, []
+        self._pending_rows = 0
+        if not items:
+            return
+
+        task = asyncio.ensure_future(self._run(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items):
+        batch = items[0][0] if len(items) == 1 else np.concatenate([w for w, _ in items], axis=0)
+        INFERENCE_BATCH_SIZE_HIST.observe(len(batch))
+        try:
+            outputs = await self.executor.run(self.predict_fn, batch)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for windows, future in items:
+            n = len(windows)
+            if not future.done():
+                future.set_result(outputs[offset:offset + n])
+            offset += n
@@ -0,0 +1,106 @@
+import os
+
+from src.api.config import (
+    MODELS_DIR, MODEL_NAME, MODEL_PATH, SCALER_X_PATH, SCALER_Y_PATH, DEFAULT_TICKER,
+    INSTRUMENT_MODEL_FILENAME, INSTRUMENT_SCALER_X_FILENAME, INSTRUMENT_SCALER_Y_FILENAME,
+    MACRO_TICKERS, INSTRUMENT_FIELDS,
+)
+from src.api.services.model_registry import model_registry
+
+
+def normalize_ticker(ticker):
+    """'vale3' -> 'VALE3.SA'. Tickers com sufixo, índices (^) e câmbio (=) ficam como estão."""
+    ticker = ticker.strip().upper()
+    if '.' not in ticker and not ticker.startswith('^') and '=' not in ticker:
+        ticker += ".SA"
+    return ticker
+
+
+class Instrument:
+    """Ativo servido pela API e os caminhos dos seus artefatos (modelo e scalers)."""
+
+    def __init__(self, ticker, model_path, scaler_x_path, scaler_y_path, model_name, manifest=None):
+        self.ticker = ticker
+        self.model_path = model_path
+        self.scaler_x_path = scaler_x_path
+        self.scaler_y_path = scaler_y_path
+        self.model_name = model_name
+        self.manifest = manifest   # ModelManifest quando os artefatos vêm do registro versionado
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        return cls(manifest.ticker, manifest.file("modelo"), manifest.file("scaler_x"), manifest.file("scaler_y"),
+                   manifest.modelo, manifest)
+
+    @property
+    def registry_version(self):
+        """Versão do registro (None para artefatos fora dele)."""
+        return self.manifest.versao if self.manifest else None
+
+    @property
+    def symbol(self):
+        return self.ticker.split('.')[0]
+
+    def __repr__(self):
+        return f"Instrument({self.ticker!r})"
+
+
+class InstrumentRegistry:
+    """
+    Ativos disponíveis. O ativo principal usa os artefatos de config.py; os demais
+    são descobertos em models/<TICKER>/ (um diretório por ticker com modelo e scalers).
+    Um ativo com versões no registro (models/registry/<TICKER>/) usa a versão estável.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR):
+        self.models_dir = models_dir
+        self._instruments = {}
+        self.discover()
+
+    def discover(self):
+        instruments = {
+            DEFAULT_TICKER: Instrument(DEFAULT_TICKER, MODEL_PATH, SCALER_X_PATH, SCALER_Y_PATH, MODEL_NAME),
+        }
+        if os.path.isdir(self.models_dir):
+            for entry in sorted(os.listdir(self.models_dir)):
+                folder = os.path.join(self.models_dir, entry)
+                paths = [os.path.join(folder, f) for f in (
+                    INSTRUMENT_MODEL_FILENAME, INSTRUMENT_SCALER_X_FILENAME, INSTRUMENT_SCALER_Y_FILENAME)]
+                if not os.path.isdir(folder) or not all(os.path.exists(p) for p in paths):
+                    continue
+                ticker = normalize_ticker(entry)
+                if ticker in instruments:
+                    continue
+                instruments[ticker] = Instrument(ticker, *paths, model_name=f"LSTM_{ticker.split('.')[0]}")
+        for entry in model_registry.tickers():
+            ticker = normalize_ticker(entry)
+            manifest = model_registry.stable_manifest(ticker)
+            if manifest is not None:
+                instruments[ticker] = Instrument.from_manifest(manifest)
+        self._instruments = instruments
+
+    @property
+    def tickers(self):
+        return list(self._instruments)
+
+    def get(self, ticker):
+        """Instrumento pelo ticker (aceita 'vale3', 'VALE3' ou 'VALE3.SA'); None se não existir."""
+        return self._instruments.get(normalize_ticker(ticker))
+
+    def __contains__(self, ticker):
+        return self.get(ticker) is not None
+
+    def __iter__(self):
+        return iter(self._instruments.values())
+
+    def __len__(self):
+        return len(self._instruments)
+
+    def market_fields(self):
+        """Campos baixados por ticker: OHLCV dos ativos + fechamento das séries macro."""
+        fields = {t: list(INSTRUMENT_FIELDS) for t in self._instruments}
+        fields.update({t: ["Close"] for t in MACRO_TICKERS.values()})
+        return fields
+
+
+instrument_registry = InstrumentRegistry()
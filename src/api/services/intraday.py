@@ -0,0 +1,298 @@
+import asyncio
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from prometheus_client import Counter, Gauge
+
+from src.api.config import (
+    INTRADAY_HISTORY_CAPACITY, INTRADAY_INTERVAL, INTRADAY_SESSION_CAPACITY,
+    MARKET_CACHE_RETRY_AFTER, SELIC_FALLBACK,
+)
+from src.api.services.executors import inference_executor, io_executor
+from src.api.services.feature_pipeline import FEATURE_COLUMNS
+from src.api.services.indicator_engine import StreamingIndicatorEngine
+from src.api.services.indicators import OHLCVBuffer
+from src.api.services.instruments import instrument_registry
+from src.api.services.market_cache import market_cache
+from src.api.services.market_calendar import B3_TZ, is_session_open, next_session_open, now_b3
+from src.api.services.market_providers import YahooProvider
+from src.api.services.ml_artifacts import get_artifacts
+from src.api.services.selic_provider import selic_provider
+from src.api.services.telemetry import staged
+
+INTRADAY_BARS_COUNTER = Counter('intraday_bars_total', 'Candles intraday processados', ['ticker'])
+INTRADAY_PRICE_GAUGE = Gauge('intraday_predicted_price_brl', 'Previsão D+1 re-pontuada no último candle intraday (R$)',
+                             ['ticker'], multiprocess_mode='mostrecent')
+
+SESSION_SERIES = ('close', 'high', 'low', 'volume')
+INTERVAL_SECONDS = {"1m": 60, "2m": 120, "5m": 300, "15m": 900}
+
+
+class BarRing:
+    """
+    Buffer circular de capacidade fixa: uma coluna float32 por série e os instantes
+    (epoch, s) em int64, alocados uma única vez. Cada barra é gravada duas vezes
+    (posições i e i + capacidade), de modo que as últimas n barras são sempre uma
+    fatia contígua, lida sem cópia nem concatenação.
+    """
+
+    def __init__(self, series, capacity):
+        self.series = tuple(series)
+        self.capacity = capacity
+        self._values = np.full((len(self.series), 2 * capacity), np.nan, dtype=np.float32)
+        self._times = np.zeros(2 * capacity, dtype=np.int64)
+        self._last = -1      # posição (< capacidade) da barra mais recente
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return self._values.nbytes + self._times.nbytes
+
+    def clear(self):
+        self._last = -1
+        self.count = 0
+
+    def append(self, when, values):
+        i = (self._last + 1) % self.capacity
+        self._write(i, when, values)
+        self._last = i
+        self.count = min(self.count + 1, self.capacity)
+
+    def replace_last(self, when, values):
+        """Substitui a barra mais recente (candle ainda em formação)."""
+        self._write(self._last, when, values)
+
+    def _write(self, i, when, values):
+        self._values[:, i] = self._values[:, i + self.capacity] = values
+        self._times[i] = self._times[i + self.capacity] = when
+
+    def last_time(self):
+        return int(self._times[self._last]) if self.count else None
+
+    def tail(self, n=None):
+        """(instantes (n,), valores (séries, n)) das últimas n barras, em ordem cronológica (views)."""
+        n = self.count if n is None else min(n, self.count)
+        end = self._last + self.capacity + 1
+        return self._times[end - n:end], self._values[:, end - n:end]
+
+
+@dataclass(frozen=True)
+class IntradayForecast:
+    """Previsão D+1 re-pontuada no último candle intraday."""
+    ticker: str
+    barra: datetime          # instante do último candle intraday
+    preco_atual: float       # fechamento desse candle
+    preco_previsto: float    # D+1 com o candle diário em formação
+    barras_sessao: int
+    gerado_em: datetime
+    modelo: str = ""         # nome da versão do modelo que re-pontuou
+
+
+class IntradayTracker:
+    """
+    Estado intraday de um ativo: candles diários anteriores e candles do pregão
+    atual em BarRings float32, mais o motor incremental das features.
+
+    O modelo é diário: os candles intraday revisam o candle do dia em formação
+    (fechamento = último preço, máxima/mínima/volume do pregão até agora, macro do
+    último pregão) com `revise_last` do motor, em O(1), e só a janela mais recente
+    é re-pontuada, uma vez por poll. Nenhum DataFrame é montado por barra.
+    """
+
+    def __init__(self, ticker, artifacts=None, session_capacity=INTRADAY_SESSION_CAPACITY,
+                 history_capacity=INTRADAY_HISTORY_CAPACITY):
+        self.ticker = ticker
+        self.artifacts = artifacts or get_artifacts(ticker)
+        self.window = self.artifacts.lstm_model.input_shape[1]
+        self.history = BarRing(OHLCVBuffer.SERIES, history_capacity)
+        self.session = BarRing(SESSION_SERIES, session_capacity)
+        self.engine = StreamingIndicatorEngine(FEATURE_COLUMNS, self.window)
+        self.session_date = None
+        self.last = None
+        self._provisional = False   # candle do dia já aplicado ao motor
+        self._pending = False       # candles do pregão gravados e ainda não aplicados ao motor
+        self._daily = None          # último candle do dia aplicado ao motor
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self.history.nbytes + self.session.nbytes
+
+    def seed(self, buffer, before=None):
+        """Carrega os candles diários do OHLCVBuffer anteriores ao pregão `before` (data) e reinicia o motor."""
+        with self._lock:
+            end = len(buffer) if before is None else int(buffer.dates.searchsorted(pd.Timestamp(before)))
+            self.history.clear()
+            for i in range(max(0, end - self.history.capacity), end):
+                self.history.append(buffer.dates[i].value // 10**9, buffer.values[:, i])
+            self.engine.reset()
+            times, values = self.history.tail()
+            for when, bar in zip(pd.to_datetime(times, unit='s'), values.T.tolist()):
+                self.engine.update(when, bar)
+            self.session.clear()
+            self.session_date = None
+            self._provisional = False
+            self._pending = False
+
+    def _roll(self, day):
+        """Novo pregão: o candle diário montado com os intraday do pregão anterior entra no histórico."""
+        if self.session.count:
+            self.history.append(pd.Timestamp(self.session_date).value // 10**9, self._daily_bar())
+        self.session.clear()
+        self.session_date = day
+        self._provisional = False
+        self._pending = False
+
+    def _daily_bar(self):
+        _, bars = self.session.tail()
+        close, high, low, volume = bars
+        # Macro do último pregão fechado (não há série intraday de dólar/Brent/Ibovespa)
+        _, previous = self.history.tail(1)
+        return (float(close[-1]), float(np.nanmax(high)), float(np.nanmin(low)),
+                float(np.nansum(volume, dtype=np.float64)), *previous[4:, 0].tolist())
+
+    def on_bar(self, when, close, high, low, volume, selic):
+        """Aplica um candle intraday (`when` com fuso horário) e devolve a previsão re-pontuada."""
+        when = pd.Timestamp(when).tz_convert(B3_TZ)
+        with self._lock:
+            if not self._push(when, close, high, low, volume):
+                return self.last
+            self._score(when, selic)
+        INTRADAY_BARS_COUNTER.labels(ticker=self.ticker).inc()
+        INTRADAY_PRICE_GAUGE.labels(ticker=self.ticker).set(self.last.preco_previsto)
+        return self.last
+
+    def on_frame(self, df, selic):
+        """
+        Candles (Close/High/Low/Volume) ainda não vistos de um DataFrame do provedor,
+        incluindo o último revisado. Todos entram no pregão, mas só a janela mais recente
+        é pontuada: o primeiro poll do pregão ou a volta após uma pausa custam uma
+        inferência, não uma por candle atrasado.
+        """
+        last = self.session.last_time() if self.session_date == now_b3().date() else None
+        index = df.index.tz_convert(B3_TZ)
+        stamps = index.asi8 // 10**9
+        rows = df[["Close", "High", "Low", "Volume"]].to_numpy(dtype=np.float64)
+        applied, newest = 0, None
+        with self._lock:
+            for when, stamp, row in zip(index, stamps, rows):
+                if (last is None or stamp >= last) and self._push(when, *row):
+                    applied, newest = applied + 1, when
+            if not applied:
+                return self.last
+            self._score(newest, selic)
+        INTRADAY_BARS_COUNTER.labels(ticker=self.ticker).inc(applied)
+        INTRADAY_PRICE_GAUGE.labels(ticker=self.ticker).set(self.last.preco_previsto)
+        return self.last
+
+    def _push(self, when, close, high, low, volume):
+        """Grava um candle no pregão, sem pontuar. False se vier vazio ou atrasado (já superado)."""
+        if close != close:
+            return False
+        if not self.history.count:
+            raise ValueError(f"histórico diário de {self.ticker} não carregado")
+        day = when.date()
+        if day != self.session_date:
+            self._apply_daily()   # candle final do pregão anterior no motor antes da virada
+            self._roll(day)
+        stamp = when.value // 10**9
+        last = self.session.last_time()
+        if last is not None and stamp < last:
+            return False
+        if stamp == last:
+            self.session.replace_last(stamp, (close, high, low, volume))
+        else:
+            self.session.append(stamp, (close, high, low, volume))
+        self._pending = True
+        return True
+
+    def _apply_daily(self):
+        """Aplica (ou revisa) no motor o candle do dia montado com os intraday gravados até agora."""
+        if not self._pending:
+            return
+        daily = self._daily_bar()
+        if self._provisional:
+            self.engine.revise_last(self.session_date, daily)
+        else:
+            self.engine.update(self.session_date, daily, provisional=True)
+            self._provisional = True
+        self._daily = daily
+        self._pending = False
+
+    def _score(self, when, selic):
+        """Re-pontua a janela mais recente (D+1 com o candle do dia em formação)."""
+        self._apply_daily()
+        features = self.engine.recent(selic, self.window)
+        with self.artifacts.input_windows(features, count=1) as window:
+            log_ret = self.artifacts.inverse_target(self.artifacts.predict(window))[0]
+        preco_atual = self._daily[0]
+        self.last = IntradayForecast(
+            ticker=self.ticker,
+            barra=when.to_pydatetime(),
+            preco_atual=preco_atual,
+            preco_previsto=float(preco_atual * np.exp(log_ret)),
+            barras_sessao=self.session.count,
+            gerado_em=datetime.now(),
+            modelo=self.artifacts.instrument.model_name,
+        )
+
+
+class IntradayService:
+    """Acompanhamento intraday de todos os ativos carregados durante o pregão (INTRADAY_ENABLED=true)."""
+
+    def __init__(self, interval=INTRADAY_INTERVAL, provider=None):
+        self.interval = interval
+        self.provider = provider or YahooProvider()
+        self._trackers = {}
+
+    def tracker(self, ticker):
+        tracker = self._trackers.get(ticker)
+        # Versão estável trocada (registro de modelos): um tracker novo, recarregado no próximo poll
+        if tracker is None or tracker.artifacts is not get_artifacts(ticker):
+            tracker = self._trackers[ticker] = IntradayTracker(ticker)
+        return tracker
+
+    def latest(self, ticker):
+        """Última previsão intraday do ativo (None antes do primeiro candle)."""
+        tracker = self._trackers.get(ticker)
+        return tracker.last if tracker else None
+
+    async def poll(self, ticker):
+        tracker = self.tracker(ticker)
+        today = now_b3().date()
+        if tracker.session_date != today:
+            # Uma vez por pregão: histórico diário oficial até o pregão anterior
+            buffer = await io_executor.run(market_cache.get_buffer, ticker)
+            await inference_executor.run(tracker.seed, buffer, today)
+        df = await io_executor.run(self.provider.fetch_intraday, ticker, self.interval)
+        selic = selic_provider.get(default=SELIC_FALLBACK)
+        return await inference_executor.run(staged("intraday", tracker.on_frame), df, selic)
+
+    async def run_live_loop(self):
+        """Consulta os candles a cada INTRADAY_INTERVAL enquanto o pregão está aberto."""
+        period = INTERVAL_SECONDS.get(self.interval, 300)
+        while True:
+            if not is_session_open():
+                await asyncio.sleep((next_session_open() - now_b3()).total_seconds())
+                continue
+            tickers = [t for t in instrument_registry.tickers if get_artifacts(t).is_loaded()]
+            if not tickers:
+                await asyncio.sleep(MARKET_CACHE_RETRY_AFTER)
+                continue
+            for ticker in tickers:
+                try:
+                    await self.poll(ticker)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"⚠️ Intraday ({ticker}): {e}")
+            await asyncio.sleep(period)
+
+
+intraday_service = IntradayService()
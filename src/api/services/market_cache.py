@@ -0,0 +1,151 @@
+import threading
+from datetime import timedelta
+
+from prometheus_client import Counter
+
+from src.api.config import DEFAULT_TICKER, MARKET_CACHE_TTL_OPEN, MARKET_CACHE_RETRY_AFTER
+from src.api.services.market_calendar import now_b3, snapshot_expiry
+from src.api.services.indicators import OHLCVPanel
+from src.api.services.instruments import instrument_registry
+from src.api.services.market_providers import MarketDataError
+from src.api.services.ohlcv_store import ohlcv_store
+from src.api.services.telemetry import stage
+
+MARKET_CACHE_COUNTER = Counter('market_cache_requests_total', 'Consultas ao snapshot de mercado', ['result'])
+
+
+class MarketSnapshotCache:
+    """
+    Snapshot OHLCV compartilhado entre FeaturePipeline e MarketDataService.
+
+    - Pregão aberto: o snapshot expira após MARKET_CACHE_TTL_OPEN segundos.
+    - Pregão fechado: o snapshot vale até a próxima abertura.
+    - Misses concorrentes compartilham um único download (single-flight).
+    - O histórico vem do OHLCVStore: cada refresh baixa só os candles novos.
+    - Se os provedores falharem, o snapshot anterior continua valendo (nova
+      tentativa em MARKET_CACHE_RETRY_AFTER); sem snapshot algum, MarketDataError.
+    """
+
+    def __init__(self, store=None, ttl_open=MARKET_CACHE_TTL_OPEN):
+        self.store = store or ohlcv_store
+        self.ttl_open = timedelta(seconds=ttl_open)
+
+        self._lock = threading.Lock()
+        self._data = None
+        self._fetched_at = None
+        self._expires_at = None
+        self._refreshing = None   # threading.Event do download em andamento
+        self._last_error = None
+        self._panel = None        # OHLCVPanel do snapshot atual
+        self._panel_source = None
+
+    def _expires_for(self, fetched_at):
+        return snapshot_expiry(fetched_at, self.ttl_open)
+
+    def _download(self):
+        """
+        Sincroniza o store (delta desde o último candle salvo) e monta o snapshot.
+        Retorna (df, fresh). Se o Yahoo falhar mas houver histórico em disco, serve o
+        histórico com fresh=False para que uma nova tentativa aconteça em breve.
+        """
+        fresh = True
+        try:
+            written = self.store.sync()
+            print(f"📥 Cache de mercado: Store OHLCV sincronizado ({written} candles gravados).")
+        except Exception as e:
+            if not self.store.has_data():
+                raise
+            print(f"⚠️ Cache de mercado: falha ao sincronizar ({e}). Usando histórico local.")
+            fresh = False
+
+        df_all = self.store.load_frame()
+        if df_all.empty or 'Close' not in df_all.columns:
+            raise MarketDataError("histórico de mercado vazio")
+        return df_all, fresh
+
+    def get_snapshot(self):
+        """
+        Retorna o DataFrame OHLCV (MultiIndex campo x ticker, formato do yf.download).
+        O DataFrame é compartilhado: quem consome não deve alterá-lo in-place.
+        """
+        with self._lock:
+            if self._data is not None and now_b3() < self._expires_at:
+                MARKET_CACHE_COUNTER.labels(result="hit").inc()
+                return self._data
+            event = self._refreshing
+            leader = event is None
+            if leader:
+                event = self._refreshing = threading.Event()
+        MARKET_CACHE_COUNTER.labels(result="miss" if leader else "coalesced").inc()
+
+        if not leader:
+            event.wait()
+            with self._lock:
+                if self._data is not None:
+                    return self._data
+                raise self._last_error
+
+        try:
+            return self._refresh()
+        finally:
+            with self._lock:
+                self._refreshing = None
+            event.set()
+
+    def get_panel(self):
+        """Séries de todos os ativos do snapshot atual em arrays contíguos (montadas uma vez por snapshot)."""
+        df_all = self.get_snapshot()
+        with self._lock:
+            if self._panel_source is df_all:
+                return self._panel
+        try:
+            panel = OHLCVPanel.from_snapshot(df_all, instrument_registry.tickers)
+        except ValueError as e:
+            raise MarketDataError(str(e)) from e
+        with self._lock:
+            if self._data is df_all:
+                self._panel, self._panel_source = panel, df_all
+        return panel
+
+    def get_buffer(self, ticker=DEFAULT_TICKER):
+        """OHLCVBuffer (7, n) de um ativo no snapshot atual (MarketDataError se o ativo não veio no snapshot)."""
+        panel = self.get_panel()
+        if ticker not in panel:
+            raise MarketDataError(f"snapshot de mercado sem {ticker}")
+        return panel.buffer(ticker)
+
+    def _refresh(self):
+        try:
+            with stage("market_snapshot"):
+                df_all, fresh = self._download()
+        except Exception as e:
+            error = e if isinstance(e, MarketDataError) else MarketDataError(f"dados de mercado indisponíveis ({e})")
+            with self._lock:
+                self._last_error = error
+                if self._data is None:
+                    if error is e:
+                        raise
+                    raise error from e
+                # Mantém o snapshot antigo e tenta de novo em breve
+                print(f"⚠️ Cache de mercado: falha no download ({e}). Servindo snapshot de {self._fetched_at:%Y-%m-%d %H:%M}.")
+                self._expires_at = now_b3() + timedelta(seconds=MARKET_CACHE_RETRY_AFTER)
+                return self._data
+
+        fetched_at = now_b3()
+        with self._lock:
+            self._data = df_all
+            self._fetched_at = fetched_at
+            if fresh:
+                self._expires_at = self._expires_for(fetched_at)
+                self._last_error = None
+            else:
+                self._expires_at = fetched_at + timedelta(seconds=MARKET_CACHE_RETRY_AFTER)
+        return df_all
+
+    def invalidate(self):
+        """Força o próximo acesso a baixar um snapshot novo."""
+        with self._lock:
+            self._expires_at = now_b3()
+
+
+market_cache = MarketSnapshotCache()
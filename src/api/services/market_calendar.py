@@ -0,0 +1,67 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from src.api.config import MARKET_TIMEZONE, MARKET_OPEN_TIME, MARKET_CLOSE_TIME
+
+# Calendário simplificado do pregão da B3: considera apenas dias úteis
+# (segunda a sexta), sem a lista de feriados.
+B3_TZ = ZoneInfo(MARKET_TIMEZONE)
+SESSION_OPEN = time.fromisoformat(MARKET_OPEN_TIME)
+SESSION_CLOSE = time.fromisoformat(MARKET_CLOSE_TIME)
+
+
+def now_b3():
+    """Horário atual no fuso da B3."""
+    return datetime.now(B3_TZ)
+
+
+def _to_b3(dt):
+    if dt is None:
+        return now_b3()
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=B3_TZ)
+    return dt.astimezone(B3_TZ)
+
+
+def is_trading_day(dt):
+    return dt.weekday() < 5
+
+
+def is_session_open(dt=None):
+    """True se `dt` (padrão: agora) estiver dentro do pregão regular."""
+    dt = _to_b3(dt)
+    return is_trading_day(dt) and SESSION_OPEN <= dt.time() < SESSION_CLOSE
+
+
+def next_session_open(dt=None):
+    """Próxima abertura de pregão estritamente depois de `dt`."""
+    dt = _to_b3(dt)
+    candidate = datetime.combine(dt.date(), SESSION_OPEN, tzinfo=B3_TZ)
+    if candidate <= dt:
+        candidate += timedelta(days=1)
+    while not is_trading_day(candidate):
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def next_session_close(dt=None):
+    """Próximo fechamento de pregão (hoje, se ainda não fechou)."""
+    dt = _to_b3(dt)
+    candidate = datetime.combine(dt.date(), SESSION_CLOSE, tzinfo=B3_TZ)
+    if candidate <= dt:
+        candidate += timedelta(days=1)
+    while not is_trading_day(candidate):
+        candidate += timedelta(days=1)
+    return candidate
+
+
+def snapshot_expiry(fetched_at, ttl_open):
+    """
+    Até quando um snapshot obtido em `fetched_at` vale: no pregão, `ttl_open`
+    (timedelta) sem passar do fechamento, para o candle final do dia sempre ser
+    buscado; fora dele, até a próxima abertura.
+    """
+    fetched_at = _to_b3(fetched_at)
+    if is_session_open(fetched_at):
+        return min(fetched_at + ttl_open, next_session_close(fetched_at))
+    return next_session_open(fetched_at)
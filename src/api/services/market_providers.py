@@ -0,0 +1,344 @@
+"""
+Provedores de dados de mercado (OHLCV diário) usados pelo store OHLCV.
+
+Cada provedor entrega o histórico de UM ticker. O MarketDataClient busca os
+tickers em paralelo e aplica, por provedor, timeout, novas tentativas, requisição
+duplicada (hedge) quando a primeira demora e um circuit breaker: durante uma
+queda o provedor é pulado na hora, sem esperar o timeout, e o snapshot anterior
+continua sendo servido pelo cache de mercado.
+"""
+import abc
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.api.config import (
+    MARKET_PROVIDERS, MARKET_REPLAY_PATH, MARKET_FETCH_TIMEOUT, MARKET_FETCH_CONCURRENCY,
+    MARKET_FETCH_RETRIES, MARKET_FETCH_BACKOFF, MARKET_HEDGE_AFTER, MARKET_BREAKER_FAILURES, MARKET_BREAKER_RESET,
+)
+
+PROVIDER_REQUESTS_COUNTER = Counter('market_provider_requests_total', 'Chamadas aos provedores de mercado', ['provider', 'result'])
+PROVIDER_LATENCY_HIST = Histogram(
+    'market_provider_seconds', 'Duração de cada chamada a um provedor de mercado', ['provider'],
+    buckets=[0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30],
+)
+PROVIDER_HEDGE_COUNTER = Counter('market_provider_hedges_total', 'Requisições duplicadas (hedge) por lentidão', ['provider'])
+CIRCUIT_STATE_GAUGE = Gauge('market_provider_circuit_open', 'Circuit breaker do provedor (1 = aberto)', ['provider'], multiprocess_mode='livemax')
+
+
+class MarketDataError(RuntimeError):
+    """Dados de mercado indisponíveis (provedor fora do ar e nenhum snapshot anterior)."""
+
+
+class CircuitOpenError(MarketDataError):
+    """Provedor com o circuit breaker aberto: a chamada nem é feita."""
+
+
+# --- PROVEDORES ---
+class MarketDataProvider(abc.ABC):
+    """Histórico diário de um ticker: DataFrame com as colunas pedidas e índice de datas."""
+    name = "base"
+    timeout = MARKET_FETCH_TIMEOUT
+    retries = 0
+    hedge_after = 0.0
+
+    @abc.abstractmethod
+    def fetch(self, ticker, fields, period=None, start=None):
+        """Histórico de `ticker` (período do yfinance, ex. "2y", ou a partir de `start`)."""
+
+    def fetch_intraday(self, ticker, interval):
+        """Candles intraday do pregão atual (Close/High/Low/Volume), índice com fuso horário."""
+        raise MarketDataError(f"provedor {self.name} não oferece candles intraday")
+
+
+class YahooProvider(MarketDataProvider):
+    """
+    Yahoo Finance via `Ticker.history`, uma instância por chamada. Ao contrário do
+    `yf.download`, não usa o estado global do yfinance, então vários tickers podem
+    ser baixados ao mesmo tempo em threads.
+    """
+    name = "yahoo"
+    retries = MARKET_FETCH_RETRIES
+    hedge_after = MARKET_HEDGE_AFTER
+
+    def __init__(self, timeout=MARKET_FETCH_TIMEOUT):
+        self.timeout = timeout
+
+    def fetch(self, ticker, fields, period=None, start=None):
+        df = yf.Ticker(ticker).history(period=period, start=start, auto_adjust=True, actions=False,
+                                       timeout=self.timeout, raise_errors=True)
+        if df is None or df.empty:
+            raise MarketDataError(f"Yahoo Finance não retornou dados para {ticker}")
+        return df[[f for f in fields if f in df.columns]]
+
+    def fetch_intraday(self, ticker, interval):
+        df = yf.Ticker(ticker).history(period="1d", interval=interval, auto_adjust=True, actions=False,
+                                       timeout=self.timeout, raise_errors=True)
+        if df is None or df.empty:
+            raise MarketDataError(f"Yahoo Finance não retornou candles intraday para {ticker}")
+        return df[["Close", "High", "Low", "Volume"]]
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Histórico gravado (layout do yf.download: MultiIndex campo x ticker). As datas
+    são deslocadas para terminar no último dia útil: o mesmo arquivo serve de
+    mercado "atual" em qualquer dia (desenvolvimento offline, benchmarks).
+    """
+    name = "replay"
+    timeout = 5.0
+
+    def __init__(self, frame, shift_to_today=True):
+        frame = frame.sort_index()
+        if shift_to_today:
+            frame = frame.set_axis(pd.bdate_range(end=pd.Timestamp.today().normalize(),
+                                                  periods=len(frame), name="Date"))
+        self.frame = frame
+
+    @classmethod
+    def from_file(cls, path=MARKET_REPLAY_PATH, **kwargs):
+        frame = pd.read_csv(path, header=[0, 1], index_col=0, parse_dates=True)
+        frame.columns = frame.columns.set_names(["Price", "Ticker"])
+        return cls(frame, **kwargs)
+
+    def fetch(self, ticker, fields, period=None, start=None):
+        if ticker not in self.frame.columns.get_level_values(1):
+            raise MarketDataError(f"{ticker} ausente do histórico gravado")
+        df = self.frame.xs(ticker, axis=1, level=1)
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        elif period is not None:
+            df = df[df.index >= df.index[-1] - pd.DateOffset(years=int(period.rstrip("y")))]
+        return df[[f for f in fields if f in df.columns]].dropna(how="all").copy()
+
+
+class SyntheticProvider(ReplayProvider):
+    """Passeio aleatório determinístico por ticker (mesmos preços em toda execução)."""
+    name = "synthetic"
+
+    def __init__(self, fields_by_ticker, rows=520, end="2025-06-30"):
+        idx = pd.bdate_range(end=end, periods=rows, name="Date")
+        cols = {}
+        for ticker, fields in fields_by_ticker.items():
+            rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+            close = 10 ** rng.uniform(1, 2) * np.exp(np.cumsum(rng.normal(0, 0.015, rows)))
+            series = {
+                "Close": close,
+                "High": close * (1 + np.abs(rng.normal(0, 0.01, rows))),
+                "Low": close * (1 - np.abs(rng.normal(0, 0.01, rows))),
+                "Volume": rng.integers(1e6, 5e7, rows).astype(float),
+            }
+            for field in fields:
+                cols[(field, ticker)] = series[field]
+        frame = pd.DataFrame(cols, index=idx)
+        frame.columns = pd.MultiIndex.from_tuples(frame.columns, names=["Price", "Ticker"])
+        super().__init__(frame)
+
+
+# --- CIRCUIT BREAKER ---
+class CircuitBreaker:
+    """
+    Fechado: chamadas normais. Após `failures` falhas seguidas abre e recusa tudo
+    por `reset_after` segundos; depois deixa passar uma única chamada de teste
+    (meio-aberto), que fecha o circuito se der certo ou o reabre se falhar.
+    """
+
+    def __init__(self, name, failures=MARKET_BREAKER_FAILURES, reset_after=MARKET_BREAKER_RESET):
+        self.name = name
+        self.failures = failures
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"✅ Provedor de mercado '{self.name}': circuito fechado.")
+            self._consecutive, self._opened_at, self._probing = 0, None, False
+        CIRCUIT_STATE_GAUGE.labels(provider=self.name).set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._probing or (self._opened_at is None and self._consecutive >= self.failures):
+                print(f"⛔ Provedor de mercado '{self.name}': circuito aberto por {self.reset_after:.0f}s "
+                      f"({self._consecutive} falhas seguidas).")
+                self._opened_at = time.monotonic()
+            self._probing = False
+        if self.is_open:
+            CIRCUIT_STATE_GAUGE.labels(provider=self.name).set(1)
+
+
+# --- CLIENTE ---
+class _Call:
+    """Estado de um ticker num provedor: tentativas, hedge e chamadas em voo."""
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.attempts = 0
+        self.hedged = False
+        self.inflight = {}        # future -> início (monotonic)
+        self.retry_at = None
+        self.error = None
+        self.result = None
+
+
+class MarketDataClient:
+    """Busca vários tickers em paralelo nos provedores, em ordem de preferência."""
+
+    def __init__(self, providers, max_workers=MARKET_FETCH_CONCURRENCY, backoff=MARKET_FETCH_BACKOFF):
+        self.providers = list(providers)
+        self.backoff = backoff
+        self.breakers = {p.name: CircuitBreaker(p.name) for p in self.providers}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="market")
+
+    def fetch_many(self, fields_by_ticker, period=None, start=None):
+        """
+        Retorna ({ticker: DataFrame}, {ticker: erro}). Tickers que falham num
+        provedor são pedidos ao próximo; os erros são os do último provedor tentado.
+        """
+        frames, errors = {}, {}
+        for provider in self.providers:
+            pending = [t for t in fields_by_ticker if t not in frames]
+            if not pending:
+                break
+            got, failed = self._fetch_from(provider, {t: fields_by_ticker[t] for t in pending}, period, start)
+            frames.update(got)
+            errors = failed
+        return frames, {t: e for t, e in errors.items() if t not in frames}
+
+    def _submit(self, provider, call, fields, period, start):
+        call.inflight[self._pool.submit(self._timed, provider, call.ticker, fields, period, start)] = time.monotonic()
+
+    @staticmethod
+    def _timed(provider, ticker, fields, period, start):
+        t0 = time.perf_counter()
+        try:
+            return provider.fetch(ticker, fields, period=period, start=start)
+        finally:
+            PROVIDER_LATENCY_HIST.labels(provider=provider.name).observe(time.perf_counter() - t0)
+
+    def _fetch_from(self, provider, fields_by_ticker, period, start):
+        breaker = self.breakers[provider.name]
+        calls = {t: _Call(t) for t in fields_by_ticker}
+        for call in calls.values():
+            call.retry_at = 0.0
+
+        def settle(call, error):
+            """Falha de uma tentativa: agenda outra, se ainda houver, ou desiste do ticker."""
+            call.error = error
+            if call.inflight:
+                return
+            # Só consulta o estado: allow() no meio-aberto tomaria a vaga da chamada de teste
+            if call.attempts <= provider.retries and not breaker.is_open:
+                call.retry_at = time.monotonic() + self.backoff * 2 ** (call.attempts - 1)
+            else:
+                call.retry_at = None
+
+        while True:
+            now = time.monotonic()
+            open_calls = [c for c in calls.values() if c.result is None and (c.inflight or c.retry_at is not None)]
+            if not open_calls:
+                break
+
+            for call in open_calls:
+                if not call.inflight and call.retry_at is not None and now >= call.retry_at:
+                    call.retry_at = None
+                    if call.attempts > 0 or breaker.allow():
+                        call.attempts += 1
+                        self._submit(provider, call, fields_by_ticker[call.ticker], period, start)
+                    else:
+                        call.error = CircuitOpenError(f"provedor '{provider.name}' com circuito aberto")
+                        PROVIDER_REQUESTS_COUNTER.labels(provider=provider.name, result="circuit_open").inc()
+                elif (len(call.inflight) == 1 and not call.hedged and provider.hedge_after
+                      and now - next(iter(call.inflight.values())) >= provider.hedge_after):
+                    # Primeira chamada lenta: dispara uma cópia e fica com a que responder antes
+                    call.hedged = True
+                    PROVIDER_HEDGE_COUNTER.labels(provider=provider.name).inc()
+                    self._submit(provider, call, fields_by_ticker[call.ticker], period, start)
+
+                for future, started in list(call.inflight.items()):
+                    if not future.done() and now - started >= provider.timeout:
+                        # A thread termina sozinha (o yfinance também tem timeout); a resposta é ignorada
+                        del call.inflight[future]
+                        PROVIDER_REQUESTS_COUNTER.labels(provider=provider.name, result="timeout").inc()
+                        breaker.record_failure()
+                        settle(call, TimeoutError(f"{provider.name} não respondeu em {provider.timeout:g}s"))
+
+            inflight = {f: c for c in calls.values() if c.result is None for f in c.inflight}
+            if not inflight:
+                pending_retries = [c.retry_at for c in calls.values() if c.result is None and c.retry_at is not None]
+                if pending_retries:
+                    time.sleep(max(0.0, min(pending_retries) - time.monotonic()))
+                continue
+
+            done, _ = wait(inflight, timeout=self._next_deadline(provider, calls), return_when=FIRST_COMPLETED)
+            for future in done:
+                call = inflight[future]
+                call.inflight.pop(future, None)
+                if call.result is not None:
+                    continue
+                try:
+                    call.result = future.result()
+                    call.inflight.clear()  # a outra cópia (hedge), se houver, é descartada
+                    PROVIDER_REQUESTS_COUNTER.labels(provider=provider.name, result="ok").inc()
+                    breaker.record_success()
+                except Exception as e:
+                    PROVIDER_REQUESTS_COUNTER.labels(provider=provider.name, result="error").inc()
+                    breaker.record_failure()
+                    settle(call, e)
+
+        frames = {t: c.result for t, c in calls.items() if c.result is not None}
+        errors = {t: c.error for t, c in calls.items() if c.result is None}
+        return frames, errors
+
+    @staticmethod
+    def _next_deadline(provider, calls):
+        """Tempo até o próximo evento: timeout ou hedge de alguma chamada em voo, ou um retry agendado."""
+        now = time.monotonic()
+        deadlines = []
+        for call in calls.values():
+            if call.result is not None:
+                continue
+            for started in call.inflight.values():
+                deadlines.append(started + provider.timeout)
+                if provider.hedge_after and not call.hedged:
+                    deadlines.append(started + provider.hedge_after)
+            if call.retry_at is not None:
+                deadlines.append(call.retry_at)
+        return max(0.0, min(deadlines) - now) if deadlines else None
+
+
+def build_provider(name, fields_by_ticker=None):
+    if name == "yahoo":
+        return YahooProvider()
+    if name == "replay":
+        return ReplayProvider.from_file()
+    if name == "synthetic":
+        return SyntheticProvider(fields_by_ticker or {})
+    raise ValueError(f"provedor de mercado desconhecido: {name} (use yahoo, replay ou synthetic)")
+
+
+def build_client(fields_by_ticker, names=MARKET_PROVIDERS):
+    return MarketDataClient([build_provider(n, fields_by_ticker) for n in names])
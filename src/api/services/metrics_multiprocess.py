@@ -0,0 +1,136 @@
+import fcntl
+import glob
+import os
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+from prometheus_client.mmap_dict import MmapedDict
+from prometheus_client.multiprocess import MultiProcessCollector, mark_process_dead
+from starlette.responses import Response
+
+# Métricas compartilhadas entre workers HTTP (prometheus_client em modo multiprocess).
+# Cada worker grava os valores em arquivos mmap próprios em PROMETHEUS_MULTIPROC_DIR e
+# qualquer worker que receba o scrape agrega todos eles. O diretório precisa existir
+# (e estar vazio) antes de o prometheus_client ser importado: `python -m src.api.run` cuida disso.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR", "")
+
+# Como combinar os valores de workers mortos no arquivo consolidado (`<tipo>_archive.db`)
+_COMBINE = {
+    "counter": lambda old, new: (old[0] + new[0], max(old[1], new[1])),
+    "histogram": lambda old, new: (old[0] + new[0], max(old[1], new[1])),
+    "summary": lambda old, new: (old[0] + new[0], max(old[1], new[1])),
+    "gauge_sum": lambda old, new: (old[0] + new[0], max(old[1], new[1])),
+    "gauge_max": max,
+    "gauge_min": min,
+    "gauge_mostrecent": lambda old, new: max(old, new, key=lambda v: v[1]),
+}
+ARCHIVE = "archive"
+
+
+def enabled():
+    return bool(MULTIPROC_DIR)
+
+
+def prepare_directory(path):
+    """Cria o diretório e apaga arquivos de execuções anteriores (antes de subir os workers)."""
+    os.makedirs(path, exist_ok=True)
+    for f in glob.glob(os.path.join(path, "*.db")):
+        os.remove(f)
+
+
+@contextmanager
+def _locked(path, mode):
+    with open(os.path.join(path, ".lock"), "a") as lock:
+        fcntl.flock(lock, mode)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _files_by_pid(path):
+    """{pid: [(kind, arquivo)]} com kind = counter | histogram | summary | gauge_<modo>."""
+    files = {}
+    for f in glob.glob(os.path.join(path, "*.db")):
+        *kind, pid = os.path.basename(f)[:-3].split("_")
+        if pid.isdigit():
+            files.setdefault(int(pid), []).append(("_".join(kind), f))
+    return files
+
+
+def _archive(path, kind, files):
+    """Soma/consolida os valores dos arquivos no `<kind>_archive.db` e apaga os originais."""
+    combine = _COMBINE[kind]
+    archive = MmapedDict(os.path.join(path, f"{kind}_{ARCHIVE}.db"))
+    try:
+        values = {key: (value, ts) for key, value, ts in archive.read_all_values()}
+        for f in files:
+            for key, value, ts, _ in MmapedDict.read_all_values_from_file(f):
+                values[key] = combine(values[key], (value, ts)) if key in values else (value, ts)
+        for key, (value, ts) in values.items():
+            archive.write_value(key, value, ts)
+    finally:
+        archive.close()
+    for f in files:
+        os.remove(f)
+
+
+def reap_dead_workers(path=MULTIPROC_DIR):
+    """
+    Remove os gauges `live*` dos workers que morreram e consolida os demais arquivos
+    deles num único arquivo por tipo. Contadores e histogramas continuam somando o que
+    o worker morto registrou, mas o scrape lê sempre ~1 arquivo por worker vivo, e não
+    um por processo que já existiu. Devolve os PIDs consolidados.
+    """
+    dead = {pid: files for pid, files in _files_by_pid(path).items() if not _alive(pid)}
+    if not dead:
+        return []
+    with _locked(path, fcntl.LOCK_EX):
+        by_kind = {}
+        for pid, files in dead.items():
+            mark_process_dead(pid, path)
+            for kind, f in files:
+                # gauge_all mantém um valor por PID: não há o que consolidar
+                if kind in _COMBINE and os.path.exists(f):
+                    by_kind.setdefault(kind, []).append(f)
+        for kind, files in by_kind.items():
+            _archive(path, kind, files)
+    return sorted(dead)
+
+
+class WorkerAggregateCollector(MultiProcessCollector):
+    """MultiProcessCollector que limpa os workers mortos antes de agregar."""
+
+    def collect(self):
+        reap_dead_workers(self._path)
+        # Leitura com lock compartilhado: nunca vê um worker já consolidado e ainda não apagado
+        with _locked(self._path, fcntl.LOCK_SH):
+            return super().collect()
+
+
+_registry = None
+
+
+def metrics_endpoint(request):
+    """/metrics com a soma de todos os workers (substitui o expose do Instrumentator)."""
+    global _registry
+    if _registry is None:
+        _registry = CollectorRegistry()
+        WorkerAggregateCollector(_registry, MULTIPROC_DIR)
+    return Response(generate_latest(_registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_worker_exit():
+    """Tira os gauges `live*` deste worker já no encerramento (o resto é consolidado no próximo scrape)."""
+    if enabled():
+        mark_process_dead(os.getpid(), MULTIPROC_DIR)
@@ -0,0 +1,330 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+import pandas as pd
+from prometheus_client import Gauge
+
+from src.api.config import (
+    DEFAULT_TICKER, INFERENCE_PARITY_ATOL, PREDICTION_HORIZON_DAYS, UNCERTAINTY_MODE, UNCERTAINTY_SAMPLES,
+)
+from src.api.services.feature_pipeline import FEATURE_COLUMNS
+from src.api.services.inference_backend import load_inference_backend, _parity_batch
+from src.api.services.instruments import instrument_registry
+from src.api.services.preprocessing import FusedPreprocessor
+from src.api.services.stacked_lstm import StackedLSTM, architecture
+from src.api.services.uncertainty import MCDropoutSampler, sample_seed
+
+
+STARTUP_PHASE_GAUGE = Gauge('model_startup_phase_seconds', 'Duração das fases de carga do modelo (s)', ['ticker', 'phase'], multiprocess_mode='livemax')
+MODEL_READY_GAUGE = Gauge('model_ready', '1 quando o modelo passou pelo warm-up e está servindo', ['ticker'], multiprocess_mode='livemin')
+
+_tf_import_lock = threading.Lock()
+_tf_import_seconds = None
+
+
+def _import_tensorflow():
+    """Importa o TensorFlow sob demanda (fora do import da API) e mede o tempo uma única vez."""
+    global _tf_import_seconds
+    with _tf_import_lock:
+        start = time.perf_counter()
+        import tensorflow as tf
+        if _tf_import_seconds is None:
+            _tf_import_seconds = time.perf_counter() - start
+        return tf
+
+
+class MLArtifacts:
+    """Modelo LSTM, scalers e o backend de inferência de um ativo."""
+
+    def __init__(self, instrument):
+        self.instrument = instrument
+        self.lstm_model = None
+        self.scaler_x = None
+        self.scaler_y = None
+        self.preprocessor = None
+        self.sampler = None
+        self.backend = None
+        self.version = None
+        # pending -> loading -> ready | failed
+        self.status = "pending"
+        self.error = None
+        self.timings = {}
+
+    def _phase(self, name, fn, announce=True):
+        start = time.perf_counter()
+        result = fn()
+        self.timings[name] = round(time.perf_counter() - start, 4)
+        if announce:
+            STARTUP_PHASE_GAUGE.labels(ticker=self.instrument.ticker, phase=name).set(self.timings[name])
+        return result
+
+    def load(self, announce=True):
+        """
+        Carrega modelo e scalers, monta o backend e só marca pronto após o warm-up.
+        Com announce=False (versão nova carregada em segundo plano), as métricas de
+        carga e prontidão do ativo continuam sendo as da versão em serviço.
+        """
+        instrument = self.instrument
+        self.status, self.error, self.timings = "loading", None, {}
+        if announce:
+            MODEL_READY_GAUGE.labels(ticker=instrument.ticker).set(0)
+        try:
+            for path in (instrument.model_path, instrument.scaler_x_path, instrument.scaler_y_path):
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"artefato não encontrado: {path}")
+            if instrument.manifest is not None:
+                self._phase("verify", instrument.manifest.verify, announce)
+
+            tf = self._phase("import", _import_tensorflow, announce)
+
+            def deserialize():
+                self.lstm_model = tf.keras.models.load_model(instrument.model_path)
+                self.scaler_x = joblib.load(instrument.scaler_x_path)
+                self.scaler_y = joblib.load(instrument.scaler_y_path)
+
+            self._phase("deserialize", deserialize, announce)
+            self._check_manifest()
+            print(f"✅ LSTM Real carregada: {instrument.model_path}")
+            self.preprocessor = self._phase("preprocess", self._compile_preprocessor, announce)
+            self.backend = self._phase("backend", lambda: load_inference_backend(self.lstm_model), announce)
+            self.sampler = self._phase("uncertainty", self._build_sampler, announce)
+            self._phase("warmup", self._warm_up, announce)
+            self.version = self._version()
+            self.status = "ready"
+            if announce:
+                MODEL_READY_GAUGE.labels(ticker=instrument.ticker).set(1)
+            print(f"🚀 {instrument.ticker} pronto: " + ", ".join(f"{k} {v:.2f}s" for k, v in self.timings.items()))
+        except Exception as e:
+            self.backend = self.preprocessor = self.sampler = None
+            self.status, self.error = "failed", f"{type(e).__name__}: {e}"
+            print(f"❌ Erro ML ({instrument.ticker}): {e}")
+
+    def _check_manifest(self):
+        """Janela e ordem das features do manifest conferem com o modelo, o scaler_x e o pipeline."""
+        manifest = self.instrument.manifest
+        if manifest is None:
+            return
+        if self.lstm_model.input_shape[1:] != (manifest.janela, len(FEATURE_COLUMNS)):
+            raise ValueError(f"entrada do modelo {self.lstm_model.input_shape[1:]} difere do manifest "
+                             f"({manifest.janela}, {len(FEATURE_COLUMNS)})")
+        if list(manifest.features) != FEATURE_COLUMNS:
+            raise ValueError("ordem das features do manifest difere da do pipeline")
+        names = getattr(self.scaler_x, 'feature_names_in_', None)
+        if names is not None and list(names) != list(manifest.features):
+            raise ValueError("ordem das features do scaler_x difere da do manifest")
+
+    def _compile_preprocessor(self):
+        """Scalers compilados (ver FusedPreprocessor); se não forem compiláveis ou divergirem, segue com o sklearn."""
+        try:
+            preprocessor = FusedPreprocessor(self.scaler_x, self.scaler_y, FEATURE_COLUMNS, self.lstm_model.input_shape[1])
+            preprocessor.check_parity(self.scaler_x, self.scaler_y)
+            return preprocessor
+        except (TypeError, ValueError, KeyError) as e:
+            print(f"⚠️ Pré-processamento compilado indisponível ({self.instrument.ticker}), usando sklearn: {e}")
+            return None
+
+    def _build_sampler(self):
+        if UNCERTAINTY_MODE != "mc_dropout":
+            return None
+        try:
+            sampler = MCDropoutSampler(self.lstm_model, UNCERTAINTY_SAMPLES, PREDICTION_HORIZON_DAYS)
+            sampler.sample(np.zeros(self.lstm_model.input_shape[1:], dtype=np.float32), seed=0)
+            return sampler
+        except ValueError as e:
+            print(f"⚠️ Faixas de incerteza indisponíveis ({self.instrument.ticker}), usando confiança fixa: {e}")
+            return None
+
+    def _warm_up(self):
+        """Inferência completa (scaler_x -> backend -> scaler_y) sobre uma janela neutra."""
+        _, window, n_features = self.lstm_model.input_shape
+        columns = getattr(self.scaler_x, 'feature_names_in_', None)
+        if columns is not None:
+            with self.input_windows(pd.DataFrame(0.0, index=range(window + 1), columns=columns)) as windows:
+                out = self.predict(windows)
+        else:
+            out = self.predict(np.zeros((2, window, n_features), dtype=np.float32))
+        values = self.inverse_target(out)
+        if not np.all(np.isfinite(values)):
+            raise ValueError("warm-up produziu valores não finitos")
+
+    def _version(self):
+        """Nome do modelo + hash dos artefatos e backend: muda sempre que a saída pode mudar."""
+        instrument = self.instrument
+        digest = hashlib.sha256()
+        if instrument.manifest is not None:
+            # Arquivos já conferidos com o manifest: os hashes dele bastam
+            for name in sorted(instrument.manifest.sha256):
+                digest.update(instrument.manifest.sha256[name].encode())
+        else:
+            for path in (instrument.model_path, instrument.scaler_x_path, instrument.scaler_y_path):
+                if os.path.exists(path):
+                    with open(path, "rb") as f:
+                        digest.update(f.read())
+        backend = self.backend.name + ("-int8" if self.backend.quantized else "") if self.backend else "none"
+        return f"{instrument.model_name}:{digest.hexdigest()[:12]}:{backend}"
+
+    def is_loaded(self):
+        return self.status == "ready"
+
+    def state(self):
+        return {"status": self.status, "erro": self.error, "fases_s": dict(self.timings), "versao": self.version,
+                "versao_registro": self.instrument.registry_version}
+
+    def scale_features(self, features_df):
+        """Aplica o scaler_x às colunas conhecidas por ele e devolve a matriz (linhas, features)."""
+        if self.preprocessor is not None:
+            return self.preprocessor.transform(features_df)
+        scaler_x = self.scaler_x
+        # Precisamos escalar tudo de uma vez para ser eficiente
+        if hasattr(scaler_x, 'feature_names_in_'):
+            cols_to_scale = scaler_x.feature_names_in_
+        else:
+            cols_to_scale = features_df.columns
+
+        X_full_df = features_df.copy()
+        valid_cols = [c for c in cols_to_scale if c in X_full_df.columns]
+        X_full_df[valid_cols] = scaler_x.transform(X_full_df[valid_cols])
+        return X_full_df.values
+
+    @contextmanager
+    def input_windows(self, features, count=1):
+        """
+        As `count` últimas janelas (count, 20, 34) em float32; a última é a do usuário.
+        O buffer volta ao pool ao sair do bloco: use-o só dentro dele.
+        """
+        if self.preprocessor is not None:
+            with self.preprocessor.borrow(count) as out:
+                yield self.preprocessor.windows(features, out)
+            return
+        if not isinstance(features, pd.DataFrame):
+            features = pd.DataFrame(features, columns=FEATURE_COLUMNS)
+        X = self.scale_features(features).astype(np.float32)
+        window = self.lstm_model.input_shape[1]
+        yield np.stack([X[len(X) - window - i:len(X) - i] for i in reversed(range(count))])
+
+    def inverse_target(self, preds):
+        """Saídas escaladas do modelo -> log-retornos (N,)."""
+        if self.preprocessor is not None:
+            return self.preprocessor.inverse(preds)
+        return self.scaler_y.inverse_transform(np.asarray(preds).reshape(-1, 1))[:, 0]
+
+    def sample_log_returns(self, window, key):
+        """Trajetórias MC-dropout de log-retorno (amostras, dias) da janela (20, 34); None sem sampler."""
+        if self.sampler is None:
+            return None
+        return self.inverse_target(self.sampler.sample(window, sample_seed(key))).reshape(self.sampler.samples, -1)
+
+    def predict(self, batch):
+        """Forward pass único sobre um lote (N, 20, 34)."""
+        return self.backend.predict(batch)
+
+
+class InferenceGroup:
+    """Ativos cujos modelos têm a mesma arquitetura, avaliados num único forward pass."""
+
+    def __init__(self, members):
+        self.tickers = [a.instrument.ticker for a in members]
+        self.members = dict(zip(self.tickers, members))
+        self.stacked = StackedLSTM([a.lstm_model for a in members])
+
+    def serves(self, ticker, artifacts):
+        """True se o grupo foi montado com exatamente estes artefatos (e não com uma versão trocada)."""
+        return self.members.get(ticker) is artifacts
+
+    def parity(self, members):
+        """Erro máximo do forward empilhado contra o backend de cada ativo."""
+        x = _parity_batch(members[0].lstm_model, size=2)
+        stacked = self.stacked.predict(np.broadcast_to(x, (len(members),) + x.shape))
+        return max(float(np.max(np.abs(stacked[i] - a.predict(x)))) for i, a in enumerate(members))
+
+    def predict(self, batches):
+        """(ativos do grupo, lote, janela, features) -> (ativos do grupo, lote, 1)."""
+        return self.stacked.predict(batches)
+
+
+_artifacts = {instrument.ticker: MLArtifacts(instrument) for instrument in instrument_registry}
+_groups = []
+_load_lock = threading.Lock()
+
+
+def get_artifacts(ticker=DEFAULT_TICKER):
+    """Artefatos do ativo (None se o ticker não estiver no registro)."""
+    return _artifacts.get(ticker)
+
+
+def load_all():
+    """Carrega os artefatos de todos os ativos e agrupa os modelos de mesma arquitetura."""
+    with _load_lock:
+        start = time.perf_counter()
+        for artifacts in _artifacts.values():
+            if not artifacts.is_loaded():
+                artifacts.load()
+        _groups[:] = _build_groups(_artifacts)
+        print(f"⏱️ Modelos carregados em {time.perf_counter() - start:.2f}s "
+              f"({sum(a.is_loaded() for a in _artifacts.values())}/{len(_artifacts)} ativos)")
+
+
+def swap(ticker, artifacts):
+    """
+    Publica artefatos já carregados e aquecidos de um ativo numa única troca de
+    referência. Quem já obteve os anteriores com get_artifacts termina com eles
+    (o bundle antigo é liberado quando a última requisição em voo o solta).
+    Devolve os artefatos substituídos.
+    """
+    if not artifacts.is_loaded():
+        raise ValueError(f"artefatos de {ticker} não estão prontos ({artifacts.status})")
+    with _load_lock:
+        staged = {**_artifacts, ticker: artifacts}
+        groups = _build_groups(staged)
+        previous = _artifacts[ticker]
+        _artifacts[ticker] = artifacts
+        _groups[:] = groups
+    MODEL_READY_GAUGE.labels(ticker=ticker).set(1)
+    return previous
+
+
+def readiness():
+    """Pronto quando o ativo principal passou pelo warm-up; os demais são reportados individualmente."""
+    principal = _artifacts[DEFAULT_TICKER]
+    status = {"ready": "ready", "failed": "failed"}.get(principal.status, "starting")
+    return {
+        "status": status,
+        "ready": principal.is_loaded(),
+        "tensorflow_import_s": None if _tf_import_seconds is None else round(_tf_import_seconds, 4),
+        "modelos": {ticker: artifacts.state() for ticker, artifacts in _artifacts.items()},
+    }
+
+
+def _build_groups(bundles):
+    by_signature = {}
+    for artifacts in bundles.values():
+        if not artifacts.is_loaded():
+            continue
+        try:
+            by_signature.setdefault(architecture(artifacts.lstm_model), []).append(artifacts)
+        except ValueError as e:
+            print(f"⚠️ {artifacts.instrument.ticker} fora do forward agrupado: {e}")
+
+    groups = []
+    for members in by_signature.values():
+        # Um único ativo já é servido pelo seu backend; o agrupamento só compensa com 2+
+        if len(members) < 2:
+            continue
+        group = InferenceGroup(members)
+        diff = group.parity(members)
+        if diff > INFERENCE_PARITY_ATOL:
+            print(f"⚠️ Forward agrupado descartado ({', '.join(group.tickers)}): divergência {diff:.1e}")
+            continue
+        print(f"⚙️ Forward agrupado: {len(members)} ativos, divergência máx {diff:.1e}")
+        groups.append(group)
+    return groups
+
+
+def inference_groups():
+    return list(_groups)
+
@@ -0,0 +1,270 @@
+"""
+Registro versionado de modelos.
+
+Cada ativo tem um diretório com uma subpasta por versão publicada:
+
+    models/registry/PETR4.SA/
+        canal.json                      {"estavel": "v2", "canario": "v3", "percentual_canario": 10}
+        v2/manifest.json, lstm.keras, scaler_x.pkl, scaler_y.pkl
+        v3/...
+
+O manifest descreve a versão (nome exposto em modelo_usado, ordem das features,
+tamanho da janela e sha256 de cada arquivo) e é gravado por último, de forma
+atômica: uma versão só existe para a API quando está completa. Sem canal.json, a
+versão estável é a de maior nome. O processo de inferência observa o diretório e
+troca os modelos sem reiniciar (ver model_rollout).
+
+Uso (a partir da raiz do projeto):
+    python -m src.api.services.model_registry publicar --ticker PETR4 --versao v2 \\
+        --modelo lstm.keras --scaler-x scaler_x.pkl --scaler-y scaler_y.pkl [--canario 10]
+    python -m src.api.services.model_registry canal --ticker PETR4 --estavel v2 [--canario v3 --percentual 10]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+
+from src.api.config import MODEL_CANARY_PERCENT, MODEL_REGISTRY_DIR
+
+MANIFEST = "manifest.json"
+CHANNELS = "canal.json"
+ROLES = ("modelo", "scaler_x", "scaler_y")
+
+
+class ManifestError(ValueError):
+    """Manifest ausente, inválido ou que não confere com os arquivos da versão."""
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json(path, data):
+    """Escrita atômica (arquivo temporário + os.replace): o observador nunca lê um JSON pela metade."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+@dataclass(frozen=True)
+class ModelManifest:
+    ticker: str
+    versao: str
+    modelo: str          # nome exposto no campo modelo_usado
+    janela: int          # pregões por janela de entrada
+    features: tuple      # ordem das colunas esperada pelo scaler_x e pelo modelo
+    arquivos: dict       # papel (modelo, scaler_x, scaler_y) -> nome do arquivo
+    sha256: dict         # nome do arquivo -> hash
+    path: str            # diretório da versão
+
+    @classmethod
+    def read(cls, ticker, path):
+        try:
+            with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+                data = json.load(f)
+            manifest = cls(
+                ticker=ticker,
+                versao=str(data["versao"]),
+                modelo=data["modelo"],
+                janela=int(data["janela"]),
+                features=tuple(data["features"]),
+                arquivos={role: data["arquivos"][role] for role in ROLES},
+                sha256=dict(data["sha256"]),
+                path=path,
+            )
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise ManifestError(f"manifest de {path} inválido: {e}") from e
+        if manifest.versao != os.path.basename(path):
+            raise ManifestError(f"versão {manifest.versao} do manifest difere do diretório {path}")
+        return manifest
+
+    def file(self, role):
+        return os.path.join(self.path, self.arquivos[role])
+
+    def verify(self):
+        """Confere o sha256 de cada arquivo com o manifest."""
+        for role in ROLES:
+            name = self.arquivos[role]
+            expected = self.sha256.get(name)
+            if expected is None:
+                raise ManifestError(f"{self.versao}: sha256 de {name} ausente no manifest")
+            if not os.path.exists(self.file(role)):
+                raise ManifestError(f"{self.versao}: arquivo {name} não encontrado")
+            if _sha256(self.file(role)) != expected:
+                raise ManifestError(f"{self.versao}: sha256 de {name} não confere")
+
+
+@dataclass(frozen=True)
+class Channels:
+    """Versões servidas de um ativo: a estável e, opcionalmente, um canário com parte do tráfego."""
+    estavel: str
+    canario: str = None
+    percentual_canario: float = 0.0
+
+
+class ModelRegistry:
+    def __init__(self, root=MODEL_REGISTRY_DIR):
+        self.root = root
+
+    def _folder(self, ticker):
+        """Diretório do ativo ('PETR4.SA' ou 'PETR4'); None se não houver."""
+        for name in (ticker, ticker.split('.')[0]):
+            folder = os.path.join(self.root, name)
+            if os.path.isdir(folder):
+                return folder
+        return None
+
+    def tickers(self):
+        """Nomes dos diretórios de ativos do registro (como estão no disco)."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(e for e in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, e)))
+
+    def versions(self, ticker):
+        """Versões completas (com manifest), em ordem de nome."""
+        folder = self._folder(ticker)
+        if folder is None:
+            return []
+        return sorted(e for e in os.listdir(folder) if os.path.isfile(os.path.join(folder, e, MANIFEST)))
+
+    def manifest(self, ticker, versao):
+        folder = self._folder(ticker)
+        if folder is None:
+            raise ManifestError(f"{ticker} não está no registro {self.root}")
+        return ModelManifest.read(ticker, os.path.join(folder, versao))
+
+    def channels(self, ticker):
+        """Canais do ativo (canal.json ou a versão mais recente como estável); None sem versões publicadas."""
+        versions = self.versions(ticker)
+        if not versions:
+            return None
+        data = {}
+        path = os.path.join(self._folder(ticker), CHANNELS)
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ {path} ilegível ({e}). Usando a versão mais recente de {ticker}.")
+        estavel = data.get("estavel") if data.get("estavel") in versions else versions[-1]
+        canario = data.get("canario") if data.get("canario") in versions else None
+        if canario == estavel:
+            canario = None
+        percentual = float(data.get("percentual_canario", MODEL_CANARY_PERCENT)) if canario else 0.0
+        return Channels(estavel, canario, min(max(percentual, 0.0), 100.0))
+
+    def stable_manifest(self, ticker):
+        """Manifest da versão estável do ativo (None fora do registro ou com manifest inválido)."""
+        channels = self.channels(ticker)
+        if channels is None:
+            return None
+        try:
+            return self.manifest(ticker, channels.estavel)
+        except ManifestError as e:
+            print(f"⚠️ Registro de modelos: {e}")
+            return None
+
+    def signature(self):
+        """(arquivo, mtime) de todos os manifests e canais: muda quando algo é publicado ou promovido."""
+        entries = []
+        for name in self.tickers():
+            folder = os.path.join(self.root, name)
+            paths = [os.path.join(folder, CHANNELS)] + [
+                os.path.join(folder, v, MANIFEST) for v in os.listdir(folder)]
+            for path in paths:
+                try:
+                    entries.append((path, os.stat(path).st_mtime_ns))
+                except OSError:
+                    continue
+        return tuple(sorted(entries))
+
+    # --- PUBLICAÇÃO ---
+    def publish(self, ticker, versao, model_path, scaler_x_path, scaler_y_path, modelo, janela, features):
+        """Copia os artefatos para uma versão nova e grava o manifest por último."""
+        folder = os.path.join(self._folder(ticker) or os.path.join(self.root, ticker), versao)
+        if os.path.exists(os.path.join(folder, MANIFEST)):
+            raise ManifestError(f"versão {versao} de {ticker} já publicada (versões são imutáveis)")
+        os.makedirs(folder, exist_ok=True)
+        arquivos, sha256 = {}, {}
+        for role, source in zip(ROLES, (model_path, scaler_x_path, scaler_y_path)):
+            name = os.path.basename(source)
+            shutil.copyfile(source, os.path.join(folder, name))
+            arquivos[role] = name
+            sha256[name] = _sha256(os.path.join(folder, name))
+        _write_json(os.path.join(folder, MANIFEST), {
+            "versao": versao, "modelo": modelo, "janela": janela, "features": list(features),
+            "arquivos": arquivos, "sha256": sha256, "criado_em": datetime.now().isoformat(),
+        })
+        return self.manifest(ticker, versao)
+
+    def set_channels(self, ticker, estavel, canario=None, percentual_canario=0.0):
+        folder = self._folder(ticker)
+        versions = self.versions(ticker)
+        for versao in (estavel, canario):
+            if versao is not None and versao not in versions:
+                raise ManifestError(f"versão {versao} de {ticker} não publicada")
+        data = {"estavel": estavel}
+        if canario:
+            data.update(canario=canario, percentual_canario=percentual_canario)
+        _write_json(os.path.join(folder, CHANNELS), data)
+
+
+model_registry = ModelRegistry()
+
+
+def main(argv=None):
+    from src.api.config import DEFAULT_TICKER
+    from src.api.services.feature_pipeline import FEATURE_COLUMNS
+    from src.api.services.instruments import normalize_ticker
+
+    parser = argparse.ArgumentParser(description="Registro versionado de modelos.")
+    commands = parser.add_subparsers(dest="comando", required=True)
+    publicar = commands.add_parser("publicar", help="publica uma versão nova (modelo + scalers)")
+    publicar.add_argument("--ticker", default=DEFAULT_TICKER)
+    publicar.add_argument("--versao", required=True)
+    publicar.add_argument("--modelo", required=True, help="arquivo .keras")
+    publicar.add_argument("--scaler-x", required=True)
+    publicar.add_argument("--scaler-y", required=True)
+    publicar.add_argument("--nome", help="nome exposto em modelo_usado (padrão: LSTM_<ATIVO>_<versão>)")
+    publicar.add_argument("--janela", type=int, default=20)
+    publicar.add_argument("--canario", type=float, metavar="PERCENTUAL",
+                          help="publica como canário com este percentual do tráfego (padrão: vira a estável)")
+    canal = commands.add_parser("canal", help="define as versões estável e canário de um ativo")
+    canal.add_argument("--ticker", default=DEFAULT_TICKER)
+    canal.add_argument("--estavel", required=True)
+    canal.add_argument("--canario")
+    canal.add_argument("--percentual", type=float, default=MODEL_CANARY_PERCENT)
+    args = parser.parse_args(argv)
+
+    ticker = normalize_ticker(args.ticker)
+    try:
+        if args.comando == "publicar":
+            current = model_registry.channels(ticker)
+            manifest = model_registry.publish(ticker, args.versao, args.modelo, args.scaler_x, args.scaler_y,
+                                              args.nome or f"LSTM_{ticker.split('.')[0]}_{args.versao}", args.janela, FEATURE_COLUMNS)
+            if args.canario is not None and current is not None:
+                model_registry.set_channels(ticker, current.estavel, manifest.versao, args.canario)
+            elif current is not None:
+                model_registry.set_channels(ticker, manifest.versao)
+            print(f"📦 {ticker} {manifest.versao} publicado em {manifest.path}")
+        else:
+            model_registry.set_channels(ticker, args.estavel, args.canario, args.percentual)
+            print(f"🔀 {ticker}: estável {args.estavel}" + (f", canário {args.canario} ({args.percentual:g}%)"
+                                                          if args.canario else ""))
+    except ManifestError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
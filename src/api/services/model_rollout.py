@@ -0,0 +1,191 @@
+"""
+Troca de modelos em execução a partir do registro versionado (ver model_registry).
+
+O processo de inferência verifica o registro a cada MODEL_REGISTRY_POLL_SECONDS.
+Quando a versão estável ou a canário de um ativo muda, a versão nova é carregada
+numa thread, sem tocar na que está servindo: sha256 conferidos com o manifest,
+janela e ordem das features, backend com checagem de paridade e warm-up (o mesmo
+`load` da inicialização) e uma previsão sobre a janela real mais recente. Só
+então ela é publicada: a estável com uma troca atômica de referência
+(ml_artifacts.swap), a canário na tabela de roteamento consultada a cada
+previsão. Se algo falhar, a versão atual continua servindo.
+"""
+import asyncio
+import random
+import threading
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from src.api.config import MODEL_REGISTRY_POLL_SECONDS
+from src.api.services.feature_pipeline import get_pipeline
+from src.api.services.instruments import Instrument, instrument_registry, normalize_ticker
+from src.api.services.ml_artifacts import MLArtifacts, get_artifacts, swap
+from src.api.services.model_registry import ManifestError, model_registry
+
+MODEL_SWAP_COUNTER = Counter('model_swaps_total', 'Versões novas do modelo avaliadas em execução', ['ticker', 'track', 'result'])
+MODEL_ROUTED_COUNTER = Counter('model_routed_predictions_total', 'Previsões por versão do modelo que as atendeu', ['ticker', 'track', 'version'])
+MODEL_CANARY_GAUGE = Gauge('model_canary_traffic_percentage', 'Percentual das previsões enviado à versão canário', ['ticker'], multiprocess_mode='mostrecent')
+
+STABLE, CANARY = "estavel", "canario"
+
+
+class ModelRollout:
+    """Versão estável e canário de cada ativo, sincronizadas com o registro."""
+
+    def __init__(self, registry=model_registry, poll=MODEL_REGISTRY_POLL_SECONDS, rng=random.random):
+        self.registry = registry
+        self.poll = poll
+        self._rng = rng
+        self._canaries = {}    # ticker -> (artefatos, percentual do tráfego)
+        self._rejected = {}    # (ticker, versão) -> (sha256 do manifest, erro): não recarrega à toa
+        self._ignored = set()
+        self._signature = None
+        self._lock = threading.Lock()
+
+    # --- ROTEAMENTO ---
+    def route(self, ticker):
+        """Artefatos que atendem esta previsão: o canário em `percentual` das chamadas, a estável nas demais."""
+        canary = self._canaries.get(ticker)
+        if canary is not None and self._rng() * 100 < canary[1]:
+            artifacts, track = canary[0], CANARY
+        else:
+            artifacts, track = get_artifacts(ticker), STABLE
+        MODEL_ROUTED_COUNTER.labels(ticker=ticker, track=track, version=str(artifacts.version)).inc()
+        return artifacts
+
+    def active_versions(self, ticker):
+        """Versões (MLArtifacts.version) que podem atender o ativo agora."""
+        versions = {get_artifacts(ticker).version}
+        canary = self._canaries.get(ticker)
+        if canary is not None:
+            versions.add(canary[0].version)
+        return versions
+
+    def state(self):
+        """Canários ativos e versões rejeitadas (exibidos em /api/ready)."""
+        return {
+            "canarios": {
+                ticker: {"versao_registro": a.instrument.registry_version, "versao": a.version, "percentual": p}
+                for ticker, (a, p) in self._canaries.items()
+            },
+            "rejeitadas": {f"{ticker}:{versao}": erro for (ticker, versao), (_, erro) in self._rejected.items()},
+        }
+
+    # --- SINCRONIZAÇÃO COM O REGISTRO ---
+    def sync(self):
+        """Aplica estável e canário de cada ativo do registro (bloqueante: roda fora do event loop)."""
+        with self._lock:
+            for entry in self.registry.tickers():
+                ticker = normalize_ticker(entry)
+                if ticker not in instrument_registry:
+                    if ticker not in self._ignored:
+                        self._ignored.add(ticker)
+                        print(f"⚠️ Registro de modelos: {ticker} não é servido por esta instância "
+                              f"(ativos novos exigem reiniciar a API).")
+                    continue
+                channels = self.registry.channels(ticker)
+                if channels is None:
+                    continue
+                self._sync_stable(ticker, channels.estavel)
+                self._sync_canary(ticker, channels)
+
+    def _sync_stable(self, ticker, versao):
+        current = get_artifacts(ticker)
+        if current.instrument.registry_version == versao:
+            return
+        canary = self._canaries.get(ticker)
+        if canary is not None and canary[0].instrument.registry_version == versao:
+            # Promoção do canário: a versão já está carregada e aquecida
+            candidate = self._canaries.pop(ticker)[0]
+        else:
+            candidate = self._load(ticker, versao, STABLE)
+            if candidate is None:
+                return
+        swap(ticker, candidate)
+        MODEL_SWAP_COUNTER.labels(ticker=ticker, track=STABLE, result="swapped").inc()
+        print(f"🔄 {ticker}: versão estável {current.instrument.registry_version or current.instrument.model_name} → {versao}")
+
+    def _sync_canary(self, ticker, channels):
+        current = self._canaries.get(ticker)
+        if channels.canario is None:
+            if current is not None:
+                self._canaries.pop(ticker, None)
+                print(f"🐤 {ticker}: canário {current[0].instrument.registry_version} encerrado")
+            MODEL_CANARY_GAUGE.labels(ticker=ticker).set(0)
+            return
+        if current is not None and current[0].instrument.registry_version == channels.canario:
+            candidate = current[0]   # só o percentual mudou
+        else:
+            candidate = self._load(ticker, channels.canario, CANARY)
+            if candidate is None:
+                return   # o canário anterior (se houver) continua servindo
+            MODEL_SWAP_COUNTER.labels(ticker=ticker, track=CANARY, result="swapped").inc()
+            print(f"🐤 {ticker}: canário {channels.canario} com {channels.percentual_canario:g}% das previsões")
+        self._canaries[ticker] = (candidate, channels.percentual_canario)
+        MODEL_CANARY_GAUGE.labels(ticker=ticker).set(channels.percentual_canario)
+
+    def _load(self, ticker, versao, track):
+        """Carrega, aquece e valida uma versão; None (versão rejeitada) se qualquer etapa falhar."""
+        try:
+            manifest = self.registry.manifest(ticker, versao)
+        except ManifestError as e:
+            return self._reject(ticker, versao, track, None, str(e))
+        mark = tuple(sorted(manifest.sha256.items()))
+        rejected = self._rejected.get((ticker, versao))
+        if rejected is not None and rejected[0] == mark:
+            return None
+
+        print(f"📦 {ticker}: carregando a versão {versao} ({track}) em segundo plano...")
+        candidate = MLArtifacts(Instrument.from_manifest(manifest))
+        candidate.load(announce=False)
+        error = candidate.error if not candidate.is_loaded() else self._validate(candidate)
+        if error:
+            return self._reject(ticker, versao, track, mark, error)
+        self._rejected.pop((ticker, versao), None)
+        return candidate
+
+    def _reject(self, ticker, versao, track, mark, error):
+        self._rejected[(ticker, versao)] = (mark, error)
+        MODEL_SWAP_COUNTER.labels(ticker=ticker, track=track, result="rejected").inc()
+        print(f"❌ {ticker}: versão {versao} rejeitada, a atual continua servindo ({error})")
+        return None
+
+    @staticmethod
+    def _validate(candidate):
+        """Previsão D+1 da versão nova sobre a janela real mais recente; devolve o erro ou None."""
+        ticker = candidate.instrument.ticker
+        try:
+            features, closes = get_pipeline(ticker).prepare_input_data()
+        except Exception as e:
+            # Mercado indisponível não é defeito do modelo: o warm-up do load já validou a inferência
+            print(f"⚠️ {ticker}: validação com dados reais adiada ({e}).")
+            return None
+        try:
+            with candidate.input_windows(features) as window:
+                log_ret = float(candidate.inverse_target(candidate.predict(window))[0])
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+        if not np.isfinite(log_ret):
+            return "previsão não finita na janela atual"
+        preco = float(closes.values[-1])
+        print(f"🧪 {ticker} {candidate.instrument.registry_version}: D+1 R$ {preco * np.exp(log_ret):.2f} "
+              f"(último fechamento R$ {preco:.2f})")
+        return None
+
+    async def run_watch_loop(self):
+        """Verifica o registro a cada `poll` segundos; a carga das versões novas roda numa thread."""
+        while True:
+            try:
+                signature = await asyncio.to_thread(self.registry.signature)
+                if signature != self._signature:
+                    await asyncio.to_thread(self.sync)
+                    self._signature = signature
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Registro de modelos: falha ao sincronizar ({e}).")
+            await asyncio.sleep(self.poll)
+
+
+model_rollout = ModelRollout()
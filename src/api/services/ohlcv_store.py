@@ -0,0 +1,215 @@
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+from prometheus_client import Counter
+
+from src.api.config import MARKET_DELTA_OVERLAP_DAYS, MARKET_HISTORY_PERIOD, MARKET_HISTORY_YEARS, OHLCV_STORE_DIR
+from src.api.services.instruments import instrument_registry
+from src.api.services.market_providers import MarketDataError, build_client
+from src.api.services.telemetry import stage
+
+MARKET_CANDLES_COUNTER = Counter('market_candles_written_total', 'Candles gravados no store OHLCV', ['ticker'])
+MARKET_READJUST_COUNTER = Counter('market_history_readjusted_total', 'Históricos rebaixados por reajuste dos preços anteriores', ['ticker'])
+
+
+class OHLCVStore:
+    """
+    Histórico OHLCV persistido em disco, um arquivo .npy por ticker.
+
+    Cada arquivo guarda uma matriz colunar (1 + campos, n): a primeira linha é a
+    data (dias desde 1970-01-01) e as demais são os campos usados daquele
+    ticker (OHLCV dos ativos, só o fechamento das séries macro). A leitura é
+    memory-mapped e a escrita é atômica (arquivo temporário + os.replace). Só os
+    candles a partir da última data salva são baixados de novo, com os tickers
+    buscados em paralelo pelo MarketDataClient.
+    """
+
+    def __init__(self, root=OHLCV_STORE_DIR, fields=None, client=None):
+        self.root = root
+        self.fields = dict(fields or instrument_registry.market_fields())
+        self.client = client or build_client(self.fields)
+        self._lock = threading.Lock()
+        self._start = None   # início da janela padrão, fixado na primeira leitura
+
+    # --- ARQUIVOS ---
+    def _path(self, ticker):
+        return os.path.join(self.root, re.sub(r'[^A-Za-z0-9]', '_', ticker) + ".npy")
+
+    def _read(self, ticker):
+        """Matriz (1 + campos, n) memory-mapped, ou None se não existir / layout antigo."""
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return None
+        try:
+            arr = np.load(path, mmap_mode='r')
+        except Exception as e:
+            print(f"⚠️ Store OHLCV: arquivo de {ticker} ilegível ({e}). Será baixado de novo.")
+            return None
+        if arr.ndim != 2 or arr.shape[0] != 1 + len(self.fields[ticker]):
+            return None
+        return arr
+
+    def _write(self, ticker, dates, columns):
+        os.makedirs(self.root, exist_ok=True)
+        days = dates.values.astype('datetime64[D]').astype(np.int64).astype(np.float64)
+        arr = np.vstack([days] + [columns[f] for f in self.fields[ticker]])
+        path = self._path(ticker)
+        tmp = path[:-4] + ".tmp.npy"
+        np.save(tmp, np.ascontiguousarray(arr))
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _dates(arr):
+        return pd.DatetimeIndex(arr[0].astype('int64').astype('datetime64[D]'), name='Date')
+
+    # --- CONSULTA ---
+    def has_data(self):
+        return all(self._read(t) is not None for t in self.fields)
+
+    def last_date(self, ticker):
+        arr = self._read(ticker)
+        if arr is None or arr.shape[1] == 0:
+            return None
+        return self._dates(arr[:, -1:])[0]
+
+    def load_frame(self, start=None):
+        """
+        DataFrame no mesmo layout do yf.download (MultiIndex campo x ticker), com o
+        índice sendo a união das datas de pregão. Padrão: últimos MARKET_HISTORY_YEARS anos.
+
+        O início padrão é fixado na primeira leitura do processo: a janela cresce com
+        os pregões novos em vez de deslizar a cada dia. Assim a primeira data do
+        histórico (base acumulada de OBV/VWAP) não muda e o motor incremental de
+        features não precisa ser reconstruído diariamente.
+        """
+        if start is None:
+            if self._start is None:
+                self._start = pd.Timestamp.today().normalize() - pd.DateOffset(years=MARKET_HISTORY_YEARS)
+            start = self._start
+
+        data = {}
+        for ticker, fields in self.fields.items():
+            arr = self._read(ticker)
+            if arr is None:
+                continue
+            dates = self._dates(arr)
+            first = dates.searchsorted(start)
+            for i, field in enumerate(fields, start=1):
+                data[(field, ticker)] = pd.Series(arr[i, first:], index=dates[first:])
+
+        df = pd.DataFrame(data).sort_index()
+        if not df.empty:
+            df.columns = pd.MultiIndex.from_tuples(df.columns, names=['Price', 'Ticker'])
+        return df
+
+    # --- SINCRONIZAÇÃO ---
+    def sync(self):
+        """
+        Baixa só o que falta: histórico completo para tickers sem arquivo e, para os
+        demais, os candles a partir de MARKET_DELTA_OVERLAP_DAYS dias antes da última
+        data salva (que é reescrita, pois pode ser o candle do dia ainda em formação).
+        Os preços são ajustados por proventos: se um pregão já fechado da sobreposição
+        vier diferente do gravado, o Yahoo reajustou o histórico e o ticker é baixado
+        inteiro de novo. Retorna o número de candles gravados. Tickers que falharem em
+        todos os provedores geram MarketDataError depois que os demais forem gravados.
+        """
+        with self._lock:
+            last = {t: self.last_date(t) for t in self.fields}
+            missing = [t for t, d in last.items() if d is None]
+            stored = [t for t, d in last.items() if d is not None]
+
+            written, errors, readjusted = 0, {}, []
+            if stored:
+                start = min(last[t] for t in stored) - pd.Timedelta(days=MARKET_DELTA_OVERLAP_DAYS)
+                with stage("market_download", kind="delta", tickers=",".join(stored)):
+                    frames, failed = self._download(stored, start=start.strftime('%Y-%m-%d'))
+                readjusted = [t for t, df in frames.items() if self._readjusted(t, df, last[t])]
+                for ticker in readjusted:
+                    print(f"♻️ Store OHLCV: preços anteriores de {ticker} reajustados (proventos/desdobramento). "
+                          f"Baixando o histórico de novo...")
+                    MARKET_READJUST_COUNTER.labels(ticker=ticker).inc()
+                written += self._merge_all({t: df for t, df in frames.items() if t not in readjusted})
+                errors.update(failed)
+            if missing or readjusted:
+                full = missing + readjusted
+                print(f"📥 Store OHLCV: Baixando histórico completo ({MARKET_HISTORY_PERIOD}) de {', '.join(full)}...")
+                with stage("market_download", kind="bootstrap", tickers=",".join(full)):
+                    frames, failed = self._download(full, period=MARKET_HISTORY_PERIOD)
+                written += self._merge_all(frames, replace=True)
+                errors.update(failed)
+
+            if errors:
+                detail = "; ".join(f"{t}: {e}" for t, e in errors.items())
+                raise MarketDataError(f"{len(errors)} ticker(s) sem dados novos ({detail})")
+            return written
+
+    def _readjusted(self, ticker, df, last):
+        """True se algum pregão gravado antes de `last` (já fechado) veio com outros valores."""
+        new = self._frame(ticker, df)
+        arr = self._read(ticker)
+        if new is None or arr is None:
+            return False
+        dates = self._dates(arr)
+        overlap = dates[(dates < last) & dates.isin(new.index)]
+        if overlap.empty:
+            return False
+        pos = dates.get_indexer(overlap)
+        stored = np.asarray(arr[1:, pos], dtype=np.float64).T
+        fresh = new.loc[overlap, self.fields[ticker]].to_numpy(dtype=np.float64)
+        return not np.allclose(fresh, stored, rtol=1e-6, atol=0.0, equal_nan=True)
+
+    def _merge_all(self, frames, replace=False):
+        written = 0
+        for ticker, df in frames.items():
+            rows = self._merge(ticker, df, replace)
+            MARKET_CANDLES_COUNTER.labels(ticker=ticker).inc(rows)
+            written += rows
+        return written
+
+    def _download(self, tickers, **kwargs):
+        """({ticker: DataFrame}, {ticker: erro}) — um download por ticker, em paralelo."""
+        return self.client.fetch_many({t: self.fields[t] for t in tickers}, **kwargs)
+
+    def _frame(self, ticker, df):
+        """Campos do ticker com índice de datas sem fuso; None se vier vazio ou incompleto."""
+        try:
+            new = pd.DataFrame({f: df[f] for f in self.fields[ticker]}).dropna(how='all')
+        except KeyError:
+            return None
+        if new.empty:
+            return None
+        new.index = pd.DatetimeIndex(new.index).tz_localize(None).normalize()
+        return new[~new.index.duplicated(keep='last')]
+
+    def _merge(self, ticker, df, replace=False):
+        """
+        União por data do histórico gravado com o baixado (o baixado prevalece nas datas
+        em comum): lacunas na resposta não apagam candles já gravados. Com replace=True
+        o histórico baixado substitui o arquivo inteiro (reajuste de preços).
+        """
+        fields = self.fields[ticker]
+        new = self._frame(ticker, df)
+        if new is None:
+            return 0
+
+        arr = None if replace else self._read(ticker)
+        merged, written = new, len(new)
+        if arr is not None:
+            dates = self._dates(arr)
+            old = pd.DataFrame({f: arr[i] for i, f in enumerate(fields, start=1)}, index=dates)
+            merged = pd.concat([old[~old.index.isin(new.index)], new])
+            # Candles novos ou com valores diferentes dos gravados
+            common = new.index[new.index.isin(dates)]
+            a, b = new.loc[common].to_numpy(dtype=np.float64), old.loc[common].to_numpy(dtype=np.float64)
+            same = ((a == b) | (np.isnan(a) & np.isnan(b))).all(axis=1)
+            written = len(new) - int(same.sum())
+
+        merged = merged.sort_index()
+        self._write(ticker, merged.index, {f: merged[f].to_numpy(dtype=np.float64) for f in fields})
+        return written
+
+
+ohlcv_store = OHLCVStore()
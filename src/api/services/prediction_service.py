@@ -0,0 +1,318 @@
+import asyncio
+import contextlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from src.api.config import (
+    PREDICTION_HORIZON_DAYS, PREDICTION_CACHE_SIZE, MARKET_CACHE_RETRY_AFTER,
+    DEFAULT_TICKER, SELIC_FALLBACK,
+)
+from src.api.services.backtest import backtest_service
+from src.api.services.executors import io_executor, inference_executor
+from src.api.services.feature_pipeline import compute_panel_windows, get_pipeline
+from src.api.services.inference_batcher import InferenceBatcher
+from src.api.services.instruments import instrument_registry
+from src.api.services.market_cache import market_cache
+from src.api.services.market_calendar import now_b3, next_session_close
+from src.api.services.market_data import market_service
+from src.api.services.ml_artifacts import get_artifacts, inference_groups
+from src.api.services.model_rollout import model_rollout
+from src.api.services.selic_provider import selic_provider
+from src.api.services.shadow_evaluator import shadow_evaluator
+from src.api.services.telemetry import stage, staged
+from src.api.services.uncertainty import price_bands
+
+INPUT_PRICE_GAUGE = Gauge('model_input_current_price', 'Preço Input', ['ticker'], multiprocess_mode='mostrecent')
+
+PREDICTION_CACHE_COUNTER = Counter('prediction_cache_requests_total', 'Consultas ao cache de previsões', ['result'])
+
+
+@dataclass(frozen=True)
+class PredictionResult:
+    """Projeção completa (até PREDICTION_HORIZON_DAYS) de um snapshot de mercado."""
+    key: tuple
+    preco_atual: float
+    precos: tuple        # preço projetado para D+1 ... D+N
+    confiancas: tuple
+    contexto: dict       # dados de mercado exibidos no painel
+    gerado_em: datetime
+    ticker: str = DEFAULT_TICKER
+    faixas: tuple = ()   # (inferior, superior) por dia, quando há amostragem de incerteza
+    modelo: str = ""     # nome da versão que fez a previsão (estável ou canário)
+
+
+class PredictionService:
+    """
+    Calcula a previsão uma única vez por (último candle, versão do modelo, hash do
+    snapshot) de cada ativo e a mantém em memória. A versão é escolhida por
+    requisição (model_rollout: estável ou canário), antes da consulta ao cache. Requisições concorrentes com a
+    mesma chave aguardam o mesmo cálculo. Um job em segundo plano recalcula todos os
+    ativos logo após o fechamento da B3 para que as requisições sejam só consultas ao cache.
+    """
+
+    def __init__(self, horizon=PREDICTION_HORIZON_DAYS, max_entries=PREDICTION_CACHE_SIZE):
+        self.horizon = horizon
+        self.max_entries = max_entries  # por ativo
+        # Um batcher por (ativo, versão): agrupa as janelas de requisições concorrentes do mesmo modelo
+        self._batchers = {}
+        self._entries = {}
+        self._inflight = {}
+
+    def _batcher(self, artifacts):
+        ticker = artifacts.instrument.ticker
+        # Versões que deixaram de servir (troca da estável, fim do canário) liberam o batcher
+        active = model_rollout.active_versions(ticker)
+        for stale in [k for k in self._batchers if k[0] == ticker and k[1] not in active]:
+            del self._batchers[stale]
+        key = (ticker, artifacts.version)
+        if key not in self._batchers:
+            self._batchers[key] = InferenceBatcher(artifacts.predict)
+        return self._batchers[key]
+
+    @staticmethod
+    def _key_for(buffer, ticker, artifacts):
+        selic = selic_provider.get()
+        return (buffer.last_date.strftime('%Y-%m-%d'), artifacts.version, f"{buffer.digest}:{selic}", ticker)
+
+    async def _current_key(self, ticker, artifacts):
+        buffer = await io_executor.run(market_cache.get_buffer, ticker)
+        return self._key_for(buffer, ticker, artifacts)
+
+    def _cached(self, key):
+        entries = self._entries.get(key[-1])
+        result = entries.get(key) if entries else None
+        if result is not None:
+            entries.move_to_end(key)
+        return result
+
+    def _store(self, result):
+        entries = self._entries.setdefault(result.ticker, OrderedDict())
+        entries[result.key] = result
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def _track(self, key, task):
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def get(self, ticker=DEFAULT_TICKER):
+        """Previsão do ativo para o snapshot de mercado atual (do cache, quando possível)."""
+        # Os artefatos ficam fixos do começo ao fim: uma troca de versão no meio não afeta esta previsão
+        artifacts = model_rollout.route(ticker)
+        with stage("cache_lookup"):
+            key = await self._current_key(ticker, artifacts)
+            result = self._cached(key)
+        if result is not None:
+            PREDICTION_CACHE_COUNTER.labels(result="hit").inc()
+            return result
+
+        task = self._inflight.get(key)
+        if task is None:
+            PREDICTION_CACHE_COUNTER.labels(result="miss").inc()
+            task = self._track(key, asyncio.ensure_future(self._compute(ticker, key, artifacts)))
+        else:
+            PREDICTION_CACHE_COUNTER.labels(result="coalesced").inc()
+        # shield: o cancelamento de uma requisição não derruba o cálculo compartilhado
+        return await asyncio.shield(task)
+
+    async def get_many(self, tickers):
+        """
+        Previsões de vários ativos. Os que não estão no cache são calculados juntos:
+        features de todos num único passe vetorizado e um forward pass por grupo de
+        modelos com a mesma arquitetura.
+        """
+        panel = await io_executor.run(market_cache.get_panel)
+        bundles = {t: model_rollout.route(t) for t in tickers}
+        keys = {t: self._key_for(panel.buffer(t), t, bundles[t]) for t in tickers}
+
+        pending = {}
+        misses = []
+        for ticker, key in keys.items():
+            if self._cached(key) is not None or key in self._inflight:
+                continue
+            misses.append(ticker)
+            pending[ticker] = self._track(key, asyncio.get_running_loop().create_future())
+
+        if misses:
+            PREDICTION_CACHE_COUNTER.labels(result="miss").inc(len(misses))
+            try:
+                computed = await self._compute_many(panel, misses, keys, bundles)
+                for ticker, result in computed.items():
+                    pending[ticker].set_result(result)
+            except Exception as e:
+                for future in pending.values():
+                    if not future.done():
+                        future.set_exception(e)
+                        future.exception()  # erro já propagado por get_many
+                raise
+
+        results = {}
+        for ticker, key in keys.items():
+            result = self._cached(key)
+            if result is None:
+                result = await asyncio.shield(self._inflight.get(key) or self._track(
+                    key, asyncio.ensure_future(self._compute(ticker, key, bundles[ticker]))))
+            results[ticker] = result
+        return results
+
+    async def _compute(self, ticker, key, artifacts):
+        pipeline = get_pipeline(ticker)
+        # 1. Pipeline (Agora retorna 50 linhas) - I/O fora do event loop
+        features_full_df, p_close_full_series = await io_executor.run(staged("features", pipeline.prepare_input_data))
+
+        # --- PREPARAÇÃO DOS DADOS + INFERÊNCIA (só a janela do usuário: últimas 20 linhas) ---
+        # O shadow test roda uma vez por pregão fechado no shadow_evaluator, fora da requisição
+        with contextlib.ExitStack() as buffers:
+            with stage("scaling"):
+                windows = buffers.enter_context(artifacts.input_windows(features_full_df))
+
+            async def infer():
+                with stage("inference", ticker=ticker, windows="user"):
+                    return await self._batcher(artifacts).predict(windows)
+
+            # Trajetórias de incerteza da janela do usuário em paralelo ao forward pontual
+            preds_scaled, log_rets = await asyncio.gather(infer(), self._sample(artifacts, windows[0], key))
+
+        contexto_visual = await io_executor.run(staged("context", market_service.get_current_context), ticker)
+        result = self._build_result(ticker, key, artifacts, p_close_full_series.values, preds_scaled, contexto_visual,
+                                    log_rets)
+        self._store(result)
+        return result
+
+    async def _compute_many(self, panel, tickers, keys, bundles):
+        selic = selic_provider.get(default=SELIC_FALLBACK)
+        features, closes = await inference_executor.run(staged("features", compute_panel_windows), panel, selic, tickers)
+
+        # Janelas já na ordem de FEATURE_COLUMNS: escaladas direto nos buffers, sem DataFrame
+        with contextlib.ExitStack() as buffers:
+            with stage("scaling"):
+                windows = {t: buffers.enter_context(bundles[t].input_windows(features[i]))
+                           for i, t in enumerate(tickers)}
+            preds, log_rets = await asyncio.gather(
+                inference_executor.run(staged("inference", self._predict_grouped, windows="user"), windows, bundles),
+                asyncio.gather(*(self._sample(bundles[t], windows[t][0], keys[t]) for t in tickers)),
+            )
+        contextos = await asyncio.gather(*(
+            io_executor.run(staged("context", market_service.get_current_context), t) for t in tickers))
+
+        results = {}
+        for i, ticker in enumerate(tickers):
+            result = self._build_result(ticker, keys[ticker], bundles[ticker], closes[i], preds[ticker], contextos[i],
+                                        log_rets[i])
+            self._store(result)
+            results[ticker] = result
+        return results
+
+    @staticmethod
+    async def _sample(artifacts, window, key):
+        """Trajetórias MC-dropout (amostras, dias) no executor de inferência; None se o ativo não tem sampler."""
+        if artifacts.sampler is None:
+            return None
+        return await inference_executor.run(staged("uncertainty", artifacts.sample_log_returns), window, key)
+
+    @staticmethod
+    def _predict_grouped(windows, bundles):
+        """
+        Um forward pass por grupo de arquitetura; ativos fora de grupo (ou servidos por
+        outra versão: canário, troca recente) usam o próprio backend.
+        """
+        preds = {}
+        for group in inference_groups():
+            members = [t for t in group.tickers if t in windows and group.serves(t, bundles[t])]
+            if not members:
+                continue
+            # O forward empilhado espera uma janela por modelo do grupo (zeros para quem não foi pedido)
+            template = windows[members[0]]
+            batch = np.stack([windows[t] if t in members else np.zeros_like(template) for t in group.tickers])
+            out = group.predict(batch)
+            for i, ticker in enumerate(group.tickers):
+                if ticker in members:
+                    preds[ticker] = out[i]
+        for ticker, batch in windows.items():
+            if ticker not in preds:
+                preds[ticker] = bundles[ticker].predict(batch)
+        return preds
+
+    def _build_result(self, ticker, key, artifacts, closes, preds_scaled, contexto_visual, log_rets=None):
+        # Preço Atual Real (Último fechamento conhecido)
+        preco_atual_real = closes[-1]
+        INPUT_PRICE_GAUGE.labels(ticker=ticker).set(preco_atual_real)
+
+        # --- PREVISÃO OFICIAL (Para o Usuário) ---
+        # Objetivo: Prever AMANHÃ usando dados até HOJE.
+        with stage("projection"):
+            log_ret_user = artifacts.inverse_target(preds_scaled[-1:])[0]
+            price_d1 = preco_atual_real * np.exp(log_ret_user)
+
+            # --- PROJEÇÃO DIAS SEGUINTES (horizonte completo) ---
+            fator_tendencia = np.exp(log_ret_user)
+            precos = []
+            proj_price = preco_atual_real
+            for i in range(1, self.horizon + 1):
+                if i == 1:
+                    proj_price = price_d1
+                else:
+                    proj_price = proj_price * fator_tendencia
+                precos.append(float(proj_price))
+
+            # --- FAIXAS E CONFIANÇA (MC-dropout) ---
+            if log_rets is not None:
+                faixas, confiancas = price_bands(preco_atual_real, log_rets[:, :self.horizon], precos)
+            else:
+                faixas = ()
+                confiancas = [max(0.40, 0.55 - ((i - 1) * 0.04)) for i in range(1, self.horizon + 1)]
+
+        return PredictionResult(
+            key=key,
+            preco_atual=float(preco_atual_real),
+            precos=tuple(precos),
+            confiancas=tuple(confiancas),
+            contexto=contexto_visual,
+            gerado_em=datetime.now(),
+            ticker=ticker,
+            faixas=faixas,
+            modelo=artifacts.instrument.model_name,
+        )
+
+    def invalidate(self):
+        self._entries.clear()
+
+    # --- PRÉ-AQUECIMENTO ---
+    async def prewarm(self):
+        """Força um snapshot novo e calcula previsão, backtest e shadow test de todos os ativos (chamado após o fechamento)."""
+        market_cache.invalidate()
+        tickers = [t for t in instrument_registry.tickers if get_artifacts(t).is_loaded()]
+        results = await self.get_many(tickers)
+        result = results.get(DEFAULT_TICKER) or next(iter(results.values()))
+        print(f"🔥 Cache de previsões aquecido ({len(results)} ativos): candle {result.key[0]}, "
+              f"{result.ticker} D+1 = R$ {result.precos[0]:.2f}")
+        # Métricas de backtest do novo snapshot (independentes do tráfego)
+        await backtest_service.refresh(tickers)
+        # Shadow test dos pregões fechados ainda não avaliados (reaproveita o índice do backtest)
+        await shadow_evaluator.refresh(tickers)
+        return results
+
+    async def run_prewarm_loop(self):
+        """Aquece na inicialização e depois a cada fechamento da B3."""
+        wait = 0.0
+        while True:
+            await asyncio.sleep(wait)
+            if not get_artifacts(DEFAULT_TICKER).is_loaded():
+                wait = MARKET_CACHE_RETRY_AFTER
+                continue
+            try:
+                await self.prewarm()
+                wait = (next_session_close() - now_b3()).total_seconds()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Falha ao aquecer o cache de previsões ({e}). Nova tentativa em {MARKET_CACHE_RETRY_AFTER}s.")
+                wait = MARKET_CACHE_RETRY_AFTER
+
+
+prediction_service = PredictionService()
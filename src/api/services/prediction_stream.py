@@ -0,0 +1,86 @@
+import asyncio
+
+from prometheus_client import Counter, Gauge
+
+from src.api.config import PREDICTION_STREAM_INTERVAL
+
+STREAM_CLIENTS_GAUGE = Gauge('prediction_stream_clients', 'Conexões abertas no stream de previsões', ['ticker'], multiprocess_mode='livesum')
+STREAM_PUBLISH_COUNTER = Counter('prediction_stream_publications_total', 'Payloads publicados no stream de previsões', ['ticker'])
+
+# Comentário SSE: mantém proxies e o navegador cientes de que a conexão está viva
+KEEPALIVE = b": keepalive\n\n"
+# Espera do EventSource antes de reconectar (ms)
+RETRY = b"retry: 5000\n\n"
+
+
+class PredictionStream:
+    """
+    Canal Server-Sent Events das previsões de um ativo.
+
+    Um único produtor em segundo plano consulta a previsão a cada `interval`
+    segundos (acerto de cache enquanto o snapshot não muda). Só quando a chave
+    da previsão muda o payload é serializado, uma vez, e todos os clientes são
+    acordados com os mesmos bytes. Cliente ocioso é só uma corrotina esperando o
+    mesmo asyncio.Event: nenhum timer nem cálculo por conexão. O keep-alive sai
+    do mesmo tique do produtor, que para quando o último cliente desconecta.
+    """
+
+    def __init__(self, ticker, produce, interval=PREDICTION_STREAM_INTERVAL):
+        self.ticker = ticker
+        self.produce = produce      # async () -> (chave da previsão, JSON em bytes)
+        self.interval = interval
+        self.clients = 0
+        self._key = None
+        self._frame = None          # último evento "previsao" já formatado
+        self._seq = 0
+        self._tick = asyncio.Event()
+        self._producer = None
+
+    def _wake(self):
+        tick, self._tick = self._tick, asyncio.Event()
+        tick.set()
+
+    def publish(self, key, payload):
+        """Publica o payload se a chave mudou; devolve True se houve publicação."""
+        if key == self._key and self._frame is not None:
+            return False
+        self._key = key
+        self._frame = b"event: previsao\ndata: " + payload + b"\n\n"
+        self._seq += 1
+        STREAM_PUBLISH_COUNTER.labels(ticker=self.ticker).inc()
+        self._wake()
+        return True
+
+    async def _run(self):
+        while self.clients:
+            try:
+                key, payload = await self.produce()
+                published = self.publish(key, payload)
+            except Exception as e:
+                print(f"⚠️ Stream de previsões ({self.ticker}): {e}")
+                published = False
+            if not published:
+                self._wake()  # keep-alive
+            await asyncio.sleep(self.interval)
+
+    async def subscribe(self):
+        """Eventos SSE em bytes: o payload atual (se houver) e depois cada nova publicação."""
+        self.clients += 1
+        STREAM_CLIENTS_GAUGE.labels(ticker=self.ticker).inc()
+        if self._producer is None or self._producer.done():
+            self._producer = asyncio.create_task(self._run())
+        try:
+            yield RETRY
+            seen = 0
+            while True:
+                if self._seq != seen:
+                    seen = self._seq
+                    yield self._frame
+                    continue
+                tick = self._tick
+                await tick.wait()
+                if self._seq == seen:
+                    yield KEEPALIVE
+        finally:
+            self.clients -= 1
+            STREAM_CLIENTS_GAUGE.labels(ticker=self.ticker).dec()
@@ -0,0 +1,122 @@
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.preprocessing import MinMaxScaler
+
+
+class FusedPreprocessor:
+    """
+    scaler_x e scaler_y compilados numa etapa única de pré-processamento.
+
+    As colunas chegam na ordem do modelo por um índice pré-calculado, o scaling
+    vira um `x * mul + add` vetorizado (as mesmas operações, na mesma ordem, do
+    MinMaxScaler) e as janelas (lote, 20, 34) são escritas em float32 direto em
+    buffers reaproveitados, sem copiar DataFrames nem validar nomes de colunas.
+    """
+
+    def __init__(self, scaler_x, scaler_y, columns, window):
+        for scaler in (scaler_x, scaler_y):
+            if not isinstance(scaler, MinMaxScaler) or scaler.clip:
+                raise TypeError(f"scaler não compilável: {type(scaler).__name__}")
+
+        self.columns = list(columns)
+        self.window = window
+        n_features = len(self.columns)
+        scaled = list(getattr(scaler_x, 'feature_names_in_', self.columns))
+        positions = pd.Index(self.columns).get_indexer(scaled)
+        known = positions >= 0
+        # Colunas fora do scaler passam inalteradas (x * 1 + 0)
+        self.mul = np.ones(n_features)
+        self.add = np.zeros(n_features)
+        self.mul[positions[known]] = scaler_x.scale_[known]
+        self.add[positions[known]] = scaler_x.min_[known]
+
+        self.y_min = np.asarray(scaler_y.min_, dtype=np.float64)
+        self.y_scale = np.asarray(scaler_y.scale_, dtype=np.float64)
+
+        self._indexers = {}   # colunas de entrada -> posições na ordem do modelo
+        self._pool = {}       # tamanho do lote -> buffers livres
+        self._lock = threading.Lock()
+
+    def _values(self, features, rows=None):
+        """Matriz float64 (linhas, features) na ordem do modelo; DataFrames já nessa ordem não são copiados."""
+        tail = slice(None) if rows is None else slice(-rows, None)
+        if not isinstance(features, pd.DataFrame):
+            return np.asarray(features, dtype=np.float64)[tail]
+        key = tuple(features.columns)
+        index = self._indexers.get(key)
+        if index is None:
+            positions = features.columns.get_indexer(self.columns)
+            if (positions < 0).any():
+                raise KeyError(f"features ausentes: {[c for c, i in zip(self.columns, positions) if i < 0]}")
+            index = slice(None) if np.array_equal(positions, np.arange(len(key))) else positions
+            self._indexers[key] = index
+        return features.to_numpy(dtype=np.float64, copy=False)[tail][:, index]
+
+    def _scale(self, values, out):
+        # Mesmas operações do MinMaxScaler em float64; o arredondamento para float32 só na escrita
+        scaled = values * self.mul
+        np.add(scaled, self.add, out=out, casting='same_kind')
+        return out
+
+    def transform(self, features):
+        """Todas as linhas escaladas: (linhas, features) em float32."""
+        values = self._values(features)
+        return self._scale(values, np.empty(values.shape, dtype=np.float32))
+
+    def windows(self, features, out):
+        """Preenche `out` (k, janela, features) com as k últimas janelas; a última termina na última linha."""
+        count = len(out)
+        rows = self.window + count - 1
+        values = self._values(features, rows)
+        if len(values) < rows:
+            raise ValueError(f"histórico insuficiente: {len(values)} linhas, {rows} necessárias")
+        scaled = self._scale(values, np.empty(values.shape, dtype=np.float32))
+        np.copyto(out, sliding_window_view(scaled, (self.window, scaled.shape[1]))[:, 0])
+        return out
+
+    @contextmanager
+    def borrow(self, batch):
+        """Buffer (batch, janela, features) do pool; volta ao pool ao sair do bloco."""
+        with self._lock:
+            free = self._pool.setdefault(batch, [])
+            buffer = free.pop() if free else np.empty((batch, self.window, len(self.columns)), dtype=np.float32)
+        try:
+            yield buffer
+        finally:
+            with self._lock:
+                self._pool[batch].append(buffer)
+
+    def inverse(self, preds):
+        """Saída escalada do modelo -> log-retornos (N,), como `scaler_y.inverse_transform`."""
+        y = np.array(preds).reshape(-1, 1)
+        if y.dtype not in (np.float32, np.float64):
+            y = y.astype(np.float64)
+        y -= self.y_min
+        y /= self.y_scale
+        return y[:, 0]
+
+    def check_parity(self, scaler_x, scaler_y, rows=64):
+        """Compara com o sklearn num lote determinístico do intervalo de treino; exige igualdade exata."""
+        rng = np.random.default_rng(42)
+        frame = pd.DataFrame(rng.random((rows, len(self.columns))), columns=self.columns)
+        scaled = list(getattr(scaler_x, 'feature_names_in_', self.columns))
+        frame[scaled] = rng.uniform(scaler_x.data_min_, scaler_x.data_max_, (rows, len(scaled)))
+        expected = frame.copy()
+        expected[scaled] = scaler_x.transform(frame[scaled])
+        expected = expected.to_numpy(dtype=np.float32)
+        if not np.array_equal(self.transform(frame), expected):
+            raise ValueError("scaling compilado diverge do scaler_x")
+
+        windows = np.empty((2, self.window, len(self.columns)), dtype=np.float32)
+        self.windows(frame, windows)
+        if not np.array_equal(windows, np.stack([expected[-self.window - 1:-1], expected[-self.window:]])):
+            raise ValueError("janelas compiladas divergem do scaler_x")
+
+        for dtype in (np.float32, np.float64):
+            preds = rng.random((rows, 1)).astype(dtype)
+            if not np.array_equal(self.inverse(preds), scaler_y.inverse_transform(preds)[:, 0]):
+                raise ValueError("inversa compilada diverge do scaler_y")
@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+from datetime import datetime, time, timedelta
+
+import requests
+
+from src.api.config import (
+    BCB_SGS_URL, SELIC_SERIES, SELIC_TAIL, SELIC_FETCH_TIMEOUT,
+    SELIC_REFRESH_TIME, SELIC_RETRY_AFTER, SELIC_STORE_PATH,
+)
+from src.api.services.market_calendar import B3_TZ, now_b3
+from src.api.services.telemetry import stage
+
+
+class SelicProvider:
+    """
+    Taxa Selic compartilhada entre FeaturePipeline e MarketDataService.
+
+    A consulta ao BCB acontece só numa thread de fundo, uma vez por dia (após
+    SELIC_REFRESH_TIME), pedindo apenas os últimos registros da série. O último
+    valor conhecido fica em memória e em disco, então o caminho da requisição
+    nunca faz I/O de rede.
+    """
+
+    def __init__(self, store_path=SELIC_STORE_PATH, refresh_time=SELIC_REFRESH_TIME):
+        self.store_path = store_path
+        self.refresh_time = time.fromisoformat(refresh_time)
+
+        self._lock = threading.Lock()
+        self._value = None
+        self._reference_date = None   # data do registro na série do BCB
+        self._fetched_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- CONSULTA (caminho da requisição) ---
+    def get(self, default=None):
+        """Último valor conhecido (% a.a.), ou `default` se nenhum foi obtido ainda."""
+        with self._lock:
+            return self._value if self._value is not None else default
+
+    def status(self):
+        with self._lock:
+            return {
+                "valor": self._value,
+                "data_referencia": self._reference_date,
+                "atualizado_em": self._fetched_at.isoformat() if self._fetched_at else None,
+            }
+
+    # --- BCB ---
+    def _fetch(self):
+        url = f"{BCB_SGS_URL.format(serie=SELIC_SERIES)}/ultimos/{SELIC_TAIL}?formato=json"
+        headers = {"User-Agent": "Mozilla/5.0"}
+        response = requests.get(url, headers=headers, timeout=SELIC_FETCH_TIMEOUT)
+        if response.status_code != 200:
+            raise ValueError(f"BCB respondeu com status {response.status_code}")
+        dados = response.json()
+        if not dados:
+            raise ValueError("BCB retornou lista vazia")
+        return float(dados[-1]['valor']), dados[-1].get('data')
+
+    def refresh(self):
+        """Consulta o BCB e atualiza memória e disco. Retorna True em caso de sucesso."""
+        try:
+            with stage("selic_fetch"):
+                value, reference_date = self._fetch()
+        except Exception as e:
+            print(f"⚠️ Selic: falha ao consultar o BCB ({e}). Mantendo último valor conhecido: {self.get()}")
+            return False
+
+        fetched_at = now_b3()
+        with self._lock:
+            changed = value != self._value
+            self._value, self._reference_date, self._fetched_at = value, reference_date, fetched_at
+        if changed:
+            print(f"🏦 Selic atualizada: {value}% ({reference_date})")
+        self._save()
+        return True
+
+    # --- PERSISTÊNCIA ---
+    def load(self):
+        """Carrega o último valor salvo em disco (se houver)."""
+        try:
+            with open(self.store_path, encoding="utf-8") as f:
+                saved = json.load(f)
+            value = float(saved["valor"])
+            fetched_at = datetime.fromisoformat(saved["atualizado_em"])
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"⚠️ Selic: arquivo {self.store_path} ilegível ({e}).")
+            return False
+
+        with self._lock:
+            self._value, self._reference_date, self._fetched_at = value, saved.get("data_referencia"), fetched_at
+        return True
+
+    def _save(self):
+        tmp = self.store_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.status(), f)
+            os.replace(tmp, self.store_path)
+        except OSError as e:
+            print(f"⚠️ Selic: não foi possível salvar em {self.store_path} ({e}).")
+
+    # --- AGENDAMENTO ---
+    def _next_refresh(self, dt):
+        """Próximo horário de atualização diária estritamente depois de `dt`."""
+        candidate = datetime.combine(dt.date(), self.refresh_time, tzinfo=B3_TZ)
+        if candidate <= dt:
+            candidate += timedelta(days=1)
+        return candidate
+
+    def _is_stale(self):
+        with self._lock:
+            fetched_at = self._fetched_at
+        return fetched_at is None or now_b3() >= self._next_refresh(fetched_at)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self._is_stale():
+                ok = self.refresh()
+                wait = SELIC_RETRY_AFTER if not ok else (self._next_refresh(now_b3()) - now_b3()).total_seconds()
+            else:
+                with self._lock:
+                    fetched_at = self._fetched_at
+                wait = (self._next_refresh(fetched_at) - now_b3()).total_seconds()
+            self._stop.wait(max(wait, 1.0))
+
+    def start(self):
+        """
+        Carrega o valor persistido e inicia a atualização em segundo plano, sem
+        bloquear quem chama. Sem nenhum valor em disco, a primeira consulta acontece
+        na própria thread de fundo; até ela chegar, `get` devolve o `default`
+        (SELIC_FALLBACK nas features). As chaves dos caches de previsão incluem a
+        Selic, então a chegada do valor real invalida o que foi calculado antes.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.load()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="selic-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+
+selic_provider = SelicProvider()
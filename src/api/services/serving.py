@@ -0,0 +1,162 @@
+import asyncio
+import itertools
+import pickle
+import struct
+import time
+
+from prometheus_client import Histogram
+
+from src.api.config import INFERENCE_MODE, INFERENCE_SOCKET, INFERENCE_RPC_TIMEOUT
+from src.api.services.backtest import backtest_service
+from src.api.services.executors import ExecutorSaturatedError
+from src.api.services.historical_index import historical_index
+from src.api.services.intraday import intraday_service
+from src.api.services.market_providers import MarketDataError
+from src.api.services.ml_artifacts import get_artifacts, readiness
+from src.api.services.model_rollout import model_rollout
+from src.api.services.prediction_service import prediction_service
+
+INFERENCE_RPC_HIST = Histogram('inference_rpc_seconds', 'Latência das chamadas ao processo de inferência', ['op'])
+
+_HEADER = struct.Struct("!I")
+
+
+class ModelNotReadyError(RuntimeError):
+    """Modelo ainda carregando, com falha ou processo de inferência indisponível."""
+
+
+# Exceções que atravessam o socket com o mesmo tipo (as demais viram RuntimeError)
+_REMOTE_ERRORS = {cls.__name__: cls for cls in (ModelNotReadyError, ExecutorSaturatedError, MarketDataError, ValueError)}
+
+
+async def read_message(reader):
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return pickle.loads(await reader.readexactly(size))
+
+
+def write_message(writer, message):
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(_HEADER.pack(len(payload)) + payload)
+
+
+class LocalServing:
+    """Features, caches e inferência no próprio processo (modo local e processo de inferência)."""
+
+    @staticmethod
+    def _require(ticker):
+        if not get_artifacts(ticker).is_loaded():
+            raise ModelNotReadyError("Modelo ML não carregado (ver /api/ready).")
+
+    async def readiness(self):
+        return {**readiness(), "implantacao": model_rollout.state()}
+
+    async def predict(self, ticker):
+        self._require(ticker)
+        return await prediction_service.get(ticker)
+
+    async def history(self, ticker):
+        self._require(ticker)
+        return await historical_index.get(ticker)
+
+    async def backtest(self, ticker):
+        self._require(ticker)
+        return await backtest_service.get(ticker)
+
+    async def intraday(self, ticker):
+        self._require(ticker)
+        return intraday_service.latest(ticker)
+
+
+class RemoteServing:
+    """
+    Cliente do processo de inferência compartilhado (INFERENCE_MODE=remote).
+
+    Uma conexão persistente por worker HTTP, multiplexada: várias chamadas em voo
+    ao mesmo tempo, respondidas fora de ordem pelo id. Como as chamadas chegam
+    concorrentes ao servidor, o micro-batching e o cache de previsões passam a
+    valer para todos os workers juntos.
+    """
+
+    def __init__(self, path=INFERENCE_SOCKET, timeout=INFERENCE_RPC_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._ids = itertools.count()
+        self._pending = {}
+        self._writer = None
+        self._connecting = None
+
+    async def _connect(self):
+        if self._writer is not None and not self._writer.is_closing():
+            return
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(asyncio.open_unix_connection(self.path))
+        try:
+            reader, writer = await asyncio.shield(self._connecting)
+        finally:
+            self._connecting = None
+        if self._writer is None or self._writer.is_closing():
+            self._writer = writer
+            asyncio.ensure_future(self._read_loop(reader, writer))
+
+    async def _read_loop(self, reader, writer):
+        try:
+            while True:
+                message = await read_message(reader)
+                future = self._pending.pop(message["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ModelNotReadyError("conexão com o processo de inferência perdida"))
+
+    async def call(self, op, *args):
+        start = time.perf_counter()
+        try:
+            await self._connect()
+        except OSError as e:
+            raise ModelNotReadyError(f"processo de inferência indisponível ({e})")
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            write_message(self._writer, {"id": request_id, "op": op, "args": args})
+            await self._writer.drain()
+            message = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise ModelNotReadyError(f"processo de inferência não respondeu em {self.timeout:.0f}s")
+        finally:
+            self._pending.pop(request_id, None)
+            INFERENCE_RPC_HIST.labels(op=op).observe(time.perf_counter() - start)
+
+        if message["ok"]:
+            return message["result"]
+        raise _REMOTE_ERRORS.get(message["error_type"], RuntimeError)(message["error"])
+
+    async def readiness(self):
+        try:
+            return await self.call("readiness")
+        except ModelNotReadyError as e:
+            return {"status": "starting", "ready": False, "erro": str(e), "modelos": {}}
+
+    async def predict(self, ticker):
+        return await self.call("predict", ticker)
+
+    async def history(self, ticker):
+        return await self.call("history", ticker)
+
+    async def backtest(self, ticker):
+        return await self.call("backtest", ticker)
+
+    async def intraday(self, ticker):
+        return await self.call("intraday", ticker)
+
+
+serving = RemoteServing() if INFERENCE_MODE == "remote" else LocalServing()
@@ -0,0 +1,186 @@
+"""
+Shadow test diário: erro real do modelo em cada pregão fechado, fora do caminho da requisição.
+
+Para cada pregão D, o fechamento observado é comparado com a previsão D+1 feita
+com a janela encerrada em D-1. Essa previsão já está no índice histórico do
+snapshot (pontuado uma vez para o backtest), então avaliar um pregão não custa
+nenhuma inferência. Cada resultado é gravado uma única vez num store SQLite
+(ativo, pregão) e as métricas do shadow test são publicadas a partir dele.
+"""
+import os
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from prometheus_client import Gauge, Histogram
+
+from src.api.config import SHADOW_STORE_PATH, SHADOW_WINDOWS
+from src.api.services.executors import io_executor
+from src.api.services.historical_index import historical_index
+from src.api.services.market_calendar import is_session_open, now_b3
+from src.api.services.telemetry import stage
+
+# --- MONITORAMENTO DE PERFORMANCE REAL (Shadow Test) ---
+REAL_ERROR_GAUGE = Gauge('model_real_error_abs', 'Erro Real do último pregão fechado (R$): Fechamento - Previsão Shadow', ['ticker'], multiprocess_mode='mostrecent')
+REAL_ACCURACY_HIST = Histogram('model_real_accuracy_percentage', 'Erro Percentual Real (%)', ['ticker'], buckets=[0.01, 0.02, 0.05, 0.10])
+SHADOW_ROLLING_MAPE_GAUGE = Gauge('model_shadow_rolling_mape_percentage', 'Shadow test: MAPE (%) dos últimos N pregões avaliados', ['ticker', 'window'], multiprocess_mode='mostrecent')
+SHADOW_LAST_BAR_GAUGE = Gauge('model_shadow_last_bar_timestamp_seconds', 'Shadow test: último pregão avaliado (epoch)', ['ticker'], multiprocess_mode='mostrecent')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shadow_outcomes (
+    ticker TEXT NOT NULL,
+    data TEXT NOT NULL,
+    modelo TEXT,
+    preco_base REAL NOT NULL,
+    preco_previsto REAL NOT NULL,
+    preco_real REAL NOT NULL,
+    erro REAL NOT NULL,
+    erro_percentual REAL NOT NULL,
+    avaliado_em TEXT NOT NULL,
+    PRIMARY KEY (ticker, data)
+) WITHOUT ROWID
+"""
+
+
+@dataclass(frozen=True)
+class ShadowOutcome:
+    """Resultado do shadow test num pregão fechado."""
+    ticker: str
+    data: str               # pregão avaliado (ISO)
+    modelo: str             # versão dos artefatos que fez a previsão
+    preco_base: float       # fechamento da véspera (fim da janela)
+    preco_previsto: float   # previsão D+1 feita na véspera
+    preco_real: float       # fechamento observado no pregão
+    avaliado_em: datetime
+
+    @property
+    def erro(self):
+        return self.preco_real - self.preco_previsto
+
+    @property
+    def erro_percentual(self):
+        return abs(self.erro) / self.preco_real * 100
+
+
+class ShadowStore:
+    """Série diária do shadow test em SQLite: uma linha por (ativo, pregão), nunca sobrescrita."""
+
+    def __init__(self, path=SHADOW_STORE_PATH):
+        self.path = path
+        self._ready = False
+
+    def _connect(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # timeout: com vários workers locais, outro processo pode estar gravando
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            conn.execute(SCHEMA)
+            self._ready = True
+        return conn
+
+    def last_date(self, ticker):
+        """Último pregão avaliado do ativo (ISO) ou None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT MAX(data) FROM shadow_outcomes WHERE ticker = ?", (ticker,)).fetchone()
+        return row[0]
+
+    def insert(self, outcomes):
+        """Grava os resultados novos e devolve só os que ainda não existiam (outro worker pode ter gravado antes)."""
+        inserted = []
+        with closing(self._connect()) as conn, conn:
+            for o in outcomes:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO shadow_outcomes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (o.ticker, o.data, o.modelo, o.preco_base, o.preco_previsto, o.preco_real,
+                     o.erro, o.erro_percentual, o.avaliado_em.isoformat()),
+                )
+                if cursor.rowcount:
+                    inserted.append(o)
+        return inserted
+
+    def recent(self, ticker, limit):
+        """Até `limit` pregões mais recentes do ativo, do mais novo ao mais antigo: (data, erro, erro_percentual)."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT data, erro, erro_percentual FROM shadow_outcomes WHERE ticker = ? ORDER BY data DESC LIMIT ?",
+                (ticker, limit),
+            ).fetchall()
+
+
+def pending_outcomes(ticker, index, last_stored, today, session_open, modelo):
+    """
+    Pregões fechados do índice posteriores a `last_stored`; com o store vazio, só o
+    mais recente. O candle do dia fica de fora enquanto o pregão está aberto.
+    """
+    end = len(index)
+    if end and session_open and index.dates[-1] == np.datetime64(today, 'D'):
+        end -= 1
+    if last_stored is None:
+        start = end - 1
+    else:
+        start = int(np.searchsorted(index.dates, np.datetime64(last_stored, 'D'), 'right'))
+    now = datetime.now()
+    return [
+        ShadowOutcome(
+            ticker=ticker,
+            data=str(index.dates[p]),
+            modelo=modelo,
+            preco_base=float(index.closes[p - 1]),
+            preco_previsto=float(index.previstos[p - 1]),
+            preco_real=float(index.closes[p]),
+            avaliado_em=now,
+        )
+        for p in range(max(1, start), end)
+    ]
+
+
+class ShadowEvaluator:
+    """Avalia cada pregão fechado uma única vez (chamado pelo pré-aquecimento, após o fechamento)."""
+
+    def __init__(self, store=None):
+        self.store = store or ShadowStore()
+
+    async def evaluate(self, ticker):
+        index = await historical_index.get(ticker)
+        last = await io_executor.run(self.store.last_date, ticker)
+        now = now_b3()
+        with stage("shadow_eval", ticker=ticker):
+            # Versão da chave do índice: a que fez as previsões, mesmo se outra já foi promovida
+            outcomes = pending_outcomes(ticker, index, last, now.date(), is_session_open(now), index.version)
+        inserted = await io_executor.run(self.store.insert, outcomes) if outcomes else []
+        # O histograma só recebe pregões novos: reavaliar o mesmo pregão não conta de novo
+        for o in inserted:
+            REAL_ACCURACY_HIST.labels(ticker=ticker).observe(o.erro_percentual / 100)
+        if inserted:
+            o = inserted[-1]
+            print(f"🕶️ Shadow test de {ticker}: {len(inserted)} pregão(ões) avaliado(s); {o.data} "
+                  f"previsto R$ {o.preco_previsto:.2f}, real R$ {o.preco_real:.2f} ({o.erro_percentual:.2f}%)")
+        await io_executor.run(self.publish, ticker)
+        return inserted
+
+    def publish(self, ticker):
+        """Gauges do shadow test a partir do store (também restaura os valores após reiniciar)."""
+        rows = self.store.recent(ticker, max(SHADOW_WINDOWS))
+        if not rows:
+            return
+        data, erro, _ = rows[0]
+        REAL_ERROR_GAUGE.labels(ticker=ticker).set(erro)
+        SHADOW_LAST_BAR_GAUGE.labels(ticker=ticker).set(datetime.fromisoformat(data).timestamp())
+        pct = np.array([r[2] for r in rows], dtype=np.float64)
+        for window in SHADOW_WINDOWS:
+            value = float(pct[:window].mean()) if len(pct) >= window else float('nan')
+            SHADOW_ROLLING_MAPE_GAUGE.labels(ticker=ticker, window=str(window)).set(value)
+
+    async def refresh(self, tickers):
+        """Avalia os ativos após um novo snapshot (falhas não interrompem o pré-aquecimento)."""
+        for ticker in tickers:
+            try:
+                await self.evaluate(ticker)
+            except Exception as e:
+                print(f"⚠️ Shadow test de {ticker} indisponível: {e}")
+
+
+shadow_evaluator = ShadowEvaluator()
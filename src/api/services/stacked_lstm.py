@@ -0,0 +1,107 @@
+import numpy as np
+
+# Forward pass NumPy de modelos Sequential LSTM/Dropout/Dense. Vários modelos com a
+# mesma arquitetura (pesos diferentes) rodam juntos: os pesos são empilhados num
+# eixo extra e cada passo da recorrência vira um único matmul em lote.
+
+_ACTIVATIONS = {
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+
+
+def architecture(model):
+    """
+    Assinatura da arquitetura (tipos de camada, unidades, ativações e formatos).
+    Modelos com a mesma assinatura podem ser empilhados. Levanta ValueError para
+    camadas não suportadas.
+    """
+    layers = []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        config = layer.get_config()
+        if kind == "LSTM":
+            if config.get("go_backwards") or config.get("stateful") or not config.get("use_bias", True):
+                raise ValueError(f"LSTM com configuração não suportada: {layer.name}")
+            acts = (config["activation"], config["recurrent_activation"])
+            if any(a not in _ACTIVATIONS for a in acts):
+                raise ValueError(f"ativação não suportada em {layer.name}: {acts}")
+            layers.append((kind, config["units"], acts, bool(config["return_sequences"])))
+        elif kind == "Dense":
+            if config["activation"] not in _ACTIVATIONS or not config.get("use_bias", True):
+                raise ValueError(f"Dense com configuração não suportada: {layer.name}")
+            layers.append((kind, config["units"], config["activation"]))
+        elif kind == "Dropout":
+            continue  # sem efeito na inferência
+        else:
+            raise ValueError(f"camada não suportada: {kind}")
+    return (tuple(model.input_shape[1:]),) + tuple(layers)
+
+
+class StackedLSTM:
+    """
+    N modelos de mesma arquitetura avaliados num único forward pass em float32.
+    `predict` recebe (N, batch, janela, features) e devolve (N, batch, saídas).
+    """
+
+    def __init__(self, models):
+        signatures = {architecture(m) for m in models}
+        if len(signatures) != 1:
+            raise ValueError("modelos com arquiteturas diferentes não podem ser empilhados")
+        self.signature = signatures.pop()
+        self.size = len(models)
+
+        self._layers = []
+        specs = iter(self.signature[1:])
+        for index, layer in enumerate(models[0].layers):
+            kind = type(layer).__name__
+            if kind == "Dropout":
+                continue
+            spec = next(specs)
+            weights = [m.layers[index].get_weights() for m in models]
+            stacked = [np.stack([w[i] for w in weights]).astype(np.float32) for i in range(len(weights[0]))]
+            if kind == "LSTM":
+                kernel, recurrent, bias = stacked
+                _, units, (act, rec_act), return_sequences = spec
+                self._layers.append(("LSTM", kernel, recurrent, bias[:, None, :], units,
+                                     _ACTIVATIONS[act], _ACTIVATIONS[rec_act], return_sequences))
+            else:
+                kernel, bias = stacked
+                self._layers.append(("Dense", kernel, bias[:, None, :], _ACTIVATIONS[spec[2]]))
+
+    @staticmethod
+    def _lstm(x, kernel, recurrent, bias, units, act, rec_act, return_sequences):
+        n, batch, steps, features = x.shape
+        # Projeção da entrada para todos os passos de uma vez: (N, batch*passos, 4u)
+        xw = np.matmul(x.reshape(n, batch * steps, features), kernel).reshape(n, batch, steps, 4 * units)
+        h = np.zeros((n, batch, units), dtype=np.float32)
+        c = np.zeros((n, batch, units), dtype=np.float32)
+        outputs = []
+        for t in range(steps):
+            z = xw[:, :, t] + np.matmul(h, recurrent) + bias
+            i = rec_act(z[..., :units])
+            f = rec_act(z[..., units:2 * units])
+            g = act(z[..., 2 * units:3 * units])
+            o = rec_act(z[..., 3 * units:])
+            c = f * c + i * g
+            h = o * act(c)
+            if return_sequences:
+                outputs.append(h)
+        return np.stack(outputs, axis=2) if return_sequences else h
+
+    def predict(self, batch, upto=None):
+        """`upto` limita às primeiras camadas (ex.: -1 devolve a entrada da Dense de saída)."""
+        x = np.asarray(batch, dtype=np.float32)
+        if x.shape[0] != self.size:
+            raise ValueError(f"esperado lote para {self.size} modelos, recebido {x.shape[0]}")
+        for layer in self._layers[:upto]:
+            if layer[0] == "LSTM":
+                x = self._lstm(x, *layer[1:])
+            else:
+                _, kernel, bias, act = layer
+                if x.ndim == 4:  # Dense aplicada à sequência inteira
+                    kernel, bias = kernel[:, None], bias[:, None]
+                x = act(np.matmul(x, kernel) + bias)
+        return x
@@ -0,0 +1,119 @@
+"""
+Latência por etapa do caminho de previsão.
+
+Cada etapa (download de mercado, Selic, features, scaling, inferência, projeção,
+contexto, serialização) é medida no histograma `prediction_stage_seconds{stage}`.
+Com TRACING_ENABLED=true e o extra `tracing` instalado, cada etapa também vira um
+span OpenTelemetry, aninhado no span da requisição (os executores copiam o
+contexto para as threads).
+"""
+import json
+import math
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+
+from fastapi import Response
+from prometheus_client import Histogram
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # extra `speedups`
+    orjson = None
+
+from src.api.config import TRACING_ENABLED, TRACING_SERVICE_NAME
+
+STAGE_LATENCY_HIST = Histogram(
+    'prediction_stage_seconds', 'Duração de cada etapa do caminho de previsão', ['stage'],
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+)
+RESPONSE_SIZE_HIST = Histogram(
+    'api_response_size_bytes', 'Tamanho do corpo JSON das respostas', ['route'],
+    buckets=[256, 512, 1024, 2048, 4096, 8192, 16384, 65536, 262144, 1048576],
+)
+
+_tracer = None
+
+
+def setup_tracing():
+    """Ativa os spans se TRACING_ENABLED=true (sem o SDK instalado, só os histogramas continuam)."""
+    global _tracer
+    if not TRACING_ENABLED or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        print(f"⚠️ Tracing desativado: pacotes opcionais do OpenTelemetry ausentes ({e}).")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("src.api")
+    print(f"🔭 Tracing OpenTelemetry ativo (serviço {TRACING_SERVICE_NAME}).")
+
+
+def span(name, **attributes):
+    """Span sem histograma (ex.: a requisição inteira, já medida pelo Instrumentator)."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+@contextmanager
+def stage(name, **attributes):
+    """Mede o bloco em prediction_stage_seconds{stage=name} (e abre um span, se ativo)."""
+    start = time.perf_counter()
+    with span(name, **attributes):
+        try:
+            yield
+        finally:
+            STAGE_LATENCY_HIST.labels(stage=name).observe(time.perf_counter() - start)
+
+
+def staged(name, fn, **attributes):
+    """`fn` dentro de stage(name): mede só a execução, sem a espera na fila do executor."""
+    def run(*args, **kwargs):
+        with stage(name, **attributes):
+            return fn(*args, **kwargs)
+    return run
+
+
+def dumps(content):
+    """JSON compacto em bytes: orjson se instalado (extra `speedups`), senão o encoder da stdlib."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(_finite(content), ensure_ascii=False, separators=(",", ":"), default=_json_default).encode()
+
+
+def _finite(value):
+    """NaN e ±inf viram null, como no orjson (a stdlib escreveria NaN/Infinity, que não é JSON válido)."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"tipo não serializável em JSON: {type(value).__name__}")
+
+
+def json_response(content, route, headers=None):
+    """
+    Serializa o corpo (medido como etapa) e registra o tamanho. Aceita um schema
+    Pydantic ou, no caminho rápido, um dict já no formato do schema (sem validação).
+    """
+    with stage("serialization"):
+        body = content.model_dump_json().encode() if isinstance(content, BaseModel) else dumps(content)
+    RESPONSE_SIZE_HIST.labels(route=route).observe(len(body))
+    return Response(content=body, media_type="application/json", headers=headers)
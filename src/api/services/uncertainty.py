@@ -0,0 +1,60 @@
+import zlib
+
+import numpy as np
+
+from src.api.config import UNCERTAINTY_QUANTILES
+from src.api.services.stacked_lstm import StackedLSTM, _ACTIVATIONS
+
+
+class MCDropoutSampler:
+    """
+    Trajetórias de log-retorno por MC-dropout sem repetir a LSTM K vezes.
+
+    O Dropout do modelo fica entre a última LSTM e a Dense de saída: o estado das
+    LSTMs é calculado uma única vez (forward NumPy do StackedLSTM) e as K × H
+    máscaras (K trajetórias, H dias) passam pela Dense num único matmul. Como na
+    projeção pontual, que repete o log-retorno de D+1, a janela de entrada é a
+    mesma em todos os dias; cada dia da trajetória sorteia uma máscara nova.
+    """
+
+    def __init__(self, model, samples, horizon):
+        *_, dropout, dense = model.layers
+        if type(dropout).__name__ != "Dropout" or type(dense).__name__ != "Dense" or not dropout.rate:
+            raise ValueError("modelo sem Dropout imediatamente antes da Dense de saída")
+        self.trunk = StackedLSTM([model])
+        self.keep = 1.0 - float(dropout.rate)
+        kernel, bias = dense.get_weights()
+        self.kernel = kernel.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.activation = _ACTIVATIONS[dense.get_config()["activation"]]
+        self.samples = samples
+        self.horizon = horizon
+
+    def sample(self, window, seed):
+        """(janela, features) -> saídas escaladas do modelo (K, H), reprodutíveis para o mesmo `seed`."""
+        hidden = self.trunk.predict(np.asarray(window)[np.newaxis, np.newaxis], upto=-1)[0, 0]
+        rng = np.random.default_rng(seed)
+        # Mesma regra do Dropout do Keras: mantém com prob. 1 - rate e reescala por 1 / (1 - rate)
+        masks = (rng.random((self.samples * self.horizon, hidden.size), dtype=np.float32) < self.keep)
+        out = self.activation(np.matmul(masks * (hidden / self.keep), self.kernel) + self.bias)
+        return out.reshape(self.samples, self.horizon)
+
+
+def sample_seed(key):
+    """Semente estável por snapshot/modelo: a mesma chave gera as mesmas faixas em qualquer processo."""
+    return zlib.crc32(repr(key).encode())
+
+
+def price_bands(preco_atual, log_rets, precos, quantiles=UNCERTAINTY_QUANTILES):
+    """
+    Trajetórias de log-retorno (K, H) -> faixas de preço por dia e confiança.
+
+    A confiança de cada dia é a fração das trajetórias que termina do mesmo lado
+    do preço atual que a projeção pontual.
+    """
+    paths = preco_atual * np.exp(np.cumsum(log_rets, axis=1))
+    lower, upper = np.quantile(paths, quantiles, axis=0)
+    direction = np.sign(np.asarray(precos) - preco_atual)
+    confiancas = np.mean(np.sign(paths - preco_atual) == direction, axis=0)
+    faixas = tuple((float(lo), float(hi)) for lo, hi in zip(lower, upper))
+    return faixas, tuple(float(c) for c in confiancas)
@@ -0,0 +1,150 @@
+"""
+Implementação original em pandas das features do modelo e dos indicadores do painel
+(valores de ouro, congelada) e o histórico sintético usado para compará-la com os
+kernels NumPy (tests/test_indicators.py) e medir o ganho (benchmarks/bench_indicators.py).
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.api.services import indicators as ind
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+TICKERS = {"PETR4.SA": 35.0, "BRL=X": 5.4, "BZ=F": 75.0, "^BVSP": 128000.0}
+
+
+def synthetic_snapshot(rows, seed=0):
+    """DataFrame no formato do yf.download, com feriados da B3 (PETR4 sem pregão)."""
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2025-06-30", periods=rows, name="Date")
+    cols = {}
+    for ticker, base in TICKERS.items():
+        close = base * np.exp(np.cumsum(rng.normal(0, 0.015, rows)))
+        cols[("Close", ticker)] = close
+        cols[("High", ticker)] = close * (1 + np.abs(rng.normal(0, 0.01, rows)))
+        cols[("Low", ticker)] = close * (1 - np.abs(rng.normal(0, 0.01, rows)))
+        cols[("Volume", ticker)] = rng.integers(1e6, 5e7, rows).astype(float) if ticker == "PETR4.SA" else 0.0
+    df = pd.DataFrame(cols, index=idx)
+    holidays = rng.choice(np.arange(1, rows - 1), size=max(rows // 100, 1), replace=False)
+    df.loc[idx[holidays], [(f, "PETR4.SA") for f in ("Close", "High", "Low", "Volume")]] = np.nan
+    # Início do histórico sem máxima/volume (dados incompletos do Yahoo)
+    df.iloc[:3, df.columns.get_indexer([("High", "PETR4.SA"), ("Volume", "PETR4.SA")])] = np.nan
+    df.columns = pd.MultiIndex.from_tuples(df.columns, names=["Price", "Ticker"])
+    return df
+
+
+# --- REFERÊNCIA PANDAS (implementação original) ---
+def pandas_raw(df_all):
+    df_all = df_all.ffill()
+    closes = df_all.xs('Close', axis=1, level=0)
+    highs = df_all.xs('High', axis=1, level=0)
+    lows = df_all.xs('Low', axis=1, level=0)
+    vols = df_all.xs('Volume', axis=1, level=0)
+    return pd.DataFrame({
+        'close': closes['PETR4.SA'].ffill().fillna(0),
+        'high': highs['PETR4.SA'].ffill(),
+        'low': lows['PETR4.SA'].ffill(),
+        'volume': vols['PETR4.SA'].ffill(),
+        'usd': closes['BRL=X'],
+        'brent': closes['BZ=F'],
+        'ibov': closes['^BVSP'],
+    }, index=closes.index)
+
+
+def pandas_rsi(series, period):
+    delta = series.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def pandas_features(raw, selic, columns):
+    df = pd.DataFrame(index=raw.index)
+    p_close, p_high, p_low, p_vol = raw['close'], raw['high'], raw['low'], raw['volume']
+
+    df['USDBRL_t-1'] = raw['usd'].shift(1)
+    df['Brent_t-1'] = raw['brent'].shift(1)
+    df['Ibovespa_t-1'] = raw['ibov'].shift(1)
+    df['Selic_t-1'] = selic
+    df['Ibov_Return_t-1'] = raw['ibov'].pct_change(fill_method=None).shift(1)
+    df['Brent_Return_t-1'] = raw['brent'].pct_change(fill_method=None).shift(1)
+    df['USD_Return_t-1'] = raw['usd'].pct_change(fill_method=None).shift(1)
+    df['return_1'] = p_close.pct_change(fill_method=None)
+    df['return_5'] = p_close.pct_change(5, fill_method=None)
+    df['return_20'] = p_close.pct_change(20, fill_method=None)
+    sma200 = p_close.rolling(200).mean()
+    df['Dist_SMA200'] = (p_close / sma200.replace(0, np.nan)) - 1
+    df['Momentum_5'] = p_close - p_close.shift(5)
+    df['Momentum_10'] = p_close - p_close.shift(10)
+    df['Momentum_20'] = p_close - p_close.shift(20)
+    df['RSI_21'] = pandas_rsi(p_close, 21)
+    ema12 = p_close.ewm(span=12, adjust=False).mean()
+    ema26 = p_close.ewm(span=26, adjust=False).mean()
+    df['MACD'] = ema12 - ema26
+    df['MACD_Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
+    tr1 = p_high - p_low
+    tr2 = (p_high - p_close.shift()).abs()
+    tr3 = (p_low - p_close.shift()).abs()
+    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+    df['ATR_14'] = tr.rolling(14).mean()
+    df['BB_Middle'] = p_close.rolling(20).mean()
+    df['BB_Std'] = p_close.rolling(20).std()
+    df['BB_Upper'] = df['BB_Middle'] + (df['BB_Std'] * 2)
+    df['BB_Lower'] = df['BB_Middle'] - (df['BB_Std'] * 2)
+    df['BB_Width'] = (df['BB_Upper'] - df['BB_Lower']) / df['BB_Middle'].replace(0, np.nan)
+    df['BB_Position'] = (p_close - df['BB_Lower']) / (df['BB_Upper'] - df['BB_Lower']).replace(0, np.nan)
+    df['STD_20'] = df['BB_Std']
+    high_low_ratio = (p_high / p_low.replace(0, np.nan))
+    df['Parkinson_Vol'] = np.sqrt(1/(4*np.log(2)) * (np.log(high_low_ratio)**2))
+    df['Range_High_Low'] = (p_high - p_low) / p_close.replace(0, np.nan)
+    df['OBV'] = (np.sign(p_close.diff()) * p_vol).fillna(0).cumsum()
+    df['Volume_Ratio'] = p_vol / p_vol.rolling(20).mean().replace(0, np.nan)
+    cum_vol = p_vol.cumsum()
+    cum_vol_price = (p_vol * (p_high + p_low + p_close) / 3).cumsum()
+    df['VWAP'] = cum_vol_price / cum_vol.replace(0, np.nan)
+    dow, month = df.index.dayofweek, df.index.month
+    df['DoW_sin'] = np.sin(2 * np.pi * dow / 5)
+    df['DoW_cos'] = np.cos(2 * np.pi * dow / 5)
+    df['Month_sin'] = np.sin(2 * np.pi * month / 12)
+    df['Month_cos'] = np.cos(2 * np.pi * month / 12)
+    return df[columns].copy().ffill().fillna(0)
+
+
+def pandas_display(df_all):
+    closes = df_all['Close']
+    petr = closes['PETR4.SA'].ffill().dropna()
+    rsi = pandas_rsi(petr, 14)
+    macd = petr.ewm(span=12, adjust=False).mean() - petr.ewm(span=26, adjust=False).mean()
+    sma20, std20 = petr.rolling(20).mean(), petr.rolling(20).std()
+    bb_pos = (petr - (sma20 - std20 * 2)) / ((sma20 + std20 * 2) - (sma20 - std20 * 2))
+    momentum5 = petr - petr.shift(5)
+    petr_vol = df_all['Volume']['PETR4.SA'].ffill()
+    petr_high = df_all['High']['PETR4.SA'].ffill()
+    petr_low = df_all['Low']['PETR4.SA'].ffill()
+    typ_price = (petr_high + petr_low + petr) / 3
+    vwap = (typ_price * petr_vol).tail(20).cumsum() / petr_vol.tail(20).cumsum()
+    tr = (petr_high - petr_low).rolling(14).mean()
+    sma200 = petr.rolling(200).mean()
+    return {
+        "rsi": rsi.iloc[-1], "macd": macd.iloc[-1], "bb_posicao": bb_pos.iloc[-1],
+        "momentum_5d": momentum5.iloc[-1], "vwap": vwap.iloc[-1], "atr": tr.iloc[-1],
+        "sma200": sma200.iloc[-1], "dolar": closes['BRL=X'].ffill().iloc[-1],
+    }
+
+
+# --- VERSÃO NUMPY (a mesma usada pelos serviços) ---
+def numpy_display(buffer):
+    start = int(np.argmax(~np.isnan(buffer.close)))
+    petr = buffer.close[start:]
+    _, _, upper, lower = ind.bollinger(petr, 20, 2)
+    return {
+        "rsi": ind.rsi(petr, 14)[-1], "macd": ind.macd(petr)[0][-1],
+        "bb_posicao": ((petr - lower) / (upper - lower))[-1],
+        "momentum_5d": ind.diff(petr, 5)[-1],
+        "vwap": ind.vwap(buffer.high[start:], buffer.low[start:], petr, buffer.volume[start:], window=20)[-1],
+        "atr": ind.rolling_mean(buffer.high - buffer.low, 14)[-1],
+        "sma200": ind.rolling_mean(petr, 200)[-1], "dolar": buffer.usd[-1],
+    }
@@ -0,0 +1,56 @@
+"""BoundedExecutor: limite de pendentes e contadores liberados mesmo com cancelamento."""
+import asyncio
+import threading
+
+import pytest
+
+from src.api.services.executors import EXECUTOR_QUEUE_DEPTH, BoundedExecutor, ExecutorSaturatedError
+
+
+def queue_depth(name):
+    return EXECUTOR_QUEUE_DEPTH.labels(executor=name)._value.get()
+
+
+def test_cancelled_queued_tasks_release_their_slots():
+    executor = BoundedExecutor("test_cancel", max_workers=1, max_queue=2)
+    gate = threading.Event()
+
+    async def scenario():
+        busy = asyncio.ensure_future(executor.run(gate.wait))
+        queued = asyncio.ensure_future(executor.run(lambda: "nunca"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.run(lambda: None)
+
+        # Cliente desconectou antes de uma thread pegar a tarefa
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        gate.set()
+        await busy
+        assert await executor.run(lambda: 42) == 42
+
+    try:
+        asyncio.run(scenario())
+        assert executor._pending == 0
+        assert queue_depth("test_cancel") == 0
+    finally:
+        gate.set()
+        executor.shutdown()
+
+
+def test_errors_release_their_slots():
+    executor = BoundedExecutor("test_error", max_workers=1, max_queue=1)
+
+    def fail():
+        raise ValueError("falha")
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await executor.run(fail)
+
+    asyncio.run(scenario())
+    assert executor._pending == 0
+    assert queue_depth("test_error") == 0
+    executor.shutdown()
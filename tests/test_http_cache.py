@@ -0,0 +1,30 @@
+"""Cache HTTP da previsão: validade até o próximo candle ou a virada do dia na B3."""
+import re
+from datetime import datetime
+
+import pytest
+
+from src.api.services import telemetry
+from src.api.services.http_cache import cache_control_until_next_bar
+from src.api.services.market_calendar import B3_TZ
+
+
+def max_age(now):
+    return int(re.search(r"max-age=(\d+)", cache_control_until_next_bar(now)).group(1))
+
+
+@pytest.mark.parametrize("moment", ["2026-10-16 19:00", "2026-10-16 23:30", "2026-10-17 10:00", "2026-10-18 00:00"])
+def test_max_age_never_crosses_b3_midnight(moment):
+    now = datetime.fromisoformat(moment).replace(tzinfo=B3_TZ)
+    seconds_to_midnight = 24 * 3600 - (now.hour * 3600 + now.minute * 60)
+    assert 0 < max_age(now) <= seconds_to_midnight
+
+
+def test_stdlib_fallback_serializes_like_orjson(monkeypatch):
+    content = {"preco": float("nan"), "faixa": [1.5, float("inf")], "par": (float("-inf"), 2),
+               "data": datetime(2026, 10, 16, 18, 0)}
+    monkeypatch.setattr(telemetry, "orjson", None)
+    body = telemetry.dumps(content)
+    assert body == b'{"preco":null,"faixa":[1.5,null],"par":[null,2],"data":"2026-10-16T18:00:00"}'
+    orjson = pytest.importorskip("orjson")
+    assert body == orjson.dumps(content)
@@ -0,0 +1,127 @@
+"""Motor incremental de features vs. cálculo completo sobre o mesmo histórico."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.api.services.feature_pipeline import FEATURE_COLUMNS, FeaturePipeline, compute_features
+from src.api.services.indicator_engine import StreamingIndicatorEngine
+from src.api.services.indicators import OHLCVBuffer
+
+SELIC = 15.0
+WINDOW = 50
+
+
+def synthetic_raw(n=320, seed=7):
+    """Histórico sintético no layout do OHLCVBuffer, com NaNs iniciais nas séries macro."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=n, name="Date")
+    close = 35.0 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    spread = np.abs(rng.normal(0, 0.01, n)) * close
+    raw = pd.DataFrame({
+        'close': close,
+        'high': close + spread,
+        'low': close - spread,
+        'volume': rng.integers(10_000_000, 60_000_000, n).astype(float),
+        'usd': 5.4 * np.exp(np.cumsum(rng.normal(0, 0.005, n))),
+        'brent': 75.0 * np.exp(np.cumsum(rng.normal(0, 0.01, n))),
+        'ibov': 128000.0 * np.exp(np.cumsum(rng.normal(0, 0.008, n))),
+    }, index=dates)
+    raw.iloc[:3, raw.columns.get_loc('brent')] = np.nan
+    # Candle com volume zero (VWAP/Volume_Ratio com divisão por zero)
+    raw.iloc[40, raw.columns.get_loc('volume')] = 0.0
+    return raw
+
+
+def batch_window(raw):
+    series = [raw[c].to_numpy(dtype=np.float64) for c in OHLCVBuffer.SERIES]
+    features = compute_features(*series, raw.index, SELIC, FEATURE_COLUMNS)
+    return features[-WINDOW:], raw['close'].to_numpy()[-WINDOW:]
+
+
+def bars(raw):
+    return raw[['close', 'high', 'low', 'volume', 'usd', 'brent', 'ibov']].to_numpy(dtype=float).tolist()
+
+
+def test_update_and_revise_match_batch():
+    raw = synthetic_raw()
+    seeded = 250
+    engine = StreamingIndicatorEngine(FEATURE_COLUMNS, WINDOW)
+    engine.seed(raw.iloc[:seeded])
+
+    values = bars(raw)
+    last = len(raw) - 1
+    for i in range(seeded, last):
+        engine.update(raw.index[i], values[i])
+
+    # Candle do dia em formação, revisado depois com o valor final
+    forming = list(values[last])
+    forming[0] *= 1.03
+    forming[3] /= 2
+    engine.update(raw.index[last], forming, provisional=True)
+    engine.revise_last(raw.index[last], values[last])
+
+    features, closes = engine.window(SELIC)
+    expected, expected_close = batch_window(raw)
+    np.testing.assert_array_equal(features.to_numpy(), expected)
+    np.testing.assert_array_equal(closes.to_numpy(), expected_close)
+    assert engine.count == len(raw)
+    assert engine.first_date == raw.index[0]
+    assert engine.last_date == raw.index[-1]
+
+
+def test_revise_requires_provisional_bar():
+    raw = synthetic_raw(n=60)
+    engine = StreamingIndicatorEngine(FEATURE_COLUMNS, WINDOW)
+    engine.seed(raw.iloc[:-1])
+    engine.update(raw.index[-1], bars(raw)[-1])
+    with pytest.raises(RuntimeError):
+        engine.revise_last(raw.index[-1], bars(raw)[-1])
+
+
+def test_sync_only_reseeds_on_history_rewrite(monkeypatch):
+    raw = synthetic_raw()
+    pipeline = FeaturePipeline()
+    seeds = []
+    seed = pipeline._engine.seed
+    monkeypatch.setattr(pipeline._engine, 'seed', lambda frame: (seeds.append(len(frame)), seed(frame)))
+
+    pipeline._sync_engine(raw.iloc[:300], SELIC)
+    # Pregões novos com o mesmo início: só atualização incremental
+    pipeline._sync_engine(raw.iloc[:310], SELIC)
+    pipeline._sync_engine(raw, SELIC)
+    assert seeds == [300]
+    features, closes = pipeline._engine.window(SELIC)
+    expected, expected_close = batch_window(raw)
+    np.testing.assert_array_equal(features.to_numpy(), expected)
+    np.testing.assert_array_equal(closes.to_numpy(), expected_close)
+
+    # Outro início de histórico: a base de OBV/VWAP muda e o motor é reconstruído
+    pipeline._sync_engine(raw.iloc[5:], SELIC)
+    assert seeds == [300, len(raw) - 5]
+
+
+def test_sync_reseeds_when_applied_rows_are_rewritten(monkeypatch):
+    raw = synthetic_raw()
+    pipeline = FeaturePipeline()
+    seeds = []
+    seed = pipeline._engine.seed
+    monkeypatch.setattr(pipeline._engine, 'seed', lambda frame: (seeds.append(len(frame)), seed(frame)))
+    pipeline._sync_engine(raw.iloc[:300], SELIC)
+
+    # Mesmas datas e mais um pregão, mas com o histórico anterior reajustado (proventos)
+    # e um fechamento macro preenchido que ganhou o valor real
+    rewritten = raw.iloc[:301].copy()
+    rewritten.iloc[:290, :3] *= 0.97
+    rewritten.iloc[150, rewritten.columns.get_loc('usd')] += 0.01
+    pipeline._sync_engine(rewritten, SELIC)
+    assert seeds == [300, 301]
+    features, _ = pipeline._engine.window(SELIC)
+    np.testing.assert_array_equal(features.to_numpy(), batch_window(rewritten)[0])
+
+    # Só o candle em formação mudou: revisão incremental, sem reprocessar
+    forming = rewritten.copy()
+    forming.iloc[-1, 0] *= 1.01
+    pipeline._sync_engine(forming, SELIC)
+    assert seeds == [300, 301]
+    features, _ = pipeline._engine.window(SELIC)
+    np.testing.assert_array_equal(features.to_numpy(), batch_window(forming)[0])
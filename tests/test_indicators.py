@@ -0,0 +1,50 @@
+"""Kernels NumPy dos indicadores vs. a implementação original em pandas (valores de ouro)."""
+import numpy as np
+import pytest
+
+from src.api.services import indicators as ind
+from src.api.services.feature_pipeline import FeaturePipeline
+from tests.indicator_reference import numpy_display, pandas_display, pandas_features, pandas_raw, synthetic_snapshot
+
+# Tolerâncias das features (mesma ordem de grandeza da paridade do motor incremental)
+ATOL, RTOL = 1e-9, 1e-12
+SELIC = 11.75
+
+# Séries curtas exercitam janelas incompletas; a longa (2y ≈ 520 candles), o caso de produção
+CASES = [(rows, seed) for rows in (30, 250, 520) for seed in range(3)]
+
+
+def numpy_raw(buffer):
+    raw = buffer.to_frame()
+    raw['close'] = raw['close'].fillna(0)
+    return raw
+
+
+@pytest.mark.parametrize("rows,seed", CASES)
+def test_model_features_match_pandas(rows, seed):
+    df_all = synthetic_snapshot(rows, seed)
+    pipeline = FeaturePipeline()
+    expected = pandas_features(pandas_raw(df_all), SELIC, pipeline.TARGET_COLUMNS)
+    buffer = ind.OHLCVBuffer.from_snapshot(df_all, "PETR4.SA")
+    actual, _ = pipeline._compute_features_batch(numpy_raw(buffer), SELIC)
+
+    failures = [
+        f"{col}: erro máx {np.nanmax(np.abs(actual[col].to_numpy() - expected[col].to_numpy())):.3e}"
+        for col in pipeline.TARGET_COLUMNS
+        if not np.allclose(actual[col].to_numpy(), expected[col].to_numpy(), rtol=RTOL, atol=ATOL, equal_nan=True)
+    ]
+    assert not failures, "\n".join(failures)
+
+
+@pytest.mark.parametrize("rows,seed", CASES)
+def test_display_indicators_match_pandas(rows, seed):
+    df_all = synthetic_snapshot(rows, seed)
+    expected = pandas_display(df_all)
+    actual = numpy_display(ind.OHLCVBuffer.from_snapshot(df_all, "PETR4.SA"))
+
+    failures = [
+        f"{k}: {actual[k]!r} != {expected[k]!r}"
+        for k in expected
+        if not np.allclose(actual[k], expected[k], rtol=RTOL, atol=ATOL, equal_nan=True)
+    ]
+    assert not failures, "\n".join(failures)
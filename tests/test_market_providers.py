@@ -0,0 +1,57 @@
+"""MarketDataClient: provedor abstrato e circuit breaker meio-aberto."""
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.api.services.market_providers import MarketDataClient, MarketDataError, MarketDataProvider
+
+
+class FlakyProvider(MarketDataProvider):
+    """Falha os tickers de `failing`; os de `slow` só falham depois de `delay` segundos."""
+    name = "flaky"
+    timeout = 5.0
+    retries = 1
+
+    def __init__(self, failing, slow=(), delay=0.0):
+        self.failing = set(failing)
+        self.slow = set(slow)
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def fetch(self, ticker, fields, period=None, start=None):
+        with self._lock:
+            self.calls.append(ticker)
+        if ticker in self.slow:
+            time.sleep(self.delay)
+        if ticker in self.failing:
+            raise MarketDataError(f"{ticker} fora do ar")
+        return pd.DataFrame({"Close": [1.0]}, index=pd.DatetimeIndex(["2025-01-02"], name="Date"))
+
+
+def test_provider_must_implement_fetch():
+    class Incomplete(MarketDataProvider):
+        name = "incompleto"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_late_failure_does_not_take_the_half_open_probe():
+    provider = FlakyProvider(failing={"A", "B"}, slow={"B"}, delay=0.15)
+    client = MarketDataClient([provider], max_workers=2, backoff=0.01)
+    breaker = client.breakers["flaky"]
+    breaker.failures, breaker.reset_after = 1, 0.1
+
+    # A abre o circuito; B falha depois do reset_after, com o circuito já meio-aberto
+    _, errors = client.fetch_many({"A": ["Close"], "B": ["Close"]})
+    assert set(errors) == {"A", "B"}
+    assert provider.calls.count("B") == 1  # circuito aberto: sem nova tentativa
+
+    # A vaga de teste continua livre: o provedor voltou e o circuito fecha
+    provider.failing.clear()
+    frames, errors = client.fetch_many({"A": ["Close"]})
+    assert set(frames) == {"A"} and not errors
+    assert not breaker.is_open
@@ -0,0 +1,86 @@
+"""Store OHLCV: download incremental, união por data e reajuste de proventos."""
+import numpy as np
+import pandas as pd
+
+from src.api.services.ohlcv_store import OHLCVStore
+
+TICKER = "PETR4.SA"
+FIELDS = {TICKER: ["Close", "High", "Low", "Volume"]}
+
+
+class FakeClient:
+    """Responde com recortes de um histórico 'do provedor' e registra cada chamada."""
+
+    def __init__(self, history):
+        self.history = history
+        self.calls = []
+
+    def fetch_many(self, fields_by_ticker, period=None, start=None):
+        self.calls.append("full" if period else "delta")
+        df = self.history if start is None else self.history[self.history.index >= pd.Timestamp(start)]
+        return {t: df.copy() for t in fields_by_ticker}, {}
+
+
+def history(n=60, end="2026-10-16", factor=1.0):
+    idx = pd.bdate_range(end=end, periods=n, name="Date")
+    close = np.linspace(30.0, 36.0, n) * factor
+    return pd.DataFrame({"Close": close, "High": close * 1.01, "Low": close * 0.99,
+                         "Volume": np.full(n, 1e7)}, index=idx)
+
+
+def make_store(tmp_path, provider):
+    client = FakeClient(provider)
+    return OHLCVStore(root=str(tmp_path), fields=FIELDS, client=client), client
+
+
+def stored(store):
+    return store.load_frame(start=pd.Timestamp("2000-01-01")).xs(TICKER, axis=1, level=1)
+
+
+def assert_same_history(store, expected):
+    frame = stored(store)
+    np.testing.assert_array_equal(frame.index.values.astype("datetime64[D]"), expected.index.values.astype("datetime64[D]"))
+    np.testing.assert_array_equal(frame[expected.columns].to_numpy(), expected.to_numpy())
+
+
+def test_delta_appends_new_bars(tmp_path):
+    full = history(61)
+    store, client = make_store(tmp_path, full.iloc[:-1])
+    store.sync()
+    client.history = full
+    assert store.sync() == 1
+    assert client.calls == ["full", "delta"]
+    assert_same_history(store, full)
+
+
+def test_gap_in_delta_keeps_stored_bars(tmp_path):
+    full = history(61)
+    store, client = make_store(tmp_path, full.iloc[:-1])
+    store.sync()
+    # Resposta do delta sem alguns pregões já gravados
+    client.history = full.drop(full.index[-5:-2])
+    store.sync()
+    assert_same_history(store, full)
+
+
+def test_forming_bar_revision_is_not_a_readjustment(tmp_path):
+    base = history(60)
+    store, client = make_store(tmp_path, base)
+    store.sync()
+    revised = base.copy()
+    revised.iloc[-1, revised.columns.get_loc("Close")] *= 1.02
+    client.history = revised
+    assert store.sync() == 1
+    assert client.calls == ["full", "delta"]
+    assert stored(store)["Close"].iloc[-1] == revised["Close"].iloc[-1]
+
+
+def test_readjusted_history_is_refetched(tmp_path):
+    store, client = make_store(tmp_path, history(60))
+    store.sync()
+    # Provento: o provedor reescala todo o histórico anterior e traz um pregão novo
+    adjusted = history(61, end="2026-10-19", factor=0.97)
+    client.history = adjusted
+    store.sync()
+    assert client.calls == ["full", "delta", "full"]
+    assert_same_history(store, adjusted)
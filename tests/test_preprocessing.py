@@ -0,0 +1,90 @@
+"""Pré-processamento compilado (FusedPreprocessor) vs. transform/inverse_transform do sklearn."""
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+from src.api.config import SCALER_X_PATH, SCALER_Y_PATH
+from src.api.services import indicators as ind
+from src.api.services.feature_pipeline import FEATURE_COLUMNS, FeaturePipeline
+from src.api.services.preprocessing import FusedPreprocessor
+from tests.indicator_reference import synthetic_snapshot
+
+WINDOW = 20
+
+
+def shipped_scalers():
+    return joblib.load(SCALER_X_PATH), joblib.load(SCALER_Y_PATH)
+
+
+def fitted_scalers():
+    """Scalers treinados aqui, com só parte das features no scaler_x (as demais passam inalteradas)."""
+    rng = np.random.default_rng(3)
+    scaled = FEATURE_COLUMNS[::2]
+    scaler_x = MinMaxScaler().fit(pd.DataFrame(rng.normal(0, 50, (300, len(scaled))), columns=scaled))
+    scaler_y = MinMaxScaler(feature_range=(-1, 1)).fit(rng.normal(0, 0.02, (300, 1)))
+    return scaler_x, scaler_y
+
+
+@pytest.fixture(params=[shipped_scalers, fitted_scalers], ids=["pickles", "fit"])
+def scalers(request):
+    return request.param()
+
+
+@pytest.fixture(scope="module")
+def features():
+    """Features reais (cálculo completo) de um histórico sintético de 2 anos."""
+    df_all = synthetic_snapshot(520)
+    raw = ind.OHLCVBuffer.from_snapshot(df_all, "PETR4.SA").to_frame()
+    raw['close'] = raw['close'].fillna(0)
+    return FeaturePipeline()._compute_features_batch(raw, 11.75)[0]
+
+
+def sklearn_scaled(features, scaler_x):
+    """Caminho original: cópia do DataFrame, transform do sklearn nas colunas do scaler e float32."""
+    X = features.copy()
+    cols = [c for c in scaler_x.feature_names_in_ if c in X.columns]
+    X[cols] = scaler_x.transform(X[cols])
+    return X.to_numpy().astype(np.float32)
+
+
+def test_transform_matches_sklearn(scalers, features):
+    scaler_x, scaler_y = scalers
+    preprocessor = FusedPreprocessor(scaler_x, scaler_y, FEATURE_COLUMNS, WINDOW)
+    np.testing.assert_array_equal(preprocessor.transform(features), sklearn_scaled(features, scaler_x))
+
+
+@pytest.mark.parametrize("count", [1, 3])
+def test_windows_match_sklearn(scalers, features, count):
+    scaler_x, scaler_y = scalers
+    preprocessor = FusedPreprocessor(scaler_x, scaler_y, FEATURE_COLUMNS, WINDOW)
+    expected = sklearn_scaled(features, scaler_x)
+    reference = np.stack([expected[len(expected) - WINDOW - k:len(expected) - k] for k in reversed(range(count))])
+
+    out = np.empty((count, WINDOW, len(FEATURE_COLUMNS)), dtype=np.float32)
+    np.testing.assert_array_equal(preprocessor.windows(features, out), reference)
+    # Colunas fora da ordem do modelo são reordenadas pelo índice pré-calculado
+    shuffled = features[FEATURE_COLUMNS[::-1]]
+    np.testing.assert_array_equal(preprocessor.windows(shuffled, out), reference)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_inverse_matches_sklearn(scalers, dtype):
+    scaler_x, scaler_y = scalers
+    preprocessor = FusedPreprocessor(scaler_x, scaler_y, FEATURE_COLUMNS, WINDOW)
+    preds = np.random.default_rng(5).uniform(-1.5, 1.5, (64, 1)).astype(dtype)
+    np.testing.assert_array_equal(preprocessor.inverse(preds), scaler_y.inverse_transform(preds)[:, 0])
+
+
+def test_short_history_is_rejected(scalers, features):
+    preprocessor = FusedPreprocessor(*scalers, FEATURE_COLUMNS, WINDOW)
+    with pytest.raises(ValueError):
+        preprocessor.windows(features.iloc[-WINDOW:], np.empty((2, WINDOW, len(FEATURE_COLUMNS)), dtype=np.float32))
+
+
+def test_clipping_scaler_is_not_compiled():
+    scaler_x, scaler_y = fitted_scalers()
+    scaler_x.clip = True
+    with pytest.raises(TypeError):
+        FusedPreprocessor(scaler_x, scaler_y, FEATURE_COLUMNS, WINDOW)
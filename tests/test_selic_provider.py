@@ -0,0 +1,30 @@
+"""SelicProvider: a subida nunca espera o BCB."""
+import threading
+import time
+
+from src.api.services.selic_provider import SelicProvider
+
+
+def test_cold_start_does_not_wait_for_bcb(tmp_path, monkeypatch):
+    provider = SelicProvider(store_path=str(tmp_path / "selic.json"))
+    release = threading.Event()
+
+    def slow_fetch():
+        release.wait(5)
+        return 15.0, "17/10/2026"
+
+    monkeypatch.setattr(provider, "_fetch", slow_fetch)
+    started = time.perf_counter()
+    provider.start()
+    try:
+        assert time.perf_counter() - started < 0.5
+        assert provider.get(default=11.75) == 11.75
+        release.set()
+        deadline = time.monotonic() + 5
+        while provider.get() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert provider.get() == 15.0
+        assert (tmp_path / "selic.json").exists()
+    finally:
+        release.set()
+        provider.stop()